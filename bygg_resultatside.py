@@ -0,0 +1,55 @@
+"""
+STATISK RESULTATSIDE
+Bygger en HTML-side per initiativ pluss en oversiktsside, som kan vises fra en
+vanlig webserver uten Streamlit:
+  python bygg_resultatside.py --output resultatside
+  python bygg_resultatside.py --watch          # bygg på nytt når lageret endres
+
+Bare initiativer med ny versjon bygges på nytt. Initiativer med tilgangskode tas
+ikke med, og sidene viser verken intervjuoversikt eller notater. Lageret velges som i appen med MODENHET_STORAGE, eller med --storage.
+"""
+
+import argparse
+import os
+import threading
+import time
+
+import streamlit.logger
+streamlit.logger.set_log_level('error')
+
+import modenhetsvurdering as app
+
+def build(storage, output, force=False):
+    start = time.perf_counter()
+    result = app.build_static_site(storage, output, force)
+    print(f"{len(result['built'])} sider bygget, {result['unchanged']} uendret, {len(result['removed'])} fjernet "
+          f"på {time.perf_counter() - start:.2f} s", flush=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Bygg statisk resultatside")
+    parser.add_argument("--output", default=app.SITE_DIR)
+    parser.add_argument("--storage", default=os.environ.get(app.STORAGE_ENV, 'file'),
+                        help="lager som i MODENHET_STORAGE (file, sqlite:, redis://)")
+    parser.add_argument("--force", action="store_true", help="bygg alle sider på nytt")
+    parser.add_argument("--watch", action="store_true", help="følg med på lageret og bygg endrede initiativer")
+    args = parser.parse_args()
+
+    # Søkeindeksen (temaer i rapporten) leses fra lageret appen er satt opp med
+    os.environ[app.STORAGE_ENV] = args.storage
+    storage = app.get_storage()
+    build(storage, args.output, args.force)
+    if not args.watch:
+        return
+    changed = threading.Event()
+    storage.subscribe(lambda init_ids: changed.set())
+    print("Venter på endringer (Ctrl+C for å avslutte)", flush=True)
+    try:
+        while True:
+            changed.wait()
+            changed.clear()
+            build(storage, args.output)
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
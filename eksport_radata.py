@@ -0,0 +1,41 @@
+"""
+EKSPORT AV RÅDATA
+Skriver alle svar i langt format (ett svar per rad, anonymisert) uten å starte appen:
+  python eksport_radata.py --format parquet --output svar.parquet
+  python eksport_radata.py --format csv --output svar.csv --initiative 20240101120000
+
+Lageret velges som i appen med MODENHET_STORAGE, eller med --storage.
+Parquet og Arrow krever pyarrow (pip install pyarrow).
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import streamlit.logger
+streamlit.logger.set_log_level('error')
+
+import modenhetsvurdering as app
+
+def main():
+    parser = argparse.ArgumentParser(description="Eksport av alle svar i langt format")
+    parser.add_argument("--format", choices=list(app.RAW_EXPORT_FORMATS), default="csv")
+    parser.add_argument("--output", help="filnavn (standard: modenhet_radata med filendelse for formatet)")
+    parser.add_argument("--initiative", action="append", help="bare dette initiativet (kan gjentas)")
+    parser.add_argument("--storage", default=os.environ.get(app.STORAGE_ENV, 'file'),
+                        help="lager som i MODENHET_STORAGE (file, sqlite:, redis://)")
+    args = parser.parse_args()
+
+    output = args.output or f"modenhet_radata{app.RAW_EXPORT_FORMATS[args.format][2]}"
+    storage = app.create_storage(args.storage)
+    start = time.perf_counter()
+    try:
+        count = app.export_raw_responses(storage, output, args.format, args.initiative)
+    except (RuntimeError, ValueError) as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    print(f"{count} svar skrevet til {output} på {time.perf_counter() - start:.2f} s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+FELTINTERVJUER UTEN NETT
+Lager sett for intervjuer uten nett og importerer svarfilene fra dem, uten å starte appen:
+  python feltintervju.py sett --initiative 20240101120000 --phase Planlegging --role "Prosjektleder / Programleder"
+  python feltintervju.py importer svar/*.json --dry-run
+
+Settet er en HTML-side som virker uten nett og lagrer en signert svarfil. Alle svarfilene
+importeres i én skriving; filer som allerede er importert eller ligner et eksisterende intervju
+rapporteres som konflikter. Nøkkelen for signaturen må være den samme som appen bruker
+(MODENHET_KIT_SECRET, eller modenhet_feltnokkel i samme mappe).
+"""
+
+import argparse
+import os
+import sys
+
+import streamlit.logger
+streamlit.logger.set_log_level('error')
+
+import modenhetsvurdering as app
+
+def make_kit(args, storage):
+    initiative = storage.load_initiative(args.initiative)
+    if initiative is None:
+        sys.exit(f"Fant ikke initiativet {args.initiative}")
+    if args.phase not in app.PHASES:
+        sys.exit(f"Ukjent fase '{args.phase}'. Gyldige faser: {', '.join(app.PHASES)}")
+    if args.role and args.role not in app.ROLES:
+        sys.exit(f"Ukjent rolle '{args.role}'. Gyldige roller: {', '.join(app.ROLES)}")
+    if args.benefit != "all" and args.benefit not in initiative['benefits']:
+        sys.exit(f"Fant ikke gevinsten {args.benefit}")
+    kit = app.build_interview_kit(initiative, args.initiative, args.phase, args.role, args.benefit)
+    output = args.output or app.kit_file_name(kit)
+    with open(output, 'w', encoding='utf-8') as f:
+        f.write(app.kit_html(kit))
+    print(f"Sett med {len(kit['questions'])} spørsmål ({len(kit['recommended'])} anbefalt) skrevet til {output}")
+
+def import_answers(args, storage):
+    files = []
+    for path in args.files:
+        with open(path, 'rb') as f:
+            files.append((os.path.basename(path), f.read()))
+    plan, results = app.import_kit_answers(files, storage, dry_run=args.dry_run, include_duplicates=args.include_duplicates)
+    conflicts = list(plan['conflicts'])
+    if results is None:
+        print(f"{plan['files']} filer: {len(plan['interviews'])} intervjuer med {plan['responses']} svar klare for import")
+    else:
+        conflicts += [(edit['file'], "Intervjuet ble lagt inn av andre under importen") for edit in results['conflict']]
+        print(f"{len(results['applied'])} intervjuer med {plan['responses']} svar importert")
+    for name, message in conflicts:
+        print(f"  Konflikt  {name}: {message}")
+    for name, message in plan['errors']:
+        print(f"  Feil      {name}: {message}")
+    if plan['errors']:
+        sys.exit(1)
+
+def main():
+    parser = argparse.ArgumentParser(description="Feltintervjuer uten nett")
+    parser.add_argument("--storage", default=os.environ.get(app.STORAGE_ENV, 'file'),
+                        help="lager som i MODENHET_STORAGE (file, sqlite:, redis://)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    kit = commands.add_parser("sett", help="lag et sett (HTML-side) for ett intervju")
+    kit.add_argument("--initiative", required=True, help="initiativets id")
+    kit.add_argument("--phase", required=True, choices=app.PHASES)
+    kit.add_argument("--role", help="rolle for anbefalte spørsmål (standard: alle spørsmål)")
+    kit.add_argument("--benefit", default="all", help="gevinstens id (standard: generelt for initiativet)")
+    kit.add_argument("--output", help="filnavn (standard: feltintervju_<initiativ>_<fase>.html)")
+    answers = commands.add_parser("importer", help="importer svarfiler i én skriving")
+    answers.add_argument("files", nargs="+", help="svarfiler (.json)")
+    answers.add_argument("--dry-run", action="store_true", help="bare kontroller filene")
+    answers.add_argument("--include-duplicates", action="store_true", help="importer også svar som ligner eksisterende intervjuer")
+    args = parser.parse_args()
+
+    storage = app.create_storage(args.storage)
+    if args.command == "sett":
+        make_kit(args, storage)
+    else:
+        import_answers(args, storage)
+
+if __name__ == "__main__":
+    main()
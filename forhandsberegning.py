@@ -0,0 +1,151 @@
+"""
+FORHÅNDSBEREGNING AV RESULTATER
+Egen prosess som følger med på lageret og beregner statistikk (samlet og per gevinst),
+figurer og rapportfiler for endrede initiativer, slik at appen kan vise dem direkte:
+  python forhandsberegning.py --workers 2
+  python forhandsberegning.py --once        # beregn det som mangler og avslutt
+
+Resultatene skrives til forhandsberegnet/ med initiativets versjon i filnavnet; appen
+bruker dem bare når versjonen er den samme som den har lest. Gjentatte endringer av
+samme initiativ mens det står i kø eller beregnes, slås sammen til én ny beregning.
+Når køen er tom oppdateres også svarmatrisen (modenhet_svarmatrise.bin) for initiativene som er endret.
+Lageret velges som i appen med MODENHET_STORAGE, eller med --storage.
+"""
+
+import argparse
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import streamlit.logger
+streamlit.logger.set_log_level('error')
+
+import modenhetsvurdering as app
+
+_storage = None
+_out_dir = None
+
+def init_worker(storage_spec, out_dir):
+    global _storage, _out_dir
+    streamlit.logger.set_log_level('error')
+    os.environ[app.STORAGE_ENV] = storage_spec
+    _storage = app.get_storage()
+    _out_dir = out_dir
+
+def run_job(init_id):
+    start = time.perf_counter()
+    version = app.precompute_initiative(_storage, init_id, _out_dir)
+    return init_id, version, time.perf_counter() - start
+
+class CoalescingQueue:
+    """Initiativer som venter på beregning. Et initiativ står høyst én gang i køen, og
+    endringer som kommer mens det beregnes gir én ny beregning når den pågående er ferdig."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.pending = []
+        self.running = set()
+
+    def add(self, init_ids):
+        with self.lock:
+            for init_id in init_ids:
+                if init_id not in self.pending:
+                    self.pending.append(init_id)
+        self.wake.set()
+
+    def take(self, limit):
+        # Neste initiativer som ikke allerede beregnes, høyst limit stykker
+        with self.lock:
+            ready = [init_id for init_id in self.pending if init_id not in self.running][:max(limit, 0)]
+            for init_id in ready:
+                self.pending.remove(init_id)
+                self.running.add(init_id)
+            return ready
+
+    def done(self, init_id):
+        with self.lock:
+            self.running.discard(init_id)
+        self.wake.set()
+
+    def idle(self):
+        with self.lock:
+            return not self.pending and not self.running
+
+def stale_initiatives(storage, out_dir):
+    # Initiativer uten resultater for gjeldende versjon
+    return [init_id for init_id, version in storage.get_versions().items()
+            if not os.path.exists(app.precomputed_path(init_id, version, out_dir))]
+
+def refresh_columns(storage):
+    try:
+        result = app.refresh_score_columns(storage)
+    except Exception as e:
+        print(f"Svarmatrisen kunne ikke oppdateres: {e}", flush=True)
+        return
+    if result['updated'] or result['removed']:
+        print(f"Svarmatrise: {len(result['updated'])} initiativer oppdatert, {len(result['removed'])} fjernet, "
+              f"{result['unchanged']} uendret", flush=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Forhåndsberegning av resultater og rapporter")
+    parser.add_argument("--workers", type=int, default=2, help="høyst så mange initiativer beregnes samtidig")
+    parser.add_argument("--storage", default=os.environ.get(app.STORAGE_ENV, 'file'),
+                        help="lager som i MODENHET_STORAGE (file, sqlite:, redis://)")
+    parser.add_argument("--output", default=app.PRECOMPUTE_DIR)
+    parser.add_argument("--once", action="store_true", help="beregn det som mangler og avslutt")
+    args = parser.parse_args()
+    if args.storage == 'memory':
+        parser.error("memory-lageret deles ikke mellom prosesser")
+
+    # SIGTERM avslutter som Ctrl+C, slik at prosessene i poolen stoppes sammen med hovedprosessen
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    os.environ[app.STORAGE_ENV] = args.storage
+    storage = app.get_storage()
+    os.makedirs(args.output, exist_ok=True)
+    queue = CoalescingQueue()
+    # Svarmatrisen oppdateres når køen er tom etter endringer, så den ikke konkurrerer med beregningene
+    columns_due = threading.Event()
+    columns_due.set()
+
+    def changed(init_ids):
+        queue.add(init_ids)
+        columns_due.set()
+
+    stop = None if args.once else storage.subscribe(changed)
+    queue.add(stale_initiatives(storage, args.output))
+
+    def finished(future):
+        init_id = future.init_id
+        try:
+            _, version, seconds = future.result()
+            print(f"{init_id}: versjon {version} beregnet på {seconds:.2f} s" if version is not None else f"{init_id}: slettet", flush=True)
+        except Exception as e:
+            print(f"{init_id}: beregning feilet: {e}", flush=True)
+        queue.done(init_id)
+
+    with ProcessPoolExecutor(args.workers, initializer=init_worker, initargs=(args.storage, args.output)) as pool:
+        try:
+            while True:
+                queue.wake.wait(1.0)
+                queue.wake.clear()
+                for init_id in queue.take(args.workers - len(queue.running)):
+                    future = pool.submit(run_job, init_id)
+                    future.init_id = init_id
+                    future.add_done_callback(finished)
+                if columns_due.is_set() and queue.idle():
+                    columns_due.clear()
+                    refresh_columns(storage)
+                if args.once and queue.idle():
+                    break
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if stop:
+                stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+INTERVJUPLAN FOR PORTEFØLJEN
+Foreslår færrest mulig nye intervjuer (rolle x fase x gevinst) slik at hvert spørsmål, eller hver parameter,
+får minst et gitt antall svar, for alle initiativer eller utvalgte, uten å starte appen:
+  python intervjuplan.py --target 3
+  python intervjuplan.py --target 5 --parametere --per-gevinst --output plan.csv
+
+Et rollebasert intervju antas å gi ett svar på hvert anbefalte spørsmål for rollen i fasen.
+Spørsmål ingen rolle har anbefalt i en fase kan ikke dekkes av planen, og rapporteres for seg.
+"""
+
+import argparse
+import csv
+import os
+import time
+
+import streamlit.logger
+streamlit.logger.set_log_level('error')
+
+import modenhetsvurdering as app
+
+def main():
+    parser = argparse.ArgumentParser(description="Intervjuplan for porteføljen")
+    parser.add_argument("--target", type=int, default=app.MIN_SAMPLE, help="minste antall svar (standard: MODENHET_MIN_SAMPLE)")
+    parser.add_argument("--parametere", action="store_true", help="målet gjelder hver parameter i stedet for hvert spørsmål")
+    parser.add_argument("--per-gevinst", action="store_true", help="planlegg for hver gevinst for seg")
+    parser.add_argument("--initiative", action="append", help="bare dette initiativet (kan gjentas)")
+    parser.add_argument("--output", help="skriv planen som CSV (ett intervju per rad)")
+    parser.add_argument("--storage", default=os.environ.get(app.STORAGE_ENV, 'file'),
+                        help="lager som i MODENHET_STORAGE (file, sqlite:, redis://)")
+    args = parser.parse_args()
+
+    storage = app.create_storage(args.storage)
+    start = time.perf_counter()
+    plans = app.plan_portfolio(storage, args.target, 'parameters' if args.parametere else 'questions', args.per_gevinst, args.initiative)
+    elapsed = time.perf_counter() - start
+    total = 0
+    for init_id, (name, plan) in sorted(plans.items(), key=lambda item: item[1][0].lower()):
+        total += len(plan['interviews'])
+        print(f"{name} ({init_id}): {len(plan['interviews'])} intervjuer (minst {plan['lower_bound']}), {plan['missing']} svar mangler"
+              + (f", {len(plan['unreachable'])} kan ikke dekkes" if plan['unreachable'] else ""))
+        for benefit_id, role, phase, count in app.plan_rows(plan):
+            print(f"  {count:3d} x {role} | {phase} | {benefit_id}")
+    print(f"{total} nye intervjuer for {len(plans)} initiativer, planlagt på {elapsed:.2f} s")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.writer(f, delimiter=';')
+            writer.writerow(['initiativ', 'navn', 'gevinst', 'rolle', 'fase'])
+            for init_id, (name, plan) in plans.items():
+                for item in plan['interviews']:
+                    writer.writerow([init_id, name, item['benefit_id'], item['role'], item['phase']])
+        print(f"Planen er skrevet til {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+KONFORMITETSTEST FOR LAGRINGSBACKENDS
+Kjører de samme kontrollene mot alle lagre i modenhetsvurdering.py:
+  python lagring_konformitet.py
+
+Sett MODENHET_REDIS_URL (f.eks. redis://localhost:6379/0) for å ta med Redis.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import modenhetsvurdering as app
+
+def make_edit(op, init_id, **fields):
+    edit = {'op': op, 'init_id': init_id, 'at': datetime.now().isoformat()}
+    edit.update(fields)
+    return edit
+
+def create_initiative(storage, init_id, name):
+    return storage.apply_edits([make_edit('initiative', init_id, fields={'name': name, 'access_code': '', 'created': datetime.now().isoformat()}, base=None, base_version=None)])
+
+def response_edit(initiative, init_id, iid, phase, q_id, score, notes=""):
+    return app.response_edit(initiative, init_id, iid, phase, q_id, {'score': score, 'notes': notes})
+
+def check(condition, message):
+    if not condition:
+        raise AssertionError(message)
+
+def check_empty(storage):
+    check(storage.load_all()['initiatives'] == {}, "nytt lager skal være tomt")
+    check(storage.load_catalog()['initiatives'] == {}, "katalogen skal være tom")
+    check(storage.load_initiative("finnes-ikke") is None, "ukjent initiativ skal gi None")
+
+def check_create_and_catalog(storage):
+    token = storage.get_token()
+    results = create_initiative(storage, "A", "Alfa")
+    check(len(results['applied']) == 1, "opprettelse skal lagres")
+    check(results['initiatives']['A']['name'] == "Alfa", "resultatet skal inneholde initiativet")
+    check(storage.get_token() != token, "token skal endres ved skriving")
+    check(storage.load_initiative("A")['name'] == "Alfa", "initiativet skal kunne leses")
+    check(storage.load_catalog()['initiatives']['A']['name'] == "Alfa", "katalogen skal oppdateres")
+    check("A" in storage.get_versions(), "versjoner skal inneholde initiativet")
+    again = create_initiative(storage, "A", "Alfa 2")
+    check(len(again['conflict']) == 1, "opprettelse av eksisterende initiativ skal gi konflikt")
+
+def check_interview_and_responses(storage):
+    storage.apply_edits([
+        make_edit('benefit', "A", benefit_id="b1", value={'name': "Gevinst", 'created': datetime.now().isoformat()}),
+        make_edit('interview', "A", interview_id="i1", value={'info': {'interviewee': "Kari", 'phase': "Planlegging", 'benefit_name': "Gevinst"}, 'recommended_questions': [], 'responses': {}})
+    ])
+    initiative = storage.load_initiative("A")
+    check("b1" in initiative['benefits'] and "i1" in initiative['interviews'], "gevinst og intervju skal lagres")
+    results = storage.apply_edits([response_edit(initiative, "A", "i1", "Planlegging", "1", 3, "Notat")])
+    check(len(results['applied']) == 1, "svar skal lagres")
+    check(storage.load_catalog()['interviews']['A']['i1']['answered'] == 1, "katalogen skal telle besvarte spørsmål")
+
+    # To skrivere leser samme utgave: ulike spørsmål går gjennom, samme spørsmål gir konflikt
+    stale = storage.load_initiative("A")
+    first = storage.apply_edits([response_edit(stale, "A", "i1", "Planlegging", "2", 4)])
+    disjoint = storage.apply_edits([response_edit(stale, "A", "i1", "Planlegging", "3", 2)])
+    same = storage.apply_edits([response_edit(stale, "A", "i1", "Planlegging", "2", 1)])
+    check(len(first['applied']) == 1 and len(disjoint['applied']) == 1, "disjunkte svar skal begge lagres")
+    check(len(same['conflict']) == 1, "samme svar fra utdatert utgave skal gi konflikt")
+    responses = storage.load_initiative("A")['interviews']['i1']['responses']['Planlegging']
+    check(responses['2']['score'] == 4 and responses['3']['score'] == 2, "lagrede svar skal bestå")
+    summary = storage.load_initiative("A")['interviews']['i1']['summary']
+    check(summary['answered'] == 3 and summary['score_sum'] == 9 and summary['phases'] == {"Planlegging": 3} and summary['notes'] == 1,
+          "oppsummeringen skal følge svarene")
+
+def check_delete(storage):
+    create_initiative(storage, "D", "Delta")
+    stale = storage.load_initiative("D")
+    storage.apply_edits([make_edit('initiative', "D", fields={'description': "Ny"}, base={'description': None}, base_version=stale['version'])])
+    conflict = storage.apply_edits([make_edit('delete_initiative', "D", base_version=stale['version'])])
+    check(len(conflict['conflict']) == 1, "sletting av endret initiativ skal gi konflikt")
+    current = storage.load_initiative("D")
+    deleted = storage.apply_edits([make_edit('delete_initiative', "D", base_version=current['version'])])
+    check(len(deleted['applied']) == 1 and deleted['initiatives']['D'] is None, "sletting skal lagres")
+    check(storage.load_initiative("D") is None and "D" not in storage.load_catalog()['initiatives'], "slettet initiativ skal forsvinne")
+
+def check_subscribe(storage):
+    changes = []
+    received = threading.Event()
+    stop = storage.subscribe(lambda changed: (changes.append(changed), received.set()), interval=0.05)
+    try:
+        create_initiative(storage, "S", "Sigma")
+        check(received.wait(5), "abonnenten skal varsles")
+        check("S" in changes[0], "varselet skal inneholde endret initiativ")
+    finally:
+        stop()
+
+def check_concurrent_writers(storage):
+    create_initiative(storage, "C", "Samtidig")
+    storage.apply_edits([make_edit('interview', "C", interview_id="i1", value={'info': {'phase': "Gjennomføring"}, 'recommended_questions': [], 'responses': {}})])
+    errors = []
+
+    def writer(offset):
+        try:
+            for q in range(offset, 24, 4):
+                initiative = storage.load_initiative("C")
+                storage.apply_edits([response_edit(initiative, "C", "i1", "Gjennomføring", str(q + 1), q % 5 + 1)])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(offset,)) for offset in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    check(not errors, f"samtidige skrivere feilet: {errors}")
+    responses = storage.load_initiative("C")['interviews']['i1']['responses']['Gjennomføring']
+    check(len(responses) == 24, f"alle 24 svar skal lagres, fant {len(responses)}")
+
+def check_copy(storage):
+    target = app.KVStorage(app.MemoryKV(), namespace=f"kopi-{uuid.uuid4().hex}")
+    app.copy_storage(storage, target)
+    source_names = {init_id: i['name'] for init_id, i in storage.load_all()['initiatives'].items()}
+    target_names = {init_id: i['name'] for init_id, i in target.load_all()['initiatives'].items()}
+    check(source_names == target_names, "kopiering skal ta med alle initiativer")
+
+CHECKS = [check_empty, check_create_and_catalog, check_interview_and_responses, check_delete,
+          check_subscribe, check_concurrent_writers, check_copy]
+
+def backends():
+    yield "file", lambda: app.FileStorage()
+    yield "sqlite", lambda: app.SQLiteStorage(app.SQLITE_FILE)
+    yield "memory", lambda: app.KVStorage(app.MemoryKV())
+    redis_url = os.environ.get("MODENHET_REDIS_URL")
+    if redis_url and app.REDIS_AVAILABLE:
+        yield "redis", lambda: app.KVStorage(app.RedisKV(redis_url), namespace=f"konformitet-{uuid.uuid4().hex}")
+
+def main():
+    failures = 0
+    for name, factory in backends():
+        # Hvert lager får sin egen arbeidsmappe, filbaserte lagre bruker relative stier
+        os.chdir(tempfile.mkdtemp(prefix=f"modenhet-{name}-"))
+        storage = factory()
+        for check_fn in CHECKS:
+            start = time.perf_counter()
+            try:
+                check_fn(storage)
+                status = "OK"
+            except Exception as e:
+                failures += 1
+                status = f"FEIL: {e}"
+            print(f"{name:8} {check_fn.__name__:32} {(time.perf_counter() - start) * 1000:8.1f} ms  {status}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
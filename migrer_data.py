@@ -0,0 +1,38 @@
+"""
+MIGRERING AV LAGREDE DATA
+Oppgraderer alle initiativer som er lagret med eldre skjema til gjeldende versjon,
+uten å starte appen (appen gjør det samme når lageret åpnes):
+  python migrer_data.py --dry-run
+  python migrer_data.py --storage sqlite:
+
+Med --dry-run skrives ingenting; rapporten viser hvilke felt som ville fått standardverdier
+og avvik som må rettes manuelt. Avslutter med kode 1 hvis det finnes slike avvik.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import streamlit.logger
+streamlit.logger.set_log_level('error')
+
+import modenhetsvurdering as app
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrering av lagrede data til gjeldende skjema")
+    parser.add_argument("--dry-run", action="store_true", help="vis hva som ville blitt endret, uten å skrive")
+    parser.add_argument("--storage", default=os.environ.get(app.STORAGE_ENV, 'file'),
+                        help="lager som i MODENHET_STORAGE (file, sqlite:, redis://)")
+    args = parser.parse_args()
+
+    storage = app.create_storage(args.storage)
+    start = time.perf_counter()
+    report = app.migrate_storage(storage, dry_run=args.dry_run)
+    print("\n".join(app.describe_migration_report(report)))
+    print(f"Ferdig på {time.perf_counter() - start:.2f} s")
+    if report['problem_count']:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
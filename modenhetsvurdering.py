@@ -3,7 +3,24 @@ MODENHETSVURDERING - GEVINSTREALISERING
 Gjennomfores i samarbeid med konsern økonomi og digital transformasjon
 
 For PDF-rapporter, installer:
-  pip install fpdf2 filelock
+  pip install fpdf2
+
+Import av intervjuer fra Excel (.xlsx) krever i tillegg:
+  pip install openpyxl
+
+Eksport av rådata til Parquet og Arrow krever:
+  pip install pyarrow
+
+Lagring velges med miljøvariabelen MODENHET_STORAGE:
+  file (standard), sqlite:modenhet_data.db, redis://vert:6379/0 (pip install redis) eller memory
+
+Tidsmåling per kjøring slås på med MODENHET_METRICS=1. Målingene skrives til
+modenhet_metrics.prom, kan hentes fra /metrics med MODENHET_METRICS_PORT=<port>,
+og vises i sidefeltet for administratorer når MODENHET_ADMIN_CODE er satt.
+
+Profilering (cProfile og tracemalloc) slås på med MODENHET_PROFILE=1 for alle
+kjøringer, eller MODENHET_PROFILE=<init_id>,<init_id> for bestemte initiativer.
+Administratorer kan også slå den på per sesjon eller per prosjekt i sidefeltet.
 """
 
 # Sjekk om fpdf er tilgjengelig
@@ -14,24 +31,75 @@ try:
 except ImportError:
     pass
 
+# openpyxl er valgfri (import fra Excel; CSV fungerer uten)
+OPENPYXL_AVAILABLE = False
+try:
+    import openpyxl
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    pass
+
+# pyarrow er valgfri (rådata som Parquet og Arrow; CSV fungerer uten)
+PYARROW_AVAILABLE = False
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    pass
+
+# Redis er valgfri (delt lager for flere app-instanser)
+REDIS_AVAILABLE = False
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    pass
+
+# fcntl finnes ikke på Windows (skrivelåsen bruker da en låsefil med eier)
+FCNTL_AVAILABLE = False
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    pass
+
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
 import numpy as np
-from datetime import datetime
+from datetime import datetime, timedelta
 import pickle
 import os
-from io import BytesIO
+from io import BytesIO, StringIO, TextIOWrapper
 import uuid
 import shutil
-
-# Filelock er valgfri
-FILELOCK_AVAILABLE = False
-try:
-    from filelock import FileLock
-    FILELOCK_AVAILABLE = True
-except ImportError:
-    pass
+import copy
+import random
+import re
+import math
+import time
+import heapq
+import unicodedata
+import csv
+import hashlib
+import struct
+import zlib
+import json
+import sqlite3
+import threading
+import functools
+import bisect
+import hmac
+import secrets
+import cProfile
+import pstats
+import tracemalloc
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from contextlib import closing
+from html import escape as html_escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 st.set_page_config(
     page_title="Modenhetsvurdering - Bane NOR",
@@ -41,8 +109,39 @@ st.set_page_config(
 )
 
 DATA_FILE = "modenhet_data.pkl"
-LOCK_FILE = "modenhet_data.pkl.lock"
+COMMIT_LOCK_FILE = "modenhet_data.pkl.commit"
+CATALOG_FILE = "modenhet_katalog.pkl"
+SEARCH_INDEX_FILE = "modenhet_sokeindeks.pkl"
+SCORE_COLUMNS_FILE = "modenhet_svarmatrise.bin"
 BACKUP_DIR = "backups"
+BACKUP_INDEX_FILE = "backup_indeks.pkl"
+BACKUP_FORMAT = 2             # 2: sjekksum per segment
+SNAPSHOT_MAGIC = b"MODENHET"
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_HEADER = struct.Struct(">8sHHIQ")  # magisk tekst, format, skjemaversjon, crc32 og lengde av innholdet
+BACKUP_KEEP_ALL_HOURS = 24   # alle kopier siste døgn, deretter én per dag
+BACKUP_KEEP_DAYS = 730
+CATALOG_PAGE_SIZE = 20
+COMMIT_RETRIES = 200
+COMMIT_LOCK_STALE_SECONDS = 30
+STORAGE_ENV = "MODENHET_STORAGE"
+SQLITE_FILE = "modenhet_data.db"
+STORAGE_POLL_SECONDS = 1.0
+IO_WORKERS = 4
+IO_ACK_WAIT_SECONDS = 0.5      # så lenge venter Lagre på bekreftelse før lagringen vises som ventende
+IO_STALE_WAIT_SECONDS = 0.25   # så lenge venter en kjøring på ny lesing før forrige utgave vises
+IO_READ_WAIT_SECONDS = 10.0    # første lesing, når det ikke finnes noen tidligere utgave
+IO_POLL_SECONDS = 0.5
+METRICS_ENV = "MODENHET_METRICS"
+METRICS_PORT_ENV = "MODENHET_METRICS_PORT"
+ADMIN_CODE_ENV = "MODENHET_ADMIN_CODE"
+METRICS_FILE = "modenhet_metrics.prom"
+METRICS_HISTORY = 50
+METRICS_EXPORT_SECONDS = 10
+PROFILE_ENV = "MODENHET_PROFILE"
+PROFILE_DIR = "profiler"
+PROFILE_KEEP = 40
+PROFILE_TOP_N = 25
 
 # ============================================================================
 # FLERBRUKER-STOTTE
@@ -55,6 +154,15 @@ def get_session_id():
 def get_data_file():
     return DATA_FILE
 
+def get_commit_lock_file():
+    return COMMIT_LOCK_FILE
+
+def get_catalog_file():
+    return CATALOG_FILE
+
+def get_search_index_file():
+    return SEARCH_INDEX_FILE
+
 COLORS = {
     'primary_dark': '#172141',
     'primary': '#0053A6',
@@ -290,284 +398,2783 @@ questions_data = {
     ]
 }
 
+# ============================================================================
+# MÅLING AV KJØRINGER
+# ============================================================================
+METRICS_ENABLED = os.environ.get(METRICS_ENV, '') not in ('', '0')
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class MetricsRegistry:
+    """Histogrammer per måling og de siste kjøringene, delt av alle sesjoner i prosessen.
+    Hver kjøring av skriptet skjer i sin egen tråd, så målingene samles per tråd til kjøringen er ferdig."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.histograms = {}
+        self.reruns = deque(maxlen=METRICS_HISTORY)
+        self.last_export = 0.0
+
+    def start_rerun(self, session):
+        self.local.rerun = {'started': datetime.now().strftime('%H:%M:%S'), 'session': session, 'spans': [], 'start': time.perf_counter()}
+
+    def record(self, name, seconds):
+        rerun = getattr(self.local, 'rerun', None)
+        if rerun is not None:
+            rerun['spans'].append((name, seconds))
+        else:
+            with self.lock:
+                self.observe(name, seconds)
+
+    def finish_rerun(self):
+        rerun = getattr(self.local, 'rerun', None)
+        if rerun is None:
+            return
+        self.local.rerun = None
+        rerun['total'] = time.perf_counter() - rerun.pop('start')
+        with self.lock:
+            self.observe('rerun', rerun['total'])
+            for name, seconds in rerun['spans']:
+                self.observe(name, seconds)
+            self.reruns.append(rerun)
+            export = time.time() - self.last_export >= METRICS_EXPORT_SECONDS
+            if export:
+                self.last_export = time.time()
+        if export:
+            self.write_textfile(METRICS_FILE)
+
+    def observe(self, name, seconds):
+        # Kalles med låsen holdt
+        histogram = self.histograms.setdefault(name, {'buckets': [0] * (len(METRICS_BUCKETS) + 1), 'sum': 0.0, 'count': 0})
+        histogram['buckets'][bisect.bisect_left(METRICS_BUCKETS, seconds)] += 1
+        histogram['sum'] += seconds
+        histogram['count'] += 1
+
+    def quantile(self, histogram, q):
+        # Øvre grense for bøtten der kvantilen ligger
+        target = q * histogram['count']
+        cumulative = 0
+        for bound, count in zip(METRICS_BUCKETS, histogram['buckets']):
+            cumulative += count
+            if cumulative >= target:
+                return bound
+        return float('inf')
+
+    def summary(self):
+        with self.lock:
+            return [{'name': name, 'count': h['count'], 'mean': h['sum'] / h['count'],
+                     'p50': self.quantile(h, 0.5), 'p95': self.quantile(h, 0.95)}
+                    for name, h in sorted(self.histograms.items())]
+
+    def recent_reruns(self):
+        with self.lock:
+            return list(self.reruns)
+
+    def prometheus_text(self):
+        lines = ["# HELP modenhet_span_seconds Tid brukt per måling i kjøringer av appen",
+                 "# TYPE modenhet_span_seconds histogram"]
+        with self.lock:
+            for name, histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(METRICS_BUCKETS, histogram['buckets']):
+                    cumulative += count
+                    lines.append(f'modenhet_span_seconds_bucket{{span="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'modenhet_span_seconds_bucket{{span="{name}",le="+Inf"}} {histogram["count"]}')
+                lines.append(f'modenhet_span_seconds_sum{{span="{name}"}} {histogram["sum"]:.6f}')
+                lines.append(f'modenhet_span_seconds_count{{span="{name}"}} {histogram["count"]}')
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        # Til node_exporter sin textfile-collector; skrives atomisk
+        try:
+            tmp_file = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                f.write(self.prometheus_text())
+            os.replace(tmp_file, path)
+        except Exception as e:
+            print(f"Målinger kunne ikke lagres: {e}")
+
+def start_metrics_server(registry, port):
+    # /metrics i Prometheus-format fra en bakgrunnstråd
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.prometheus_text().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    try:
+        server = ThreadingHTTPServer(('', port), MetricsHandler)
+    except OSError as e:
+        print(f"Målepunkt på port {port} kunne ikke startes: {e}")
+        return
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+@st.cache_resource
+def get_metrics():
+    registry = MetricsRegistry()
+    port = os.environ.get(METRICS_PORT_ENV)
+    if port:
+        start_metrics_server(registry, int(port))
+    return registry
+
+def timed(fn):
+    """Registrer tiden funksjonen bruker når måling er slått på (MODENHET_METRICS=1).
+    Uten måling returneres funksjonen uendret, så den koster ingenting."""
+    if not METRICS_ENABLED:
+        return fn
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            get_metrics().record(fn.__name__, time.perf_counter() - start)
+    return wrapper
+
+def record_duration(name, seconds):
+    if METRICS_ENABLED:
+        get_metrics().record(name, seconds)
+
+PROFILE_SETTING = os.environ.get(PROFILE_ENV, '').strip()
+
+@st.cache_resource
+def get_profile_targets():
+    # Initiativer som administratorer har slått på profilering for, delt av alle sesjoner
+    return set()
+
+def should_profile():
+    if st.session_state.get('profile_session'):
+        return True
+    if PROFILE_SETTING in ('1', 'all'):
+        return True
+    current = st.session_state.get('current_project')
+    if current is None:
+        return False
+    targets = {init_id.strip() for init_id in PROFILE_SETTING.split(',') if init_id.strip()}
+    return current in targets or current in get_profile_targets()
+
+_tracemalloc_users = {'count': 0, 'started': False}  # profiler som bruker tracemalloc nå, og om vi startet den
+_tracemalloc_lock = threading.Lock()
+
+class RerunProfiler:
+    """cProfile og tracemalloc for én kjøring. cProfile måler bare kjøringens egen tråd;
+    tracemalloc er felles for prosessen, så samtidige sesjoner kan synes i minneprofilen.
+    Den startes av første profiler og stoppes når siste er ferdig (tellingen i _tracemalloc_users)."""
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+        self.tracing = False
+
+    def start(self):
+        with _tracemalloc_lock:
+            if _tracemalloc_users['count'] == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _tracemalloc_users['started'] = True
+            _tracemalloc_users['count'] += 1
+            self.tracing = True
+        self.profile.enable()
+
+    def release(self):
+        # Øyeblikksbildet før referansen gis fra seg; siste profiler stopper tracemalloc hvis den startet den
+        with _tracemalloc_lock:
+            if not self.tracing:
+                return None
+            self.tracing = False
+            snapshot = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+            _tracemalloc_users['count'] -= 1
+            if _tracemalloc_users['count'] == 0 and _tracemalloc_users['started']:
+                tracemalloc.stop()
+                _tracemalloc_users['started'] = False
+            return snapshot
+
+    def stop(self, label):
+        """Lagre profilen og returner sammendraget. Feil i profileringen skal aldri stoppe siden."""
+        try:
+            self.profile.disable()
+            snapshot = self.release()
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            base = os.path.join(PROFILE_DIR, label)
+            self.profile.dump_stats(f"{base}.prof")
+
+            out = StringIO()
+            pstats.Stats(self.profile, stream=out).strip_dirs().sort_stats('cumulative').print_stats(PROFILE_TOP_N)
+            lines = [f"Profil {label}", out.getvalue().strip(), ""]
+            if snapshot is not None:
+                snapshot.dump(f"{base}.tracemalloc")
+                lines.append(f"Minne (tracemalloc), topp {PROFILE_TOP_N} linjer:")
+                for stat in snapshot.statistics('lineno')[:PROFILE_TOP_N]:
+                    frame = stat.traceback[0]
+                    lines.append(f"  {os.path.basename(frame.filename)}:{frame.lineno}  {stat.size / 1024:.1f} kB i {stat.count} blokker")
+            summary = "\n".join(lines)
+            with open(f"{base}.txt", 'w', encoding='utf-8') as f:
+                f.write(summary)
+            prune_profiles()
+            return summary
+        except Exception as e:
+            self.release()
+            print(f"Profilen kunne ikke lagres: {e}")
+            return f"Profilen kunne ikke lagres: {e}"
+
+def prune_profiles(keep=PROFILE_KEEP):
+    # Behold bare de nyeste profilene; hver profil består av .prof, .tracemalloc og .txt
+    try:
+        runs = {}
+        for name in os.listdir(PROFILE_DIR):
+            base, ext = os.path.splitext(name)
+            if ext in ('.prof', '.tracemalloc', '.txt'):
+                runs.setdefault(base, []).append(os.path.join(PROFILE_DIR, name))
+        ordered = sorted(runs, key=lambda base: max(os.path.getmtime(path) for path in runs[base]))
+        for base in ordered[:-keep] if len(ordered) > keep else []:
+            for path in runs[base]:
+                os.remove(path)
+    except OSError as e:
+        print(f"Gamle profiler kunne ikke slettes: {e}")
+
+def backoff(attempt):
+    # Tilfeldig, voksende pause før nytt skriveforsøk; returnerer ventetiden
+    delay = random.uniform(0.002, 0.01) * min(attempt + 1, 10)
+    time.sleep(delay)
+    return delay
+
+# ============================================================================
+# SKJEMA OG MIGRERING
+# ============================================================================
+# Hvert initiativ har skjemaversjonen det er lagret med. Migreringene kjøres én gang per lager
+# (migrate_storage); deretter kan resten av koden gå ut fra at alle felt finnes.
+SCHEMA_VERSION = 2
+MIGRATION_MAX_PROBLEMS = 200
+
+INITIATIVE_FIELDS = {'name': '', 'description': '', 'access_code': '', 'created': '', 'modified': '', 'version': 0}
+BENEFIT_FIELDS = {'name': '', 'created': ''}
+INTERVIEW_FIELDS = {'recommended_questions': [], 'responses': {}, 'version': 0, 'modified': ''}
+INTERVIEW_INFO_FIELDS = {'interviewer': '', 'interviewee': '', 'role': '', 'date': '', 'benefit_id': 'all', 'benefit_name': 'Generelt',
+                         'focus_mode': "Alle sporsmal", 'selected_role': None, 'selected_params': []}
+RESPONSE_FIELDS = {'score': 0, 'notes': ''}
+
+MIGRATIONS = []  # (versjon, beskrivelse, funksjon(initiativ, tellinger)) i stigende rekkefølge
+
+def migration(version, description):
+    def register(migrate):
+        MIGRATIONS.append((version, description, migrate))
+        return migrate
+    return register
+
+def fill_fields(record, fields, path, counts):
+    for field, default in fields.items():
+        if field not in record:
+            record[field] = copy.copy(default)
+            counts[f"{path}.{field}"] += 1
+
+def complete_interview(interview, counts):
+    # Felles for migrering og nye intervjuer: alle felt finnes etterpå
+    fill_fields(interview, INTERVIEW_FIELDS, 'intervju', counts)
+    info = interview.setdefault('info', {})
+    if 'phase' not in info:
+        # Fasen kan som regel leses av svarene
+        info['phase'] = next(iter(interview['responses']), PHASES[0])
+        counts['intervju.info.phase'] += 1
+    fill_fields(info, INTERVIEW_INFO_FIELDS, 'intervju.info', counts)
+    for questions in interview['responses'].values():
+        for response in questions.values():
+            fill_fields(response, RESPONSE_FIELDS, 'svar', counts)
+
+@migration(1, "Manglende felt i initiativer, gevinster, intervjuer og svar får standardverdier")
+def migrate_fill_fields(initiative, counts):
+    fill_fields(initiative, INITIATIVE_FIELDS, 'initiativ', counts)
+    fill_fields(initiative, {'benefits': {}, 'interviews': {}}, 'initiativ', counts)
+    for benefit in initiative['benefits'].values():
+        fill_fields(benefit, BENEFIT_FIELDS, 'gevinst', counts)
+    for interview in initiative['interviews'].values():
+        complete_interview(interview, counts)
+
+@migration(2, "Oppsummering per intervju (besvarte, sum, dekning per fase, notater)")
+def migrate_interview_summaries(initiative, counts):
+    for interview in initiative['interviews'].values():
+        interview['summary'] = summarize_interview(interview)
+        counts['intervju.summary'] += 1
+
+def upgrade_initiative(initiative, report=None):
+    """Kjør migreringene initiativet mangler, i rekkefølge. Returnerer True hvis det var noe å gjøre.
+    report (valgfri) får tellinger per migrering: {versjon: Counter}."""
+    schema = initiative.get('schema', 0)
+    if schema == SCHEMA_VERSION:
+        return False
+    for version, _, migrate in MIGRATIONS:
+        if version > schema:
+            migrate(initiative, report.setdefault(version, Counter()) if report is not None else Counter())
+    initiative['schema'] = SCHEMA_VERSION
+    return True
+
+def upgrade_dataset(data, report=None):
+    # Datafilen: eldre nøkler på toppnivå, deretter hvert initiativ
+    if 'projects' in data and 'initiatives' not in data:
+        data['initiatives'] = data.pop('projects')
+    data.setdefault('initiatives', {})
+    data.setdefault('generation', 0)
+    for initiative in data['initiatives'].values():
+        upgrade_initiative(initiative, report)
+    data['schema'] = SCHEMA_VERSION
+    return data
+
+def decode_initiative(blob):
+    # Ett lagret initiativ; eldre utgaver (ikke migrert ennå, eller fra en sikkerhetskopi) oppgraderes i minnet
+    initiative = pickle.loads(blob)
+    upgrade_initiative(initiative)
+    return initiative
+
+def validate_initiative(init_id, initiative):
+    # Avvik migreringen ikke retter, fordi riktig verdi ikke kan utledes
+    problems = []
+    for iid, interview in initiative['interviews'].items():
+        if interview['info']['phase'] not in PHASES:
+            problems.append(f"{init_id}/{iid}: ukjent fase '{interview['info']['phase']}'")
+        for phase, questions in interview['responses'].items():
+            if phase not in PHASES:
+                problems.append(f"{init_id}/{iid}: svar i ukjent fase '{phase}'")
+            for q_id, response in questions.items():
+                if not str(q_id).isdigit():
+                    problems.append(f"{init_id}/{iid}/{phase}: ugyldig spørsmål '{q_id}'")
+                if not isinstance(response['score'], int) or not 0 <= response['score'] <= 5:
+                    problems.append(f"{init_id}/{iid}/{phase}/{q_id}: ugyldig score {response['score']!r}")
+                if not isinstance(response['notes'], str):
+                    problems.append(f"{init_id}/{iid}/{phase}/{q_id}: notat er ikke tekst")
+    return problems
+
+def new_migration_report(dry_run):
+    return {'schema': SCHEMA_VERSION, 'dry_run': dry_run, 'checked': 0, 'migrated': 0, 'conflicts': 0,
+            'steps': {}, 'problems': [], 'problem_count': 0}
+
+@timed
+def migrate_storage(storage, dry_run=False):
+    """Migrer alle initiativer som er lagret med eldre skjema, ett og ett (lageret leses som strøm der det går).
+    Migrerte initiativer skrives med versjonssjekk i grupper; et initiativ som ble endret av andre i mellomtiden
+    telles som konflikt og migreres ved neste kjøring. Med dry_run skrives ingenting, og rapporten viser hva som ville skjedd."""
+    report = new_migration_report(dry_run)
+    batch = []
+    at = datetime.now().isoformat()
+    for init_id, initiative in storage.iter_stored_initiatives():
+        report['checked'] += 1
+        if upgrade_initiative(initiative, report['steps']):
+            report['migrated'] += 1
+            batch.append({'op': 'migrate', 'init_id': init_id, 'value': initiative, 'base_version': initiative['version'], 'at': at})
+        problems = validate_initiative(init_id, initiative)
+        report['problem_count'] += len(problems)
+        report['problems'].extend(problems[:MIGRATION_MAX_PROBLEMS - len(report['problems'])])
+        if storage.migration_batch and len(batch) >= storage.migration_batch and not dry_run:
+            report['conflicts'] += len(storage.apply_edits(batch)['conflict'])
+            batch = []
+    if batch and not dry_run:
+        report['conflicts'] += len(storage.apply_edits(batch)['conflict'])
+    return report
+
+def describe_migration_report(report):
+    # Rapporten som tekstlinjer, for kommandolinjen og loggen
+    lines = [f"Skjemaversjon {report['schema']}: {report['checked']} initiativer sjekket, "
+             f"{report['migrated']} {'ville blitt migrert' if report['dry_run'] else 'migrert'}"
+             + (f", {report['conflicts']} endret av andre underveis" if report['conflicts'] else "")]
+    for version, description, _ in MIGRATIONS:
+        counts = report['steps'].get(version)
+        if counts:
+            lines.append(f"  {version}. {description}")
+            lines.extend(f"       {field}: {count}" for field, count in sorted(counts.items()))
+    if report['problem_count']:
+        lines.append(f"  {report['problem_count']} avvik som må rettes manuelt:")
+        lines.extend(f"    {problem}" for problem in report['problems'])
+        if report['problem_count'] > len(report['problems']):
+            lines.append(f"    ... og {report['problem_count'] - len(report['problems'])} til")
+    return lines
+
 # ============================================================================
 # DATALAGRING MED FLERBRUKER-STOTTE
 # ============================================================================
+class CorruptDataError(Exception):
+    """Filen er skadet eller avkortet: innholdet stemmer ikke med lengden eller sjekksummen i hodet"""
+
+def fsync_dir(path):
+    # Selve utbyttingen (katalogoppføringen) skrives til disk; ikke mulig på alle plattformer
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def write_snapshot(path, obj, schema=SCHEMA_VERSION):
+    """Skriv obj med hode (format, skjemaversjon, sjekksum, lengde) til en midlertidig fil, fsync og bytt ut.
+    Etter et krasj finnes enten forrige eller ny utgave på disk, aldri en halvskrevet fil."""
+    payload = pickle.dumps(obj, pickle.HIGHEST_PROTOCOL)
+    tmp_file = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_file, 'wb') as f:
+        f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_FORMAT, schema, zlib.crc32(payload), len(payload)))
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, path)
+    fsync_dir(path)
+
+def read_snapshot(f):
+    """(innhold, skjemaversjon) fra en åpen fil. Filer skrevet før hodet fantes leses som ren pickle, med skjema None.
+    Kaster CorruptDataError hvis filen ikke kan leses eller ikke stemmer med hodet."""
+    name = os.path.basename(f.name)
+    header = f.read(SNAPSHOT_HEADER.size)
+    if not header.startswith(SNAPSHOT_MAGIC):
+        f.seek(0)
+        try:
+            return pickle.load(f), None
+        except Exception as e:
+            raise CorruptDataError(f"{name} er skadet ({type(e).__name__}: {e})") from e
+    if len(header) < SNAPSHOT_HEADER.size:
+        raise CorruptDataError(f"{name} er avkortet")
+    _, snapshot_format, schema, checksum, length = SNAPSHOT_HEADER.unpack(header)
+    if snapshot_format > SNAPSHOT_FORMAT:
+        raise CorruptDataError(f"{name} har ukjent format {snapshot_format}")
+    payload = f.read(length)
+    if len(payload) != length:
+        raise CorruptDataError(f"{name} er avkortet ({len(payload)} av {length} byte)")
+    if zlib.crc32(payload) != checksum:
+        raise CorruptDataError(f"{name} er skadet (feil sjekksum)")
+    return pickle.loads(payload), schema
+
+def load_snapshot(path):
+    # Innholdet i en fil skrevet med write_snapshot, eller None hvis den ikke finnes; skade kastes videre
+    try:
+        with open(path, 'rb') as f:
+            return read_snapshot(f)[0]
+    except FileNotFoundError:
+        return None
+
 def ensure_backup_dir():
     # Opprett backup-mappe
     if not os.path.exists(BACKUP_DIR):
         os.makedirs(BACKUP_DIR)
 
-def create_backup():
-    # Lag backup av datafilen
-    data_file = get_data_file()
-    if os.path.exists(data_file):
+def get_backup_index_file():
+    return os.path.join(BACKUP_DIR, BACKUP_INDEX_FILE)
+
+def load_backup_index():
+    """Indeks over sikkerhetskopiene. 'backups' er tidspunktene det finnes en fullstendig utgave for,
+    og 'timeline' har for hvert initiativ utgavene i tidsrekkefølge som (tidspunkt, fil, posisjon, lengde, versjon, crc32).
+    Fil None betyr at initiativet var slettet på det tidspunktet. En skadet indeks gir CorruptDataError."""
+    index = load_snapshot(get_backup_index_file())
+    if index is not None and index['format'] < BACKUP_FORMAT:
+        # Format 1 hadde ikke sjekksum per segment; de eldre segmentene leses uten kontroll
+        for records in index['timeline'].values():
+            records[:] = [record + (None,) for record in records]
+        index['format'] = BACKUP_FORMAT
+    return index
+
+def append_backup(index, data, at):
+    # Skriv initiativer med ny versjon som egne segmenter i én ny fil; uendrede initiativer peker fortsatt til tidligere segmenter
+    timeline = index['timeline']
+    changed = [(init_id, initiative) for init_id, initiative in data['initiatives'].items()
+               if init_id not in timeline or timeline[init_id][-1][1] is None or timeline[init_id][-1][4] != initiative['version']]
+    deleted = [init_id for init_id, records in timeline.items() if records[-1][1] is not None and init_id not in data['initiatives']]
+    if changed:
+        file_name = f"backup_{datetime.fromisoformat(at).strftime('%Y%m%d_%H%M%S_%f')}_{uuid.uuid4().hex[:6]}.seg"
+        with open(os.path.join(BACKUP_DIR, file_name), 'wb') as f:
+            for init_id, initiative in changed:
+                blob = pickle.dumps(initiative, pickle.HIGHEST_PROTOCOL)
+                timeline.setdefault(init_id, []).append((at, file_name, f.tell(), len(blob), initiative['version'], zlib.crc32(blob)))
+                f.write(blob)
+            f.flush()
+            os.fsync(f.fileno())
+    for init_id in deleted:
+        timeline[init_id].append((at, None, 0, 0, None, None))
+    index['backups'].append({'at': at, 'generation': data['generation']})
+
+def thin_history(items, at_of, recent, oldest):
+    # Behold alt nyere enn recent, deretter siste per dag, og før oldest bare den siste (den gjelder fortsatt)
+    kept = []
+    for item, following in zip(items, items[1:] + [None]):
+        at = at_of(item)
+        if following is not None and at < recent:
+            following_at = at_of(following)
+            if following_at < oldest or following_at[:10] == at[:10]:
+                continue
+        kept.append(item)
+    return kept
+
+def prune_backups(index, now):
+    recent = (now - timedelta(hours=BACKUP_KEEP_ALL_HOURS)).isoformat()
+    oldest = (now - timedelta(days=BACKUP_KEEP_DAYS)).isoformat()
+    index['backups'] = thin_history(index['backups'], lambda backup: backup['at'], recent, oldest)
+    for init_id, records in list(index['timeline'].items()):
+        records = thin_history(records, lambda record: record[0], recent, oldest)
+        if len(records) == 1 and records[0][1] is None and records[0][0] < oldest:
+            del index['timeline'][init_id]
+        else:
+            index['timeline'][init_id] = records
+    referenced = {record[1] for records in index['timeline'].values() for record in records}
+    for name in os.listdir(BACKUP_DIR):
+        if name.endswith('.seg') and name not in referenced:
+            try:
+                os.remove(os.path.join(BACKUP_DIR, name))
+            except OSError:
+                pass
+
+def convert_legacy_backups():
+    """Ny indeks, med eldre sikkerhetskopier (hele datafilen som pickle) tatt inn én gang, eldste først.
+    En slik kopi inneholder utgaven fra før en skriving, og endringstiden er da når den utgaven ble skrevet."""
+    index = {'format': BACKUP_FORMAT, 'backups': [], 'timeline': {}}
+    paths = [os.path.join(BACKUP_DIR, name) for name in os.listdir(BACKUP_DIR) if name.startswith('backup_') and name.endswith('.pkl')]
+    for path in sorted(paths, key=os.path.getmtime):
+        data = load_pickle(path)
+        if data is not None:
+            append_backup(index, upgrade_dataset(data), datetime.fromtimestamp(os.path.getmtime(path)).isoformat(timespec='microseconds'))
+    return index
+
+@timed
+def create_backup(data):
+    """Sikkerhetskopi av utgaven som nettopp ble skrevet. Kalles under skrivelåsen.
+    Bare initiativer med ny versjon skrives, så en lagring koster omtrent det endrede initiativet."""
+    try:
         ensure_backup_dir()
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_path = os.path.join(BACKUP_DIR, f"backup_{timestamp}.pkl")
-        try:
-            shutil.copy2(data_file, backup_path)
-            backups = sorted([f for f in os.listdir(BACKUP_DIR) if f.endswith('.pkl')])
-            while len(backups) > 50:
-                os.remove(os.path.join(BACKUP_DIR, backups.pop(0)))
-        except Exception as e:
-            print(f"Backup feilet: {e}")
+        index = load_backup_index() or convert_legacy_backups()
+        now = datetime.now()
+        append_backup(index, data, now.isoformat(timespec='microseconds'))
+        prune_backups(index, now)
+        write_snapshot(get_backup_index_file(), index)
+    except Exception as e:
+        print(f"Backup feilet: {e}")
+
+def ensure_backup_index():
+    # Indeksen, bygget fra eldre sikkerhetskopier hvis den mangler (under skrivelåsen, som create_backup)
+    try:
+        index = load_backup_index()
+    except CorruptDataError as e:
+        print(f"Sikkerhetskopiene kan ikke brukes: {e}")
+        return None
+    if index is not None or not os.path.isdir(BACKUP_DIR):
+        return index
+    for attempt in range(COMMIT_RETRIES):
+        if acquire_commit_lock():
+            try:
+                index = load_backup_index() or convert_legacy_backups()
+                write_snapshot(get_backup_index_file(), index)
+                return index
+            finally:
+                release_commit_lock()
+        backoff(attempt)
+    return None
+
+def initiative_at(index, init_id, when):
+    """Initiativet slik det var på tidspunktet when (ISO-tekst), eller None hvis det ikke fantes.
+    Bare segmentet for dette initiativet leses fra kopien."""
+    records = index['timeline'].get(init_id, []) if index else []
+    pos = bisect.bisect_right(records, when, key=lambda record: record[0])
+    if pos == 0 or records[pos - 1][1] is None:
+        return None
+    return read_segment(records[pos - 1])
+
+def read_segment(record):
+    # Ett initiativ fra en sikkerhetskopi; None hvis segmentet mangler eller ikke stemmer med sjekksummen
+    _, file_name, offset, length, _, checksum = record
+    try:
+        with open(os.path.join(BACKUP_DIR, file_name), 'rb') as f:
+            f.seek(offset)
+            blob = f.read(length)
+    except OSError:
+        return None
+    if len(blob) != length or (checksum is not None and zlib.crc32(blob) != checksum):
+        return None
+    return decode_initiative(blob)
+
+@timed
+def find_recovery_point():
+    """Nyeste gyldige utgave av datasettet, funnet via indeksen over sikkerhetskopiene (ingen gjennomgang av filene):
+    for hvert initiativ siste segment med riktig sjekksum. 'damaged' er initiativer der siste segment var skadet,
+    så en eldre utgave (eller ingen) er brukt. None hvis det ikke finnes noen brukbar indeks."""
+    try:
+        index = load_backup_index()
+    except CorruptDataError as e:
+        print(f"Sikkerhetskopiene kan ikke brukes: {e}")
+        return None
+    if not index or not index['backups']:
+        return None
+    data = {'initiatives': {}, 'generation': index['backups'][-1]['generation'], 'schema': SCHEMA_VERSION}
+    damaged = []
+    for init_id, records in index['timeline'].items():
+        if records[-1][1] is None:
+            continue
+        for record in reversed(records):
+            initiative = read_segment(record) if record[1] is not None else None
+            if initiative is not None or record[1] is None:
+                break
+        if initiative is not None:
+            data['initiatives'][init_id] = initiative
+        if record is not records[-1] or initiative is None:
+            damaged.append(init_id)
+    return {'data': data, 'at': index['backups'][-1]['at'], 'damaged': damaged}
+
+def file_token(stat_result):
+    # Identifiserer en bestemt utgave av datafilen; hver skriving gir ny inode via os.replace
+    return (stat_result.st_ino, stat_result.st_mtime_ns, stat_result.st_size)
+
+def get_data_token():
+    try:
+        return file_token(os.stat(get_data_file()))
+    except FileNotFoundError:
+        return None
+
+def read_data_with_token():
+    """Les datafilen sammen med token for utgaven som ble lest. En skadet fil gir CorruptDataError."""
+    try:
+        with open(get_data_file(), 'rb') as f:
+            token = file_token(os.fstat(f.fileno()))
+            data, schema = read_snapshot(f)
+    except FileNotFoundError:
+        return upgrade_dataset({}), None
+    if schema != SCHEMA_VERSION:
+        upgrade_dataset(data)
+    return data, token
 
+@timed
 def load_data():
-    """Last data fra fil med filelock for sikker lesing"""
-    data_file = get_data_file()
-    if os.path.exists(data_file):
+    """Last data fra fil. Skriving skjer med atomisk utbytting, så lesing trenger ingen las.
+    Lesefeil og skade kastes videre i stedet for å bli til tomme data."""
+    return read_data_with_token()[0]
+
+_commit_lock = threading.local()  # låsen denne tråden holder: fildeskriptor (flock) eller eier-tekst (låsefil)
+
+def acquire_commit_lock():
+    """Kortvarig eksklusiv las rundt sammenligning og utbytting av datafilen (kun standardbiblioteket).
+    Med fcntl holder operativsystemet låsen til den slippes eller prosessen stopper, så en lang skriving mister den aldri.
+    Ellers er låsen en fil med eieren i; en etterlatt lås fjernes bare hvis den fortsatt har samme eier."""
+    lock_file = get_commit_lock_file()
+    if FCNTL_AVAILABLE:
+        fd = os.open(lock_file, os.O_CREAT | os.O_RDWR)
         try:
-            if FILELOCK_AVAILABLE:
-                lock = FileLock(LOCK_FILE, timeout=5)
-                with lock:
-                    with open(data_file, 'rb') as f:
-                        data = pickle.load(f)
-            else:
-                with open(data_file, 'rb') as f:
-                    data = pickle.load(f)
-            
-            if 'projects' in data and 'initiatives' not in data:
-                data['initiatives'] = data['projects']
-                del data['projects']
-            if 'initiatives' not in data:
-                data['initiatives'] = {}
-            return data
-        except:
-            pass
-    return {'initiatives': {}}
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        _commit_lock.fd = fd
+        return True
+    owner = f"{os.getpid()} {threading.get_ident()} {uuid.uuid4().hex} {time.time()}"
+    try:
+        fd = os.open(lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        remove_stale_commit_lock(lock_file)
+        return False
+    os.write(fd, owner.encode())
+    os.close(fd)
+    _commit_lock.owner = owner
+    return True
+
+def remove_stale_commit_lock(lock_file):
+    # Etterlatt av en prosess som stoppet midt i en skriving. Eieren leses før og etter alderssjekken, så en lås
+    # som en annen skriver har tatt i mellomtiden ikke fjernes.
+    try:
+        with open(lock_file, 'rb') as f:
+            owner = f.read()
+            stale = time.time() - os.fstat(f.fileno()).st_mtime > COMMIT_LOCK_STALE_SECONDS
+        if stale:
+            with open(lock_file, 'rb') as f:
+                if f.read() == owner:
+                    os.remove(lock_file)
+    except OSError:
+        pass
+
+def release_commit_lock():
+    if FCNTL_AVAILABLE:
+        fd = getattr(_commit_lock, 'fd', None)
+        if fd is not None:
+            _commit_lock.fd = None
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+        return
+    owner = getattr(_commit_lock, 'owner', None)
+    _commit_lock.owner = None
+    try:
+        # Bare vår egen lås; en som er fjernet som etterlatt og tatt av en annen skriver, står
+        with open(get_commit_lock_file(), 'rb') as f:
+            if f.read().decode() != owner:
+                return
+        os.remove(get_commit_lock_file())
+    except OSError:
+        pass
+
+def write_data_if_unchanged(data, token):
+    """Compare-and-swap på filnivå: skriv bare hvis filen fortsatt er utgaven vi leste.
+    Returnerer token for den nye utgaven ved suksess, None hvis filen er endret eller låst av en annen skriver."""
+    if not acquire_commit_lock():
+        return None
+    try:
+        if get_data_token() != token:
+            return None
+        write_snapshot(get_data_file(), data)
+        create_backup(data)
+        return get_data_token()
+    finally:
+        release_commit_lock()
 
 def save_data(data):
-    # Lagre data til fil med las
-    data_file = get_data_file()
-    if FILELOCK_AVAILABLE:
-        lock = FileLock(LOCK_FILE, timeout=10)
-        try:
-            with lock:
-                create_backup()
-                with open(data_file, 'wb') as f:
-                    pickle.dump(data, f)
-        except Exception as e:
-            st.error(f"Feil ved lagring: {e}")
+    # Skriv hele datasettet uten versjonskontroll (brukes ved gjenoppretting)
+    for attempt in range(COMMIT_RETRIES):
+        data_token = write_data_if_unchanged(data, get_data_token())
+        if data_token is not None:
+            refresh_indexes(data, data_token)
+            return True
+        backoff(attempt)
+    st.error("Feil ved lagring: datafilen er opptatt")
+    return False
+
+def same_response(a, b):
+    a = a or RESPONSE_FIELDS
+    b = b or RESPONSE_FIELDS
+    return a['score'] == b['score'] and a['notes'] == b['notes']
+
+def bump_version(record, at):
+    record['version'] += 1
+    record['modified'] = at
+
+def add_to_summary(summary, phase, response, sign=1):
+    # Legg til (sign=1) eller trekk fra (sign=-1) ett svar i intervjuets oppsummering
+    if not response:
+        return
+    if response['score'] > 0:
+        summary['answered'] += sign
+        summary['score_sum'] += sign * response['score']
+        count = summary['phases'].get(phase, 0) + sign
+        if count:
+            summary['phases'][phase] = count
+        else:
+            summary['phases'].pop(phase, None)
+    if response['notes'].strip():
+        summary['notes'] += sign
+
+def summarize_interview(interview):
+    """Oppsummering av ett intervju: antall besvarte spørsmål, sum av score, besvarte per fase,
+    antall svar med notater og sist endret. Holdes oppdatert av apply_edit, så oversikter slipper å gå gjennom svarene."""
+    summary = {'answered': 0, 'score_sum': 0, 'phases': {}, 'notes': 0, 'modified': interview['modified']}
+    for phase, questions in interview['responses'].items():
+        for response in questions.values():
+            add_to_summary(summary, phase, response)
+    return summary
+
+def summary_avg(summary):
+    return summary['score_sum'] / summary['answered'] if summary['answered'] else 0
+
+def apply_edit(data, edit):
+    """Bruk én endring på datasettet med compare-and-swap mot postens versjon.
+    Er versjonen endret siden endringen ble laget, godtas den likevel hvis akkurat
+    det feltet/svaret er uendret (disjunkte endringer). Returnerer 'applied', 'noop' eller 'conflict'."""
+    op = edit['op']
+    initiatives = data['initiatives']
+    initiative = initiatives.get(edit['init_id'])
+
+    if op == 'initiative':
+        if initiative is None:
+            if edit['base_version'] is not None:
+                return 'conflict'
+            initiative = initiatives[edit['init_id']] = dict(copy.deepcopy(INITIATIVE_FIELDS), benefits={}, interviews={}, schema=SCHEMA_VERSION)
+        elif initiative['version'] != edit['base_version']:
+            current = {field: initiative.get(field) for field in edit['fields']}
+            if current != edit['base'] and current != edit['fields']:
+                return 'conflict'
+        initiative.update(copy.deepcopy(edit['fields']))
+        bump_version(initiative, edit['at'])
+        return 'applied'
+
+    if op == 'delete_initiative':
+        if initiative is None:
+            return 'noop'
+        if initiative['version'] != edit['base_version']:
+            return 'conflict'
+        del initiatives[edit['init_id']]
+        return 'applied'
+
+    if op == 'migrate':
+        # Samme innhold i nytt skjema (se migrate_storage): ny versjon, så alle lagre skriver det, men uendret endringstid
+        if initiative is None or initiative['version'] != edit['base_version']:
+            return 'conflict'
+        initiatives[edit['init_id']] = dict(edit['value'], version=edit['base_version'] + 1)
+        return 'applied'
+
+    if initiative is None:
+        return 'conflict'
+
+    if op == 'benefit':
+        benefits = initiative['benefits']
+        if edit['value'] is None:
+            if edit['benefit_id'] not in benefits:
+                return 'noop'
+            del benefits[edit['benefit_id']]
+        else:
+            benefits[edit['benefit_id']] = dict(BENEFIT_FIELDS, **copy.deepcopy(edit['value']))
+    elif op == 'interview':
+        if edit['interview_id'] in initiative['interviews']:
+            return 'conflict'
+        interview = copy.deepcopy(edit['value'])
+        interview['version'] = 0
+        complete_interview(interview, Counter())
+        bump_version(interview, edit['at'])
+        interview['summary'] = summarize_interview(interview)
+        initiative['interviews'][edit['interview_id']] = interview
+    elif op == 'response':
+        interview = initiative['interviews'].get(edit['interview_id'])
+        if interview is None:
+            return 'conflict'
+        responses = interview['responses'].setdefault(edit['phase'], {})
+        current = responses.get(edit['q_id'])
+        if interview['version'] != edit['base_version']:
+            if same_response(current, edit['value']):
+                return 'noop'
+            if not same_response(current, edit['base']):
+                return 'conflict'
+        summary = interview['summary']
+        add_to_summary(summary, edit['phase'], current, -1)
+        responses[edit['q_id']] = dict(RESPONSE_FIELDS, **edit['value'])
+        add_to_summary(summary, edit['phase'], responses[edit['q_id']])
+        bump_version(interview, edit['at'])
+        summary['modified'] = interview['modified']
     else:
-        try:
-            create_backup()
-            with open(data_file, 'wb') as f:
-                pickle.dump(data, f)
-        except Exception as e:
-            st.error(f"Feil ved lagring: {e}")
+        raise ValueError(f"Ukjent endringstype: {op}")
+    bump_version(initiative, edit['at'])
+    return 'applied'
 
+def apply_edits(data, edits):
+    results = {'applied': [], 'noop': [], 'conflict': []}
+    for edit in edits:
+        results[apply_edit(data, edit)].append(edit)
+    return results
+
+@timed
+def commit_edits(edits):
+    """Skriv endringer med optimistisk samtidighetskontroll.
+    Leser filen, bruker endringene med versjonssjekk og bytter ut filen bare hvis ingen
+    andre har skrevet i mellomtiden; ellers leses filen på nytt og endringene prøves igjen.
+    Konflikter på samme svar/felt returneres i stedet for å overskrive andres data."""
+    started = time.perf_counter()
+    lock_wait = 0.0
+    for attempt in range(COMMIT_RETRIES):
+        data, token = read_data_with_token()
+        results = apply_edits(data, edits)
+        results.update({'attempts': attempt + 1, 'lock_wait': lock_wait})
+        if not results['applied']:
+            results.update({'data': data, 'data_token': token, 'generation': data['generation'], 'wait': time.perf_counter() - started})
+            return results
+        data['generation'] += 1
+        data_token = write_data_if_unchanged(data, token)
+        if data_token is not None:
+            refresh_indexes(data, data_token)
+            results.update({'data': data, 'data_token': data_token, 'generation': data['generation'], 'wait': time.perf_counter() - started})
+            return results
+        lock_wait += backoff(attempt)
+    raise TimeoutError(f"Datafilen ble endret av andre under {COMMIT_RETRIES} forsøk")
+
+def stage_edit(edit):
+    # Legg endringen i køen for neste lagring og vis den med en gang i sesjonens data
+    edit['at'] = datetime.now().isoformat()
+    apply_edit(st.session_state.app_data, edit)
+    st.session_state.setdefault('pending_edits', []).append(edit)
+
+def stage_initiative(init_id, fields):
+    initiative = st.session_state.app_data['initiatives'].get(init_id)
+    stage_edit({
+        'op': 'initiative', 'init_id': init_id, 'fields': fields,
+        'base': {field: initiative.get(field) for field in fields} if initiative else None,
+        'base_version': initiative['version'] if initiative else None
+    })
+
+def stage_delete_initiative(init_id):
+    initiative = st.session_state.app_data['initiatives'][init_id]
+    stage_edit({'op': 'delete_initiative', 'init_id': init_id, 'base_version': initiative['version']})
+
+def stage_benefit(init_id, benefit_id, benefit):
+    stage_edit({'op': 'benefit', 'init_id': init_id, 'benefit_id': benefit_id, 'value': benefit})
+
+def stage_interview(init_id, interview_id, interview):
+    stage_edit({'op': 'interview', 'init_id': init_id, 'interview_id': interview_id, 'value': interview})
+
+def response_edit(initiative, init_id, interview_id, phase, q_id, response):
+    # Endring av ett svar med utgangspunkt i intervjuet slik det ble lest
+    interview = initiative['interviews'][interview_id]
+    return {
+        'op': 'response', 'init_id': init_id, 'interview_id': interview_id, 'phase': phase, 'q_id': q_id,
+        'value': response, 'base': copy.deepcopy(interview['responses'].get(phase, {}).get(q_id)),
+        'base_version': interview['version'], 'at': datetime.now().isoformat()
+    }
+
+def stage_response(init_id, interview_id, phase, q_id, response):
+    stage_edit(response_edit(st.session_state.app_data['initiatives'][init_id], init_id, interview_id, phase, q_id, response))
+
+def describe_conflict(edit):
+    if edit['op'] == 'response':
+        return f"Svaret på spørsmål {edit['q_id']} ({edit['phase']}) ble endret av en annen bruker. Ditt svar (Nivå {edit['value']['score']}) ble ikke lagret - sjekk svaret og lagre på nytt."
+    if edit['op'] == 'delete_initiative':
+        return "Prosjektet ble endret av en annen bruker og ble ikke slettet."
+    if edit['op'] == 'interview':
+        return "Intervjuet finnes allerede."
+    return "Endringen ble ikke lagret fordi en annen bruker endret de samme dataene."
+
+@timed
 def get_data():
-    """ALWAYS read from file first to ensure fresh data - prevents data loss on rerun"""
-    file_data = load_data()  # Always read file
-    
+    """Last bare initiativene denne kjøringen trenger; endringer som ikke er skrevet enda legges oppå.
+    Lesingen skjer i I/O-trådene, og mens ny lesing pågår vises forrige utgave (se SnapshotCache)."""
+    snapshots = get_snapshots()
+    data = {'initiatives': {}}
+    needed = {st.session_state.get('current_project'), st.session_state.get('active_interview', {}).get('init_id')}
+    stale = False
+    for init_id in needed - {None}:
+        initiative, fresh = snapshots.read(init_id)
+        stale = stale or not fresh
+        if initiative is not None:
+            data['initiatives'][init_id] = initiative
+    st.session_state.data_stale = stale
+    pending = st.session_state.get('pending_edits')
+    if pending:
+        apply_edits(data, pending)
     if 'app_data' not in st.session_state:
-        st.session_state.app_data = file_data
         st.session_state.data_loaded_at = datetime.now()
-    else:
-        # Merge file data with session - file has priority for other users' data
-        st.session_state.app_data = merge_data(file_data, st.session_state.app_data)
-    
-    if 'initiatives' not in st.session_state.app_data:
-        st.session_state.app_data['initiatives'] = {}
+    st.session_state.app_data = data
     return st.session_state.app_data
 
 def refresh_data():
-    # Tving oppdatering fra fil
-    st.session_state.app_data = load_data()
+    # Tving ny lesing av katalog og indekser
+    for key in ('catalog_cache', 'catalog_cache_refresh', 'search_index_cache', 'search_index_cache_refresh'):
+        st.session_state.pop(key, None)
     st.session_state.data_loaded_at = datetime.now()
-    return st.session_state.app_data
-
-def merge_data(file_data, session_data):
-    # Sla sammen data fra fil og session
-    merged = {'initiatives': {}}
-    all_init_ids = set(file_data.get('initiatives', {}).keys()) | set(session_data.get('initiatives', {}).keys())
-    
-    for init_id in all_init_ids:
-        file_init = file_data.get('initiatives', {}).get(init_id)
-        session_init = session_data.get('initiatives', {}).get(init_id)
-        
-        if file_init is None:
-            merged['initiatives'][init_id] = session_init
-        elif session_init is None:
-            merged['initiatives'][init_id] = file_init
-        else:
-            merged_init = session_init.copy()
-            file_interviews = file_init.get('interviews', {})
-            session_interviews = session_init.get('interviews', {})
-            merged_interviews = {**file_interviews, **session_interviews}
-            
-            for iid in set(file_interviews.keys()) & set(session_interviews.keys()):
-                def count_answers(interview):
-                    return sum(1 for ph in interview.get('responses', {}).values() 
-                              for r in ph.values() if r.get('score', 0) > 0)
-                if count_answers(file_interviews[iid]) > count_answers(session_interviews[iid]):
-                    merged_interviews[iid] = file_interviews[iid]
-                else:
-                    merged_interviews[iid] = session_interviews[iid]
-            
-            merged_init['interviews'] = merged_interviews
-            merged_init['benefits'] = {**file_init.get('benefits', {}), **session_init.get('benefits', {})}
-            merged['initiatives'][init_id] = merged_init
-    
-    return merged
+    return get_data()
 
+@timed
 def persist_data():
-    # Lagre med merge for å unnga å overskrive andres data
-    data_file = get_data_file()
-    
-    try:
-        if FILELOCK_AVAILABLE:
-            lock = FileLock(LOCK_FILE, timeout=10)
-            with lock:
-                current_file_data = load_data()
-                session_data = st.session_state.app_data
-                merged_data = merge_data(current_file_data, session_data)
-                create_backup()
-                with open(data_file, 'wb') as f:
-                    pickle.dump(merged_data, f)
-                st.session_state.app_data = merged_data
-                st.session_state.data_loaded_at = datetime.now()
+    """Send køede endringer til lageret fra en I/O-tråd og vent kort på svar. Returnerer True når
+    lagringen er bekreftet; False ved konflikt eller feil, eller når svaret ikke er kommet innen
+    IO_ACK_WAIT_SECONDS. Da vises lagringen som ventende til den er bekreftet (show_save_status).
+    Konflikter vises for brukeren i stedet for å overskrive andres data."""
+    if collect_save() is None:
+        return False  # Forrige lagring pågår; disse endringene sendes når den er bekreftet
+    edits = list(st.session_state.get('pending_edits', []))
+    if not edits:
+        return True
+    submit_save(edits)
+    return bool(collect_save(IO_ACK_WAIT_SECONDS))
+
+def show_recovery_alert():
+    # Lageret er skrivebeskyttet mens datafilen er skadet; det som vises er siste gyldige sikkerhetskopi
+    storage = get_storage()
+    recovery = storage.health()
+    if recovery is None:
+        return
+    at = datetime.fromisoformat(recovery['at']).strftime('%d.%m.%Y %H:%M:%S')
+    st.error(f"Datafilen kunne ikke leses: {recovery['error']}. Viser siste gyldige sikkerhetskopi fra {at}. "
+             "Appen er skrivebeskyttet - endringer lagres ikke før datafilen er gjenopprettet.")
+    if recovery['damaged']:
+        st.warning(f"{len(recovery['damaged'])} initiativ(er) hadde skadet siste kopi og vises i en eldre utgave: {', '.join(recovery['damaged'])}")
+    if st.button("Gjenopprett datafilen fra denne kopien", key="restore_backup"):
+        if storage.restore():
+            st.success("Datafilen er gjenopprettet. Den skadede filen er beholdt ved siden av.")
+            refresh_data()
         else:
-            current_file_data = load_data()
-            session_data = st.session_state.app_data
-            merged_data = merge_data(current_file_data, session_data)
-            create_backup()
-            with open(data_file, 'wb') as f:
-                pickle.dump(merged_data, f)
-            st.session_state.app_data = merged_data
-            st.session_state.data_loaded_at = datetime.now()
-    except Exception as e:
-        st.error(f"Feil ved lagring: {e}")
+            st.warning("Datafilen ble endret av andre i mellomtiden - last siden på nytt.")
 
-# ============================================================================
-# STYLING
-# ============================================================================
-st.markdown(f"""
-<style>
-@import url('https://fonts.googleapis.com/css2?family=Source+Sans+Pro:wght@400;600;700&display=swap');
-html, body, [class*="css"] {{ font-family: 'Source Sans Pro', sans-serif; font-size: 16px; }}
-.main-header {{ font-size: 2.2rem; color: {COLORS['primary_dark']}; text-align: center; margin-bottom: 0.3rem; font-weight: 700; }}
-.sub-header {{ font-size: 1.1rem; color: {COLORS['primary']}; text-align: center; margin-bottom: 1.5rem; }}
-.metric-card {{ background: {COLORS['gray_light']}; padding: 1.2rem; border-radius: 8px; border-left: 4px solid {COLORS['primary']}; text-align: center; margin: 0.3rem 0; }}
-.metric-value {{ font-size: 2.2rem; font-weight: 700; color: {COLORS['primary_dark']}; }}
-.metric-label {{ font-size: 0.95rem; color: #666; text-transform: uppercase; }}
-.strength-card {{ background: linear-gradient(135deg, #DDFAE2 0%, {COLORS['gray_light']} 100%); padding: 1rem; border-radius: 8px; border-left: 4px solid {COLORS['success']}; margin: 0.5rem 0; font-size: 1.05rem; }}
-.improvement-card {{ background: linear-gradient(135deg, rgba(255, 107, 107, 0.15) 0%, {COLORS['gray_light']} 100%); padding: 1rem; border-radius: 8px; border-left: 4px solid {COLORS['danger']}; margin: 0.5rem 0; font-size: 1.05rem; }}
-.stButton > button {{ background: linear-gradient(135deg, {COLORS['primary']} 0%, {COLORS['primary_dark']} 100%); color: white; border: none; border-radius: 6px; padding: 0.6rem 1.2rem; font-weight: 600; font-size: 1rem; }}
-.stProgress > div > div > div > div {{ background: linear-gradient(90deg, {COLORS['primary_light']} 0%, {COLORS['success']} 100%); }}
-div[data-testid="stMetricValue"] {{ font-size: 2rem; }}
-div[data-testid="stMarkdownContainer"] p {{ font-size: 1.05rem; }}
-div[data-testid="stMarkdownContainer"] li {{ font-size: 1.05rem; }}
-.stSelectbox label, .stTextInput label, .stTextArea label {{ font-size: 1rem; }}
-#MainMenu {{visibility: hidden;}}
-footer {{visibility: hidden;}}
-</style>
-""", unsafe_allow_html=True)
+def show_save_messages():
+    for message in st.session_state.pop('save_messages', []):
+        st.warning(message)
+
+def get_file_mtime(path):
+    return os.path.getmtime(path) if os.path.exists(path) else None
+
+def load_pickle(path):
+    if os.path.exists(path):
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except Exception:
+            pass
+    return None
+
+def write_pickle_atomic(path, obj):
+    # Skriv til midlertidig fil og bytt ut, slik at lesere aldri ser en halvskrevet fil
+    tmp_file = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_file, 'wb') as f:
+        pickle.dump(obj, f)
+    os.replace(tmp_file, path)
+
+@timed
+def refresh_indexes(data, data_token):
+    # Oppdater avledede indekser etter hver skriving, merket med utgaven av datafilen de bygger på
+    update_catalog(data, data_token)
+    update_search_index(data, data_token=data_token)
 
 # ============================================================================
-# HJELPEFUNKSJONER
+# LAGRINGSGRENSESNITT
 # ============================================================================
-def get_score_color(score):
-    if score >= 4.5: return COLORS['success']
-    elif score >= 3.5: return COLORS['primary_light']
-    elif score >= 2.5: return COLORS['warning']
-    else: return COLORS['danger']
+def touched_initiatives(results):
+    return {edit['init_id'] for key in ('applied', 'noop', 'conflict') for edit in results[key]}
 
-def get_score_text(score):
-    if score >= 4.5: return "Høy modenhet"
-    elif score >= 3.5: return "God modenhet"
-    elif score >= 2.5: return "Moderat modenhet"
-    elif score >= 1.5: return "Begrenset modenhet"
-    else: return "Lav modenhet"
+class Storage:
+    """Felles grensesnitt for datalageret. Appen bruker bare disse operasjonene,
+    slik at pickle-fil, SQLite og delt nøkkel/verdi-lager kan byttes uten endringer i UI."""
 
-def get_recommended_questions(mode, selection, phase):
-    if mode == "role" and selection in ROLES:
-        return ROLES[selection].get('recommended_questions', {}).get(phase, [])
-    elif mode == "parameter":
-        recommended = set()
-        for param_name in selection:
-            if param_name in PARAMETERS:
-                recommended.update(PARAMETERS[param_name]['questions'])
-        return list(recommended)
-    return []
+    keeps_history = False  # sikkerhetskopier med historikk per initiativ (se create_backup)
+    migration_batch = 50   # initiativer per skriving under migrering (None = alle i én skriving)
 
-def calculate_stats(initiative, benefit_filter=None):
-    if not initiative.get('interviews'):
+    def load_all(self):
+        """Hele datasettet, {'initiatives': {...}, 'generation': n}"""
+        raise NotImplementedError
+
+    def load_catalog(self):
+        """Katalog over initiativer og intervjuer, uten intervjuinnhold"""
+        raise NotImplementedError
+
+    def load_initiative(self, init_id):
+        """Ett initiativ, eller None hvis det ikke finnes"""
+        raise NotImplementedError
+
+    def apply_edits(self, edits):
+        """Skriv endringer med versjonssjekk (se apply_edit). Returnerer 'applied', 'noop', 'conflict',
+        'generation' og 'initiatives' med gjeldende utgave av hvert berørt initiativ."""
+        raise NotImplementedError
+
+    def get_token(self):
+        """Billig verdi som endres ved hver skriving"""
+        raise NotImplementedError
+
+    def get_versions(self):
+        """{init_id: versjon} for alle initiativer"""
+        raise NotImplementedError
+
+    def health(self):
+        """None når lageret fungerer normalt. Ellers {'error', 'at', 'damaged', ...}: lageret kunne ikke leses,
+        det som vises er gjenopprettet fra sikkerhetskopi, og skriving avvises til det er gjenopprettet."""
         return None
-    
-    all_scores = {}
-    for phase in PHASES:
-        all_scores[phase] = {}
-        for q in questions_data[phase]:
-            all_scores[phase][q['id']] = []
-    
-    interview_count = 0
-    for interview in initiative['interviews'].values():
-        if benefit_filter and benefit_filter != "all":
-            if interview.get('info', {}).get('benefit_id') != benefit_filter:
-                continue
-        interview_count += 1
-        
-        for phase, questions in interview.get('responses', {}).items():
-            for q_id, resp in questions.items():
-                if resp.get('score', 0) > 0:
-                    all_scores[phase][int(q_id)].append(resp['score'])
-    
-    stats = {
-        'phases': {},
-        'questions': {},
-        'parameters': {},
-        'total_interviews': interview_count,
-        'overall_avg': 0,
-        'high_maturity': [],
-        'low_maturity': []
+
+    def iter_stored_initiatives(self):
+        """(init_id, initiativ) slik de er lagret, uten skjemaoppgradering - bare for migrate_storage"""
+        raise NotImplementedError
+
+    def index_committed(self, results):
+        # Etter en skriving i SQLite eller nøkkel/verdi-lageret: katalogpostene er skrevet sammen med initiativene,
+        # og den lokale søkeindeksen oppdateres for initiativene som ble endret (FileStorage bruker refresh_indexes)
+        changed = {edit['init_id'] for edit in results['applied']}
+        if changed:
+            update_search_index_for({init_id: results['initiatives'].get(init_id) for init_id in changed})
+
+    def iter_initiatives(self, init_ids=None):
+        # (init_id, initiativ) ett om gangen, for eksport og andre gjennomganger av hele lageret
+        for init_id in list(self.load_catalog()['initiatives']) if init_ids is None else init_ids:
+            initiative = self.load_initiative(init_id)
+            if initiative is not None:
+                yield init_id, initiative
+
+    def subscribe(self, callback, interval=STORAGE_POLL_SECONDS):
+        # Kall callback(endrede init_id-er) fra en bakgrunnstråd; returnerer en funksjon som stopper abonnementet
+        stop = threading.Event()
+        state = {'token': self.get_token(), 'versions': self.get_versions()}
+
+        def poll():
+            while not stop.wait(interval):
+                try:
+                    token = self.get_token()
+                    if token == state['token']:
+                        continue
+                    versions = self.get_versions()
+                except Exception as e:
+                    print(f"Abonnement på lageret feilet: {e}")
+                    continue
+                changed = {init_id for init_id in state['versions'].keys() | versions.keys()
+                           if state['versions'].get(init_id) != versions.get(init_id)}
+                state.update({'token': token, 'versions': versions})
+                if changed:
+                    callback(changed)
+
+        threading.Thread(target=poll, daemon=True).start()
+        return stop.set
+
+class FileStorage(Storage):
+    """Pickle-fil på lokal disk (standard). Skriving via commit_edits med compare-and-swap på hele filen."""
+
+    keeps_history = True
+    migration_batch = None  # filen skrives uansett i sin helhet
+
+    def __init__(self):
+        self.recovery = None  # gjenopprettingspunkt for den skadede utgaven av datafilen (se read)
+        self.recovery_lock = threading.Lock()
+
+    def read(self):
+        """Datafilen. Er den skadet, brukes nyeste gyldige utgave fra sikkerhetskopiene så lenge filen er uendret;
+        skriving feiler da i commit_edits, så den skadede filen aldri blir overskrevet uten restore."""
+        try:
+            return load_data()
+        except CorruptDataError as e:
+            token = get_data_token()
+            with self.recovery_lock:
+                if self.recovery is None or self.recovery['token'] != token:
+                    point = find_recovery_point()
+                    if point is None:
+                        raise
+                    print(f"{e}; viser sikkerhetskopi fra {point['at']}")
+                    self.recovery = dict(point, token=token, error=str(e))
+                return self.recovery['data']
+
+    def health(self):
+        recovery = self.recovery
+        if recovery is None or recovery['token'] != get_data_token():
+            return None
+        return recovery
+
+    def restore(self):
+        """Erstatt den skadede datafilen med gjenopprettet utgave. Den skadede filen beholdes ved siden av.
+        Returnerer False hvis filen er endret av andre i mellomtiden."""
+        recovery = self.health()
+        if recovery is None:
+            return False
+        shutil.copy2(get_data_file(), f"{get_data_file()}.skadet_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+        data = dict(recovery['data'], generation=recovery['data']['generation'] + 1)
+        for attempt in range(COMMIT_RETRIES):
+            data_token = write_data_if_unchanged(data, recovery['token'])
+            if data_token is not None:
+                refresh_indexes(data, data_token)
+                self.recovery = None
+                return True
+            if get_data_token() != recovery['token']:
+                return False
+            backoff(attempt)
+        return False
+
+    def load_all(self):
+        return self.read()
+
+    def iter_stored_initiatives(self):
+        # Én pickle kan ikke leses i biter; filen leses rått én gang. En skadet fil håndteres av read.
+        try:
+            with open(get_data_file(), 'rb') as f:
+                data = read_snapshot(f)[0]
+        except (FileNotFoundError, CorruptDataError):
+            return
+        yield from data.get('initiatives', data.get('projects', {})).items()
+
+    def load_catalog(self):
+        token = self.get_token()
+        catalog = load_catalog()
+        if catalog is None or catalog.get('data_token') != token:
+            catalog = update_catalog(self.read(), token)
+        return catalog
+
+    def load_initiative(self, init_id):
+        return self.read()['initiatives'].get(init_id)
+
+    def iter_initiatives(self, init_ids=None):
+        # Hele filen leses uansett, så den leses bare én gang
+        initiatives = self.read()['initiatives']
+        for init_id in list(initiatives) if init_ids is None else init_ids:
+            if init_id in initiatives:
+                yield init_id, initiatives[init_id]
+
+    def apply_edits(self, edits):
+        results = commit_edits(edits)
+        results['initiatives'] = {init_id: results['data']['initiatives'].get(init_id) for init_id in touched_initiatives(results)}
+        return results
+
+    def get_token(self):
+        return get_data_token()
+
+    def get_versions(self):
+        return {init_id: entry['version'] for init_id, entry in self.load_catalog()['initiatives'].items()}
+
+class SQLiteStorage(Storage):
+    """SQLite-database med én rad per initiativ. Flere app-instanser kan dele samme databasefil;
+    radene skrives bare hvis versjonen er den samme som da de ble lest."""
+
+    def __init__(self, path):
+        self.path = path
+        with closing(self.connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS initiatives (id TEXT PRIMARY KEY, version INTEGER NOT NULL, body BLOB NOT NULL, catalog BLOB NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', 0)")
+
+    def connect(self):
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def read_generation(self, conn):
+        return conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0]
+
+    def load_all(self):
+        with closing(self.connect()) as conn:
+            conn.execute("BEGIN")
+            rows = conn.execute("SELECT id, body FROM initiatives").fetchall()
+            generation = self.read_generation(conn)
+            conn.execute("COMMIT")
+        return {'initiatives': {init_id: decode_initiative(body) for init_id, body in rows}, 'generation': generation}
+
+    def load_catalog(self):
+        catalog = {'initiatives': {}, 'interviews': {}}
+        with closing(self.connect()) as conn:
+            for init_id, entries in conn.execute("SELECT id, catalog FROM initiatives"):
+                catalog['initiatives'][init_id], catalog['interviews'][init_id] = pickle.loads(entries)
+        return catalog
+
+    def load_initiative(self, init_id):
+        with closing(self.connect()) as conn:
+            row = conn.execute("SELECT body FROM initiatives WHERE id = ?", (init_id,)).fetchone()
+        return decode_initiative(row[0]) if row else None
+
+    def iter_stored_initiatives(self):
+        # Én rad om gangen, så store databaser ikke må ligge i minnet samtidig
+        with closing(self.connect()) as conn:
+            init_ids = [init_id for init_id, in conn.execute("SELECT id FROM initiatives")]
+            for init_id in init_ids:
+                row = conn.execute("SELECT body FROM initiatives WHERE id = ?", (init_id,)).fetchone()
+                if row:
+                    yield init_id, pickle.loads(row[0])
+
+    def get_token(self):
+        with closing(self.connect()) as conn:
+            return ('sqlite', self.read_generation(conn))
+
+    def get_versions(self):
+        with closing(self.connect()) as conn:
+            return dict(conn.execute("SELECT id, version FROM initiatives"))
+
+    def apply_edits(self, edits):
+        # Les og bruk endringene uten lås; skrivelåsen holdes bare mens versjonene sjekkes og radene skrives
+        started = time.perf_counter()
+        init_ids = sorted({edit['init_id'] for edit in edits})
+        placeholders = ",".join("?" * len(init_ids))
+        lock_wait = 0.0
+        for attempt in range(COMMIT_RETRIES):
+            with closing(self.connect()) as conn:
+                rows = conn.execute(f"SELECT id, version, body FROM initiatives WHERE id IN ({placeholders})", init_ids).fetchall()
+                read_versions = {init_id: version for init_id, version, _ in rows}
+                data = {'initiatives': {init_id: decode_initiative(body) for init_id, _, body in rows}}
+                results = apply_edits(data, edits)
+                results.update({'attempts': attempt + 1, 'lock_wait': lock_wait, 'initiatives': {init_id: data['initiatives'].get(init_id) for init_id in init_ids}})
+                if not results['applied']:
+                    results.update({'generation': self.read_generation(conn), 'wait': time.perf_counter() - started})
+                    return results
+
+                lock_start = time.perf_counter()
+                conn.execute("BEGIN IMMEDIATE")
+                lock_wait += time.perf_counter() - lock_start
+                current = dict(conn.execute(f"SELECT id, version FROM initiatives WHERE id IN ({placeholders})", init_ids).fetchall())
+                if current != read_versions:
+                    conn.execute("ROLLBACK")
+                    lock_wait += backoff(attempt)
+                    continue
+                for init_id in init_ids:
+                    initiative = data['initiatives'].get(init_id)
+                    if initiative is None:
+                        conn.execute("DELETE FROM initiatives WHERE id = ?", (init_id,))
+                    elif initiative['version'] != read_versions.get(init_id):
+                        conn.execute("INSERT OR REPLACE INTO initiatives (id, version, body, catalog) VALUES (?, ?, ?, ?)",
+                                     (init_id, initiative['version'], pickle.dumps(initiative), pickle.dumps(build_catalog_entries(initiative))))
+                conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'generation'")
+                results.update({'generation': self.read_generation(conn), 'lock_wait': lock_wait})
+                conn.execute("COMMIT")
+                results['wait'] = time.perf_counter() - started
+                self.index_committed(results)
+                return results
+        raise TimeoutError(f"Databasen ble endret av andre under {COMMIT_RETRIES} forsøk")
+
+class MemoryKV:
+    """Lokal stand-in for et delt nøkkel/verdi-lager, med samme operasjoner som RedisKV.
+    Brukes for utvikling og tester; data lever bare så lenge prosessen."""
+
+    def __init__(self):
+        self.items = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            return self.items.get(key, (None, 0))
+
+    def get_many(self, keys):
+        with self.lock:
+            return [self.items.get(key, (None, 0)) for key in keys]
+
+    def put_if_version(self, key, value, version):
+        # Skriv (eller slett med value=None) bare hvis nøkkelen fortsatt har versjonen vi leste
+        with self.lock:
+            if self.items.get(key, (None, 0))[1] != version:
+                return False
+            if value is None:
+                self.items.pop(key, None)
+            else:
+                self.items[key] = (value, version + 1)
+            return True
+
+    def put_many_if_versions(self, writes, versions):
+        # Skriv alle nøklene i writes (None = slett), eller ingen hvis en nøkkel i versions har fått ny versjon
+        with self.lock:
+            if any(self.items.get(key, (None, 0))[1] != version for key, version in versions.items()):
+                return False
+            for key, value in writes.items():
+                version = self.items.get(key, (None, 0))[1]
+                if value is None:
+                    self.items.pop(key, None)
+                else:
+                    self.items[key] = (value, version + 1)
+            return True
+
+    def versions(self, prefix):
+        with self.lock:
+            return {key: item[1] for key, item in self.items.items() if key.startswith(prefix)}
+
+class RedisKV:
+    """Delt nøkkel/verdi-lager i Redis. Hver nøkkel er en hash med data ('d') og versjon ('v');
+    compare-and-swap gjøres med WATCH/MULTI."""
+
+    def __init__(self, url):
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        value, version = self.client.hmget(key, 'd', 'v')
+        return value, int(version or 0)
+
+    def get_many(self, keys):
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.hmget(key, 'd', 'v')
+        return [(value, int(version or 0)) for value, version in pipe.execute()]
+
+    def put_if_version(self, key, value, version):
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                if int(pipe.hget(key, 'v') or 0) != version:
+                    pipe.unwatch()
+                    return False
+                pipe.multi()
+                if value is None:
+                    pipe.delete(key)
+                else:
+                    pipe.hset(key, mapping={'d': value, 'v': version + 1})
+                pipe.execute()
+                return True
+            except redis.WatchError:
+                return False
+
+    def put_many_if_versions(self, writes, versions):
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(*(writes.keys() | versions.keys()))
+                current = {key: int(pipe.hget(key, 'v') or 0) for key in writes.keys() | versions.keys()}
+                if any(current[key] != version for key, version in versions.items()):
+                    pipe.unwatch()
+                    return False
+                pipe.multi()
+                for key, value in writes.items():
+                    if value is None:
+                        pipe.delete(key)
+                    else:
+                        pipe.hset(key, mapping={'d': value, 'v': current[key] + 1})
+                pipe.execute()
+                return True
+            except redis.WatchError:
+                return False
+
+    def versions(self, prefix):
+        keys = list(self.client.scan_iter(match=f"{prefix}*"))
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.hget(key, 'v')
+        return {key.decode(): int(version or 0) for key, version in zip(keys, pipe.execute())}
+
+class KVStorage(Storage):
+    """Hvert initiativ er én nøkkel i et delt nøkkel/verdi-lager. En skriving bytter ut nøklene til alle
+    initiativene den berører samlet, med compare-and-swap på versjonene, så skrivere på ulike initiativer
+    venter aldri på hverandre."""
+
+    def __init__(self, client, namespace="modenhet"):
+        self.client = client
+        self.namespace = namespace
+
+    def key(self, kind, init_id=""):
+        return f"{self.namespace}:{kind}:{init_id}"
+
+    def load_values(self, kind, decode=pickle.loads):
+        prefix = self.key(kind)
+        keys = list(self.client.versions(prefix))
+        return {key[len(prefix):]: decode(value)
+                for key, (value, _) in zip(keys, self.client.get_many(keys)) if value is not None}
+
+    def load_all(self):
+        generation = self.get_token()[1]
+        return {'initiatives': self.load_values('initiative', decode_initiative), 'generation': generation}
+
+    def load_catalog(self):
+        catalog = {'initiatives': {}, 'interviews': {}}
+        for init_id, (_, entries) in self.load_values('catalog').items():
+            catalog['initiatives'][init_id], catalog['interviews'][init_id] = entries
+        return catalog
+
+    def load_initiative(self, init_id):
+        value, _ = self.client.get(self.key('initiative', init_id))
+        return decode_initiative(value) if value is not None else None
+
+    def iter_stored_initiatives(self):
+        # Én nøkkel om gangen
+        prefix = self.key('initiative')
+        for key in list(self.client.versions(prefix)):
+            value, _ = self.client.get(key)
+            if value is not None:
+                yield key[len(prefix):], pickle.loads(value)
+
+    def get_token(self):
+        value, _ = self.client.get(self.key('generation'))
+        return ('kv', int(value) if value is not None else 0)
+
+    def get_versions(self):
+        prefix = self.key('initiative')
+        return {key[len(prefix):]: version for key, version in self.client.versions(prefix).items()}
+
+    def update_key(self, key, update):
+        # Les-endre-skriv med compare-and-swap til det lykkes
+        while True:
+            value, version = self.client.get(key)
+            new_value = update(value)
+            if new_value is value or self.client.put_if_version(key, new_value, version):
+                return new_value
+
+    def apply_edits(self, edits):
+        # Alle initiativene i en skriving lagres samlet, sammen med katalogpostene, eller ingen av dem (som i SQLiteStorage)
+        started = time.perf_counter()
+        init_ids = sorted({edit['init_id'] for edit in edits})
+        keys = [self.key('initiative', init_id) for init_id in init_ids]
+        lock_wait = 0.0
+        for attempt in range(COMMIT_RETRIES):
+            stored = self.client.get_many(keys)
+            data = {'initiatives': {init_id: decode_initiative(value) for init_id, (value, _) in zip(init_ids, stored) if value is not None}}
+            results = apply_edits(data, edits)
+            results.update({'attempts': attempt + 1, 'lock_wait': lock_wait, 'initiatives': {init_id: data['initiatives'].get(init_id) for init_id in init_ids}})
+            if not results['applied']:
+                results.update({'generation': self.get_token()[1], 'wait': time.perf_counter() - started})
+                return results
+
+            changed = {edit['init_id'] for edit in results['applied']}
+            writes = {}
+            for init_id, key, (_, version) in zip(init_ids, keys, stored):
+                if init_id in changed:
+                    initiative = results['initiatives'][init_id]
+                    writes[key] = pickle.dumps(initiative) if initiative is not None else None
+                    # Katalogposten merkes med initiativets nøkkelversjon etter skrivingen
+                    writes[self.key('catalog', init_id)] = pickle.dumps((version + 1, build_catalog_entries(initiative))) if initiative is not None else None
+            if self.client.put_many_if_versions(writes, {key: version for key, (_, version) in zip(keys, stored)}):
+                generation = self.update_key(self.key('generation'), lambda value: str(int(value or 0) + 1).encode())
+                results.update({'generation': int(generation), 'wait': time.perf_counter() - started})
+                self.index_committed(results)
+                return results
+            lock_wait += backoff(attempt)
+        raise TimeoutError(f"Initiativene ble endret av andre under {COMMIT_RETRIES} forsøk")
+
+def copy_storage(source, target):
+    # Flytt alle initiativer til et annet lager, f.eks. fra pickle-fil til SQLite ved flere app-instanser
+    at = datetime.now().isoformat()
+    edits = [{'op': 'initiative', 'init_id': init_id, 'fields': initiative, 'base': None, 'base_version': None, 'at': at}
+             for init_id, initiative in source.load_all()['initiatives'].items()]
+    return target.apply_edits(edits) if edits else None
+
+def create_storage(spec):
+    """Lager etter spesifikasjon: 'file' (standard), 'sqlite:<sti>', 'redis://<vert>:<port>/<db>' eller 'memory'"""
+    if not spec or spec == 'file':
+        return FileStorage()
+    if spec.startswith('sqlite:'):
+        return SQLiteStorage(spec[len('sqlite:'):] or SQLITE_FILE)
+    if spec.startswith(('redis://', 'rediss://')):
+        if not REDIS_AVAILABLE:
+            raise RuntimeError("Delt lagring krever redis: pip install redis")
+        return KVStorage(RedisKV(spec))
+    if spec == 'memory':
+        return KVStorage(MemoryKV())
+    raise ValueError(f"Ukjent lager: {spec}")
+
+@st.cache_resource
+def get_storage():
+    # Ett lager per prosess, delt mellom sesjoner og kjøringer; initiativer med eldre skjema migreres når lageret åpnes
+    storage = create_storage(os.environ.get(STORAGE_ENV, 'file'))
+    report = migrate_storage(storage)
+    if report['migrated'] or report['problem_count']:
+        print("\n".join(describe_migration_report(report)))
+    return storage
+
+# ============================================================================
+# ASYNKRON LAGRING
+# ============================================================================
+class StorageUnavailable(Exception):
+    """Lageret kunne ikke leses innen fristen, og det finnes ingen tidligere utgave å vise"""
+
+@st.cache_resource
+def get_io_executor():
+    # Egne tråder for lagring og lesing, slik at venting på lageret ikke låser skriptkjøringen
+    return ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="lagring")
+
+class SnapshotCache:
+    """Siste gode utgave av hvert initiativ, delt av alle sesjoner i prosessen.
+    Ny lesing skjer i I/O-trådene når lagerets token er endret; en kjøring venter bare kort
+    på den og får ellers forrige utgave. Utgavene lagres som pickle, så hver sesjon får sin egen kopi."""
+
+    def __init__(self, storage, executor):
+        self.storage = storage
+        self.executor = executor
+        self.lock = threading.Lock()
+        self.snapshots = {}  # init_id -> (token, pickle)
+        self.loads = {}      # init_id -> (token, future)
+
+    def load(self, init_id, token):
+        blob = pickle.dumps(self.storage.load_initiative(init_id), pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            self.snapshots[init_id] = (token, blob)
+        return blob
+
+    def read(self, init_id):
+        """(initiativ, fersk); initiativet er None hvis det ikke finnes"""
+        token = self.storage.get_token()
+        with self.lock:
+            snapshot = self.snapshots.get(init_id)
+            if snapshot and snapshot[0] == token:
+                return pickle.loads(snapshot[1]), True
+            pending = self.loads.get(init_id)
+            if pending is None or pending[0] != token or (pending[1].done() and pending[1].exception()):
+                pending = self.loads[init_id] = (token, self.executor.submit(self.load, init_id, token))
+        try:
+            error = pending[1].exception(timeout=IO_STALE_WAIT_SECONDS if snapshot else IO_READ_WAIT_SECONDS)
+        except FutureTimeout:
+            if snapshot:
+                return pickle.loads(snapshot[1]), False
+            raise StorageUnavailable(f"Lageret svarte ikke innen {IO_READ_WAIT_SECONDS:.0f} s")
+        if error is not None:
+            if snapshot:
+                return pickle.loads(snapshot[1]), False
+            raise StorageUnavailable(f"Initiativet kunne ikke leses: {error}") from error
+        return pickle.loads(pending[1].result()), True
+
+    def store(self, init_id, initiative):
+        # Resultatet av en egen lagring vises med en gang; uten token leses det likevel på nytt ved neste kjøring
+        with self.lock:
+            self.snapshots[init_id] = (None, pickle.dumps(initiative, pickle.HIGHEST_PROTOCOL))
+
+@st.cache_resource
+def get_snapshots():
+    return SnapshotCache(get_storage(), get_io_executor())
+
+def submit_save(edits):
+    # Skriv endringene i en I/O-tråd; svaret hentes med collect_save
+    storage = get_storage()
+    st.session_state.save_in_flight = {'future': get_io_executor().submit(storage.apply_edits, edits), 'edits': edits,
+                                       'started': time.monotonic()}
+    st.session_state.pop('save_failed', None)
+
+def collect_save(wait=0.0):
+    """Ta imot svaret på en sendt lagring. True = lagret, False = konflikt eller feil, None = venter fortsatt.
+    Ved feil (for eksempel at lageret var opptatt for lenge) beholdes endringene og brukeren får beskjed."""
+    in_flight = st.session_state.get('save_in_flight')
+    if in_flight is None:
+        return True
+    try:
+        # exception() skiller ventetid fra TimeoutError kastet av selve lagringen
+        error = in_flight['future'].exception(timeout=wait)
+    except FutureTimeout:
+        return None
+    del st.session_state['save_in_flight']
+    if error is not None:
+        st.session_state.save_failed = True
+        reason = "lageret var opptatt for lenge" if isinstance(error, (TimeoutError, sqlite3.OperationalError)) else str(error)
+        st.session_state.setdefault('save_errors', []).append(
+            f"Endringene ble ikke lagret ({reason}). De er beholdt i denne økten - prøv å lagre igjen.")
+        return False
+    results = in_flight['future'].result()
+    record_duration('lock_wait', results.get('lock_wait', 0.0))
+    sent = {id(edit) for edit in in_flight['edits']}
+    st.session_state.pending_edits = [edit for edit in st.session_state.get('pending_edits', []) if id(edit) not in sent]
+    snapshots = get_snapshots()
+    for init_id, initiative in results['initiatives'].items():
+        snapshots.store(init_id, initiative)
+        if 'app_data' not in st.session_state:
+            continue
+        if initiative is None:
+            st.session_state.app_data['initiatives'].pop(init_id, None)
+        else:
+            st.session_state.app_data['initiatives'][init_id] = initiative
+    st.session_state.data_loaded_at = datetime.now()
+    if results['conflict']:
+        st.session_state.setdefault('save_messages', []).extend(describe_conflict(edit) for edit in results['conflict'])
+        return False
+    return True
+
+@st.fragment(run_every=IO_POLL_SECONDS)
+def watch_pending_save():
+    # Kjøres på nytt til lagringen er bekreftet, og laster da hele siden på nytt
+    in_flight = st.session_state.get('save_in_flight')
+    if in_flight is None or in_flight['future'].done():
+        st.rerun()
+    st.info(f"Lagrer {len(in_flight['edits'])} endring(er) - venter på lageret ({time.monotonic() - in_flight['started']:.0f} s)")
+
+def show_save_status():
+    # Bekreftelse på lagringer som ble sendt i en tidligere kjøring, og sending av endringer som har ventet på dem
+    if collect_save() is not None and st.session_state.get('pending_edits') and not st.session_state.get('save_failed'):
+        persist_data()
+    if 'save_in_flight' in st.session_state:
+        watch_pending_save()
+    for message in st.session_state.pop('save_errors', []):
+        st.error(message)
+    if st.session_state.get('save_failed') and st.session_state.get('pending_edits'):
+        if st.button("Prøv å lagre igjen", key="retry_save"):
+            persist_data()
+            st.rerun()
+
+# ============================================================================
+# KATALOG OVER INITIATIVER OG INTERVJUER
+# ============================================================================
+def count_answered(interview):
+    return interview['summary']['answered']
+
+def build_initiative_entry(initiative):
+    # Metadata for ett initiativ, uten intervjuinnhold
+    return {
+        'name': initiative['name'],
+        'created': initiative['created'],
+        'modified': initiative['modified'] or initiative['created'],
+        'interview_count': len(initiative['interviews']),
+        'benefit_count': len(initiative['benefits']),
+        'has_code': initiative['access_code'] != '',
+        'version': initiative['version']
     }
-    
-    all_avgs = []
-    
-    for phase in PHASES:
-        phase_scores = []
-        stats['questions'][phase] = {}
-        
-        for q in questions_data[phase]:
-            scores = all_scores[phase][q['id']]
-            if scores:
-                avg = np.mean(scores)
-                stats['questions'][phase][q['id']] = {
-                    'avg': avg, 'min': min(scores), 'max': max(scores),
-                    'count': len(scores), 'title': q['title'], 'question': q['question']
-                }
-                phase_scores.append(avg)
-                all_avgs.append(avg)
-                
-                item = {'phase': phase, 'question_id': q['id'], 'title': q['title'], 'score': avg}
-                if avg >= 4:
-                    stats['high_maturity'].append(item)
-                elif avg < 3:
-                    stats['low_maturity'].append(item)
-        
-        if phase_scores:
-            stats['phases'][phase] = {'avg': np.mean(phase_scores), 'min': min(phase_scores), 'max': max(phase_scores)}
-    
+
+def build_interview_entry(interview):
+    # Metadata for ett intervju, brukes av intervjuvelgeren
+    info = interview['info']
+    return {
+        'interviewee': info['interviewee'],
+        'benefit_name': info['benefit_name'],
+        'phase': info['phase'],
+        'date': info['date'],
+        'modified': interview['modified'],
+        'answered': count_answered(interview)
+    }
+
+def build_catalog_entries(initiative):
+    # Katalogposten for initiativet og alle dets intervjuer
+    return build_initiative_entry(initiative), {iid: build_interview_entry(interview) for iid, interview in initiative['interviews'].items()}
+
+def load_catalog():
+    return load_pickle(get_catalog_file())
+
+def update_catalog(data, data_token=None):
+    # Oppdater katalogen inkrementelt - kun endrede intervjuer bygges på nytt
+    catalog = load_catalog() or {'initiatives': {}, 'interviews': {}}
+    initiatives = data.get('initiatives', {})
+    for init_id in list(catalog['initiatives'].keys()):
+        if init_id not in initiatives:
+            del catalog['initiatives'][init_id]
+            catalog['interviews'].pop(init_id, None)
+
+    for init_id, initiative in initiatives.items():
+        catalog['initiatives'][init_id] = build_initiative_entry(initiative)
+        interviews = initiative['interviews']
+        cached = catalog['interviews'].setdefault(init_id, {})
+        for iid in list(cached.keys()):
+            if iid not in interviews:
+                del cached[iid]
+        for iid, interview in interviews.items():
+            entry = cached.get(iid)
+            if entry is None or entry['modified'] != interview['modified']:
+                cached[iid] = build_interview_entry(interview)
+
+    catalog['data_token'] = data_token if data_token is not None else get_data_token()
+    try:
+        write_pickle_atomic(get_catalog_file(), catalog)
+    except Exception as e:
+        print(f"Katalog kunne ikke lagres: {e}")
+    return catalog
+
+def load_cached(cache_key, load_fn):
+    """Gjenbruk katalog/indeks i sesjonen til lageret er endret; load_fn får lagerets token.
+    Ny utgave lastes i en I/O-tråd; svarer den ikke raskt, vises forrige utgave så lenge."""
+    token = get_storage().get_token()
+    cached = st.session_state.get(cache_key)
+    if cached and cached[0] == token:
+        return cached[1]
+    refresh_key = f"{cache_key}_refresh"
+    refresh = st.session_state.get(refresh_key)
+    if refresh is None or refresh[0] != token:
+        refresh = st.session_state[refresh_key] = (token, get_io_executor().submit(load_fn, token))
+    try:
+        error = refresh[1].exception(timeout=IO_STALE_WAIT_SECONDS if cached else IO_READ_WAIT_SECONDS)
+    except FutureTimeout:
+        if cached:
+            return cached[1]
+        raise StorageUnavailable(f"Lageret svarte ikke innen {IO_READ_WAIT_SECONDS:.0f} s")
+    del st.session_state[refresh_key]
+    if error is not None:
+        if cached:
+            st.session_state.data_stale = True
+            return cached[1]
+        raise StorageUnavailable(f"Lageret kunne ikke leses: {error}") from error
+    value = refresh[1].result()
+    st.session_state[cache_key] = (token, value)
+    return value
+
+@timed
+def get_catalog():
+    storage = get_storage()
+    return load_cached('catalog_cache', lambda token: storage.load_catalog())
+
+def match_rank(entry, query, fields):
+    # 2 = prefiks-treff på et ord, 1 = delstreng-treff, 0 = ingen treff
+    rank = 0
+    for field in fields:
+        text = str(entry.get(field, '')).lower()
+        if text.startswith(query) or f" {query}" in text:
+            return 2
+        if query in text:
+            rank = 1
+    return rank
+
+def search_catalog(entries, query="", fields=('name',), sort_by='name', descending=False):
+    # Returnerer sorterte id-er for treff; etiketter formateres bare for synlig side
+    query = query.strip().lower()
+    if query:
+        ranks = {key: match_rank(entry, query, fields) for key, entry in entries.items()}
+        keys = [key for key, rank in ranks.items() if rank > 0]
+    else:
+        ranks = {}
+        keys = list(entries.keys())
+
+    if sort_by == 'relevance':
+        keys.sort(key=lambda k: (-ranks.get(k, 0), str(entries[k].get(fields[0], '')).lower()))
+        return keys
+
+    def sort_value(key):
+        value = entries[key][sort_by]
+        return value.lower() if isinstance(value, str) else value
+
+    # Poster uten verdi (f.eks. eldre intervjuer uten endringstid) havner sist
+    missing = [k for k in keys if entries[k].get(sort_by) is None]
+    keys = [k for k in keys if entries[k].get(sort_by) is not None]
+    keys.sort(key=sort_value, reverse=descending)
+    return keys + missing
+
+def paginate(keys, page, page_size=CATALOG_PAGE_SIZE):
+    start = page * page_size
+    return keys[start:start + page_size]
+
+def catalog_picker(entries, key, label, format_label, fields, sort_options):
+    # Søkbar og sidedelt velger som bare formaterer synlige rader
+    col_query, col_sort = st.columns([3, 2])
+    query = col_query.text_input("Søk", key=f"{key}_query", placeholder="Skriv for å filtrere")
+    sort_label = col_sort.selectbox("Sorter etter", options=list(sort_options.keys()), key=f"{key}_sort")
+    sort_by, descending = sort_options[sort_label]
+    keys = search_catalog(entries, query, fields, sort_by, descending)
+    if not keys:
+        st.info("Ingen treff.")
+        return None
+
+    page_count = (len(keys) - 1) // CATALOG_PAGE_SIZE + 1
+    page_key = f"{key}_page"
+    if st.session_state.get(page_key, 1) > page_count:
+        st.session_state[page_key] = 1
+    page = 1
+    if page_count > 1:
+        page = st.number_input("Side", min_value=1, max_value=page_count, step=1, key=page_key)
+    visible = paginate(keys, page - 1)
+    start = (page - 1) * CATALOG_PAGE_SIZE
+    st.caption(f"Viser {start + 1}-{start + len(visible)} av {len(keys)}")
+    labels = {k: format_label(k, entries[k]) for k in visible}
+    return st.selectbox(label, options=visible, format_func=lambda k: labels[k], key=f"{key}_select")
+
+# ============================================================================
+# FRITEKSTSOK I NOTATER
+# ============================================================================
+SEARCH_INDEX_VERSION = 3
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+NORWEGIAN_STOPWORDS = {
+    'og', 'i', 'jeg', 'det', 'at', 'en', 'et', 'den', 'til', 'er', 'som', 'pa', 'de', 'med', 'han', 'av',
+    'ikke', 'der', 'sa', 'var', 'meg', 'seg', 'men', 'ett', 'har', 'om', 'vi', 'min', 'mitt', 'ha', 'hadde',
+    'hun', 'na', 'over', 'da', 'ved', 'fra', 'du', 'ut', 'sin', 'dem', 'oss', 'opp', 'man', 'kan', 'hans',
+    'hvor', 'eller', 'hva', 'skal', 'selv', 'her', 'alle', 'vil', 'bli', 'ble', 'blir', 'blitt', 'kunne',
+    'inn', 'nar', 'vaere', 'kom', 'noen', 'noe', 'ville', 'dere', 'deres', 'kun', 'ja', 'etter', 'ned',
+    'skulle', 'denne', 'for', 'deg', 'si', 'sine', 'sitt', 'mot', 'a', 'meget', 'hvorfor', 'dette', 'disse',
+    'uten', 'hvordan', 'ingen', 'din', 'ditt', 'samme', 'hvilken', 'hvilke', 'ogsa', 'mer', 'mye', 'veldig',
+    'bare', 'enn', 'nok', 'vart', 'vare', 'hos', 'per', 'litt', 'godt', 'sant', 'fordi', 'mellom'
+}
+STEM_VOWELS = set('aeiouy')
+STEM_STEP1_SUFFIXES = sorted([
+    'a', 'e', 'ede', 'ande', 'ende', 'ane', 'ene', 'hetene', 'en', 'heten', 'ar', 'er', 'heter', 'as', 'es',
+    'edes', 'endes', 'enes', 'hetenes', 'ens', 'hetens', 'ers', 'ets', 'et', 'het', 'ast', 'erte', 'ert', 's'
+], key=len, reverse=True)
+STEM_STEP3_SUFFIXES = sorted(['leg', 'eleg', 'ig', 'eig', 'lig', 'elig', 'els', 'lov', 'elov', 'slov', 'hetslov'], key=len, reverse=True)
+STEM_S_ENDINGS = set('bcdfghjlmnoprtvyz')
+
+def fold_text(text):
+    # Små bokstaver og æ/ø/å-folding, samme skrivemåte som ellers i appen ("pa", "okonomi")
+    text = text.lower().replace('æ', 'ae').replace('ø', 'o').replace('å', 'a')
+    return unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+
+def stem_word(word):
+    # Forenklet Snowball-stemmer for norsk (bokmål), på foldet tekst
+    r1 = len(word)
+    for i in range(1, len(word)):
+        if word[i] not in STEM_VOWELS and word[i - 1] in STEM_VOWELS:
+            r1 = max(i + 1, 3)
+            break
+    for suffix in STEM_STEP1_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= r1:
+            if suffix in ('erte', 'ert'):
+                word = word[:-len(suffix)] + 'er'
+            elif suffix == 's':
+                if word[-2] in STEM_S_ENDINGS or (word[-2] == 'k' and word[-3] not in STEM_VOWELS):
+                    word = word[:-1]
+            else:
+                word = word[:-len(suffix)]
+            break
+    if (word.endswith('dt') or word.endswith('vt')) and len(word) - 1 >= r1:
+        word = word[:-1]
+    for suffix in STEM_STEP3_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= r1:
+            word = word[:-len(suffix)]
+            break
+    return word
+
+@functools.lru_cache(maxsize=65536)
+def analyze_word(word):
+    # Stammen til ett ord, eller None for stoppord; ordforrådet er lite, så masseimport og ny indeksering gjenbruker svarene
+    folded = re.sub(r'[^a-z0-9]', '', fold_text(word))
+    if len(folded) > 1 and folded not in NORWEGIAN_STOPWORDS:
+        return stem_word(folded)
+    return None
+
+def analyze_text(text):
+    # Notat -> liste med (stamme, ord) i rekkefølge; ordet beholdes for visning av temaer
+    tokens = []
+    for word in re.findall(r'[^\W_]+', text.lower()):
+        stem = analyze_word(word)
+        if stem:
+            tokens.append((stem, word))
+    return tokens
+
+def tokenize_text(text):
+    # Notat -> liste med normaliserte stammer, i rekkefølge
+    return [stem for stem, _ in analyze_text(text)]
+
+def new_search_index():
+    return {'version': SEARCH_INDEX_VERSION, 'docs': {}, 'postings': {}, 'interviews': {}, 'total_length': 0,
+            'themes': {}, 'theme_totals': {}, 'surface': {}, 'versions': {}, 'data_token': None}
+
+def index_interview(index, init_id, iid, interview):
+    # Legg alle notater i ett intervju inn i indeksen; ett dokument per besvart spørsmål
+    doc_keys = []
+    benefit_id = interview['info']['benefit_id']
+    for phase, questions in interview['responses'].items():
+        for q_id, resp in questions.items():
+            tokens = analyze_text(resp['notes'])
+            if not tokens:
+                continue
+            terms = [stem for stem, _ in tokens]
+            doc_key = (init_id, iid, phase, str(q_id))
+            tf = Counter(terms)
+            doc = {
+                'terms': dict(tf), 'length': len(terms), 'score': resp['score'], 'benefit_id': benefit_id,
+                'bigrams': sorted({f"{a} {b}" for a, b in zip(terms, terms[1:]) if a != b}),
+                'surface': {stem: word for stem, word in reversed(tokens)}
+            }
+            index['docs'][doc_key] = doc
+            index['total_length'] += len(terms)
+            for term, count in tf.items():
+                index['postings'].setdefault(term, {})[doc_key] = count
+            update_theme_stats(index, doc_key, doc, 1)
+            doc_keys.append(doc_key)
+    index['interviews'][(init_id, iid)] = {'modified': interview['modified'], 'docs': doc_keys}
+
+def unindex_interview(index, key):
+    entry = index['interviews'].pop(key, None)
+    if entry is None:
+        return
+    for doc_key in entry['docs']:
+        doc = index['docs'].pop(doc_key, None)
+        if doc is None:
+            continue
+        index['total_length'] -= doc['length']
+        update_theme_stats(index, doc_key, doc, -1)
+        for term in doc['terms']:
+            postings = index['postings'].get(term)
+            if postings is not None:
+                postings.pop(doc_key, None)
+                if not postings:
+                    del index['postings'][term]
+
+def load_search_index():
+    index = load_pickle(get_search_index_file())
+    if index is not None and index.get('version') != SEARCH_INDEX_VERSION:
+        return None
+    return index
+
+def index_initiative(index, init_id, initiative):
+    # Bare intervjuer med ny endringstid indekseres på nytt; versjonen viser hvilken utgave indeksen bygger på
+    for iid, interview in initiative['interviews'].items():
+        key = (init_id, iid)
+        entry = index['interviews'].get(key)
+        if entry is None or entry['modified'] != interview['modified']:
+            unindex_interview(index, key)
+            index_interview(index, init_id, iid, interview)
+    index['versions'][init_id] = initiative['version']
+
+def save_search_index(index):
+    try:
+        write_pickle_atomic(get_search_index_file(), index)
+    except Exception as e:
+        print(f"Søkeindeks kunne ikke lagres: {e}")
+
+def update_search_index(data, index=None, data_token=None):
+    # Inkrementell oppdatering for hele datasettet; intervjuer og initiativer som er borte fjernes
+    if index is None:
+        index = load_search_index() or new_search_index()
+    initiatives = data.get('initiatives', {})
+    for init_id, initiative in initiatives.items():
+        index_initiative(index, init_id, initiative)
+    for key in [k for k in index['interviews'] if k[0] not in initiatives or k[1] not in initiatives[k[0]]['interviews']]:
+        unindex_interview(index, key)
+    index['versions'] = {init_id: initiative['version'] for init_id, initiative in initiatives.items()}
+    index['data_token'] = data_token if data_token is not None else get_data_token()
+    save_search_index(index)
+    return index
+
+def update_search_index_for(initiatives, index=None, data_token=None):
+    """Som update_search_index, men bare for initiatives {init_id: initiativ, eller None når det er slettet}.
+    Uten data_token beholder indeksen forrige token; neste lesing sammenligner da bare versjonene."""
+    if index is None:
+        index = load_search_index() or new_search_index()
+    for key in [k for k in index['interviews'] if k[0] in initiatives
+                and (initiatives[k[0]] is None or k[1] not in initiatives[k[0]]['interviews'])]:
+        unindex_interview(index, key)
+    for init_id, initiative in initiatives.items():
+        if initiative is None:
+            index['versions'].pop(init_id, None)
+        else:
+            index_initiative(index, init_id, initiative)
+    if data_token is not None:
+        index['data_token'] = data_token
+    save_search_index(index)
+    return index
+
+def rebuild_search_index(data, data_token=None):
+    return update_search_index(data, new_search_index(), data_token)
+
+def load_current_search_index(token):
+    """Indeksen ligger lokalt hos hver app-instans. Når lageret er endret (også av andre instanser), leses bare
+    initiativene med en annen versjon enn indeksen bygger på; hele lageret leses bare når indeksen mangler."""
+    storage = get_storage()
+    index = load_search_index()
+    if index is None:
+        return update_search_index(storage.load_all(), data_token=token)
+    if index['data_token'] != token:
+        versions = storage.get_versions()
+        changed = {init_id: None for init_id in index['versions'] if init_id not in versions}
+        changed.update(storage.iter_initiatives([init_id for init_id, version in versions.items() if index['versions'].get(init_id) != version]))
+        index = update_search_index_for(changed, index, data_token=token)
+    return index
+
+@timed
+def get_search_index():
+    return load_cached('search_index_cache', load_current_search_index)
+
+def search_notes(index, query, allowed_initiatives=None, limit=50):
+    # BM25-rangering over notatene; returnerer [(doc_key, score)]
+    terms = set(tokenize_text(query))
+    n_docs = len(index['docs'])
+    if not terms or n_docs == 0:
+        return []
+    avg_length = index['total_length'] / n_docs
+    scores = {}
+    for term in terms:
+        postings = index['postings'].get(term)
+        if not postings:
+            continue
+        idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+        for doc_key, tf in postings.items():
+            if allowed_initiatives is not None and doc_key[0] not in allowed_initiatives:
+                continue
+            length = index['docs'][doc_key]['length']
+            weight = idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length))
+            scores[doc_key] = scores.get(doc_key, 0) + weight
+    return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+# ============================================================================
+# TEMAER I NOTATER
+# ============================================================================
+THEME_TOP_N = 5
+THEME_MIN_SUPPORT = 2
+
+def bump_count(counter, key, sign):
+    value = counter.get(key, 0) + sign
+    if value > 0:
+        counter[key] = value
+    else:
+        counter.pop(key, None)
+
+def update_theme_stats(index, doc_key, doc, sign):
+    # Legg til (+1) eller trekk fra (-1) ett notat i tema-statistikken for sitt spørsmål og sin gevinst
+    init_id, _, phase, q_id = doc_key
+    groups = index['themes'].setdefault(init_id, {})
+    group_key = (phase, q_id, doc['benefit_id'])
+    group = groups.setdefault(group_key, {'docs': 0, 'low_docs': 0, 'high_docs': 0, 'terms': {}, 'bigrams': {}, 'low': {}, 'high': {}})
+    totals = index['theme_totals'].setdefault(init_id, {'docs': 0, 'terms': {}})
+    low = 0 < doc['score'] < 3
+    high = doc['score'] >= 4
+    group['docs'] += sign
+    totals['docs'] += sign
+    if low:
+        group['low_docs'] += sign
+    if high:
+        group['high_docs'] += sign
+    for term in doc['terms']:
+        bump_count(group['terms'], term, sign)
+        bump_count(totals['terms'], term, sign)
+        if low:
+            bump_count(group['low'], term, sign)
+        if high:
+            bump_count(group['high'], term, sign)
+    for bigram in doc['bigrams']:
+        bump_count(group['bigrams'], bigram, sign)
+    for stem, word in doc['surface'].items():
+        words = index['surface'].setdefault(stem, {})
+        bump_count(words, word, sign)
+        if not words:
+            del index['surface'][stem]
+    if group['docs'] <= 0:
+        del groups[group_key]
+    if not groups:
+        del index['themes'][init_id]
+    if totals['docs'] <= 0:
+        del index['theme_totals'][init_id]
+
+def display_term(index, stem):
+    # Vis det vanligste ordet bak en stamme
+    words = index['surface'].get(stem)
+    return max(words, key=words.get) if words else stem
+
+def summarize_theme_groups(index, init_id, groups, top_n=THEME_TOP_N):
+    # TF-IDF-toppord, ordpar og ord som går igjen ved lav/høy score for en samling grupper
+    merged = {'docs': 0, 'low_docs': 0, 'high_docs': 0, 'terms': Counter(), 'bigrams': Counter(), 'low': Counter(), 'high': Counter()}
+    for group in groups:
+        for key in ('docs', 'low_docs', 'high_docs'):
+            merged[key] += group[key]
+        for key in ('terms', 'bigrams', 'low', 'high'):
+            merged[key].update(group[key])
+    if merged['docs'] == 0:
+        return None
+
+    totals = index['theme_totals'].get(init_id, {'docs': 0, 'terms': {}})
+    weights = {term: (df / merged['docs']) * (math.log((1 + totals['docs']) / (1 + totals['terms'].get(term, 0))) + 1)
+               for term, df in merged['terms'].items()}
+    top_terms = heapq.nlargest(top_n, weights.items(), key=lambda item: item[1])
+    bigrams = [(bigram, count) for bigram, count in merged['bigrams'].most_common(top_n) if count >= THEME_MIN_SUPPORT]
+
+    def associated(counter, docs):
+        # Ord som oftere forekommer i notater med lav/høy score enn notatene generelt
+        baseline = docs / merged['docs']
+        candidates = [(term, count / merged['terms'][term]) for term, count in counter.items()
+                      if merged['terms'][term] >= THEME_MIN_SUPPORT and count / merged['terms'][term] > baseline]
+        return heapq.nlargest(top_n, candidates, key=lambda item: (item[1], merged['terms'][item[0]]))
+
+    return {
+        'docs': merged['docs'],
+        'top_terms': [(display_term(index, term), weight) for term, weight in top_terms],
+        'bigrams': [(" ".join(display_term(index, part) for part in bigram.split()), count) for bigram, count in bigrams],
+        'low_terms': [(display_term(index, term), share) for term, share in associated(merged['low'], merged['low_docs'])],
+        'high_terms': [(display_term(index, term), share) for term, share in associated(merged['high'], merged['high_docs'])]
+    }
+
+@timed
+def get_initiative_themes(index, init_id, benefit_filter=None):
+    # Temaer per spørsmål (fase, id) og per parameter, fra forhåndsberegnede tellinger
+    by_question = {}
+    for (phase, q_id, benefit_id), group in index['themes'].get(init_id, {}).items():
+        if benefit_filter and benefit_filter != "all" and benefit_id != benefit_filter:
+            continue
+        by_question.setdefault((phase, q_id), []).append(group)
+
+    themes = {'questions': {}, 'parameters': {}}
+    for key, groups in by_question.items():
+        themes['questions'][key] = summarize_theme_groups(index, init_id, groups)
     for param_name, param_data in PARAMETERS.items():
-        param_scores = []
-        for phase in PHASES:
-            if phase in stats['questions']:
-                for q_id in param_data['questions']:
-                    if q_id in stats['questions'][phase]:
-                        param_scores.append(stats['questions'][phase][q_id]['avg'])
-        if param_scores:
-            stats['parameters'][param_name] = {'avg': np.mean(param_scores), 'description': param_data['description']}
-    
-    if all_avgs:
-        stats['overall_avg'] = np.mean(all_avgs)
-    
-    stats['high_maturity'].sort(key=lambda x: x['score'], reverse=True)
-    stats['low_maturity'].sort(key=lambda x: x['score'])
-    
-    return stats
+        groups = [group for (phase, q_id), q_groups in by_question.items()
+                  if int(q_id) in param_data['questions'] for group in q_groups]
+        if groups:
+            themes['parameters'][param_name] = summarize_theme_groups(index, init_id, groups)
+    return themes
+
+def format_theme_terms(items):
+    return ", ".join(term for term, _ in items) if items else "-"
+
+# ============================================================================
+# IMPORT AV HISTORISKE INTERVJUER
+# ============================================================================
+# felt: (etikett, påkrevd, kolonnenavn som kobles automatisk)
+IMPORT_FIELDS = {
+    'initiative': ("Initiativ", True, ("initiativ", "prosjekt", "initiative", "project")),
+    'phase': ("Fase", True, ("fase", "phase")),
+    'question': ("Spørsmål-ID", True, ("sporsmalid", "sporsmal", "spmid", "questionid", "question", "qid")),
+    'score': ("Score", True, ("score", "niva", "nivaa", "level")),
+    'benefit': ("Gevinst", False, ("gevinst", "benefit")),
+    'role': ("Rolle", False, ("rolle", "role", "stilling")),
+    'notes': ("Notater", False, ("notater", "notat", "notes", "kommentar")),
+    'interview': ("Intervju-ID", False, ("intervjuid", "intervju", "interviewid", "interview")),
+    'interviewee': ("Intervjuobjekt", False, ("intervjuobjekt", "deltaker", "interviewee")),
+    'interviewer': ("Intervjuer", False, ("intervjuer", "interviewer")),
+    'date': ("Dato", False, ("dato", "date")),
+}
+IMPORT_MAX_ERRORS = 1000
+
+def normalize_header(name):
+    return re.sub(r'[^a-z0-9]', '', fold_text(str(name or '')))
+
+def guess_import_mapping(headers):
+    # Koble felt til kolonner med kjente navn; brukeren kan overstyre i UI
+    columns = {normalize_header(header): header for header in headers if header}
+    mapping = {}
+    for field, (_, _, aliases) in IMPORT_FIELDS.items():
+        for alias in aliases:
+            if alias in columns and columns[alias] not in mapping.values():
+                mapping[field] = columns[alias]
+                break
+    return mapping
+
+def iter_import_table(file, filename):
+    """Strøm radene i en CSV- eller XLSX-fil som lister, uten å lese hele filen inn i minnet.
+    Første rad er overskrifter."""
+    if filename.lower().endswith(('.xlsx', '.xlsm')):
+        if not OPENPYXL_AVAILABLE:
+            raise RuntimeError("Import fra Excel krever openpyxl (pip install openpyxl). Lagre filen som CSV, eller installer pakken.")
+        workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+        try:
+            for row in workbook.active.iter_rows(values_only=True):
+                yield list(row)
+        finally:
+            workbook.close()
+        return
+    text = TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    try:
+        sample = text.read(8192)
+        text.seek(0)
+        try:
+            delimiter = csv.Sniffer().sniff(sample, delimiters=';,\t').delimiter
+        except csv.Error:
+            delimiter = ';'
+        yield from csv.reader(text, delimiter=delimiter)
+    finally:
+        # Opplastingen eies av kalleren og skal ikke lukkes sammen med tekstlaget
+        text.detach()
+
+def read_import_header(file, filename):
+    rows = iter_import_table(file, filename)
+    try:
+        header = next(rows, None)
+    finally:
+        rows.close()
+    file.seek(0)
+    return [str(column).strip() for column in header if column is not None] if header else []
+
+def read_import_rows(file, filename):
+    # (radnummer i filen, {kolonne: verdi}); tomme rader hoppes over
+    rows = iter_import_table(file, filename)
+    header = next(rows, None)
+    if header is None:
+        return
+    header = [str(column).strip() if column is not None else '' for column in header]
+    for row_number, row in enumerate(rows, start=2):
+        if any(value not in (None, '') for value in row):
+            yield row_number, dict(zip(header, row))
+
+def import_id(prefix, *parts):
+    # Faste id-er fra innholdet, slik at samme fil importert to ganger gir konflikt i stedet for duplikater
+    return f"{prefix}_{hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()[:16]}"
+
+@timed
+def plan_import(rows, mapping, storage, open_init_id=None):
+    """Valider radene mot PHASES og questions_data og samle dem til intervjuer.
+    Ugyldige rader hoppes over og rapporteres med radnummer; resten blir endringer
+    som kan skrives samlet med storage.apply_edits. Initiativer med tilgangskode tar
+    bare imot rader når de er det åpne prosjektet (open_init_id)."""
+    catalog = storage.load_catalog()
+    by_name = {}
+    for init_id, entry in catalog['initiatives'].items():
+        by_name.setdefault(entry['name'].strip().lower(), init_id)
+    question_ids = {phase: {q['id'] for q in questions_data[phase]} for phase in PHASES}
+    phase_names = {fold_text(phase): phase for phase in PHASES}
+    role_names = {fold_text(role): role for role in ROLES}
+    plan = {'rows': 0, 'responses': 0, 'error_count': 0, 'errors': [], 'initiatives': {}, 'interviews': {}}
+    phase_cache = {}
+    initiative_cache = {}
+
+    def cell(row, field):
+        column = mapping.get(field)
+        value = row.get(column) if column else None
+        if value is None:
+            return ''
+        if isinstance(value, datetime):
+            return value.strftime('%Y-%m-%d')
+        return str(value).strip()
+
+    def number(text):
+        value = float(text.replace(',', '.'))
+        if value != int(value):
+            raise ValueError(text)
+        return int(value)
+
+    def error(row_number, message):
+        plan['error_count'] += 1
+        if len(plan['errors']) < IMPORT_MAX_ERRORS:
+            plan['errors'].append((row_number, message))
+
+    def resolve_initiative(name):
+        key = name.lower()
+        if key not in initiative_cache:
+            init_id = name if name in catalog['initiatives'] else by_name.get(key)
+            if init_id is not None and catalog['initiatives'][init_id]['has_code'] and init_id != open_init_id:
+                initiative_cache[key] = None
+                return None
+            existing = storage.load_initiative(init_id) if init_id is not None else None
+            if existing is None:
+                # Ikke i katalogen, eller slettet eller uleselig etter at katalogen ble lest: opprettes som nytt
+                init_id = import_id('import', key)
+                target = {'name': name, 'new': True, 'benefits': {}, 'new_benefits': {}}
+            else:
+                target = {'name': catalog['initiatives'][init_id]['name'], 'new': False, 'new_benefits': {},
+                          'benefits': {benefit['name'].strip().lower(): benefit_id for benefit_id, benefit in existing['benefits'].items()}}
+            plan['initiatives'][init_id] = target
+            initiative_cache[key] = init_id
+        return initiative_cache[key]
+
+    def resolve_benefit(init_id, name):
+        if not name:
+            return "all", "Generelt for initiativet"
+        target = plan['initiatives'][init_id]
+        key = name.lower()
+        if key not in target['benefits']:
+            benefit_id = import_id('import', init_id, key)
+            target['benefits'][key] = benefit_id
+            target['new_benefits'][benefit_id] = name
+        return target['benefits'][key], name
+
+    for row_number, row in rows:
+        plan['rows'] += 1
+        name = cell(row, 'initiative')
+        if not name:
+            error(row_number, "Mangler initiativ")
+            continue
+        phase_text = cell(row, 'phase')
+        if phase_text not in phase_cache:
+            phase_cache[phase_text] = phase_names.get(fold_text(phase_text))
+        phase = phase_cache[phase_text]
+        if phase is None:
+            error(row_number, f"Ukjent fase '{phase_text}'. Gyldige faser: {', '.join(PHASES)}")
+            continue
+        try:
+            q_id = number(cell(row, 'question'))
+        except ValueError:
+            error(row_number, f"Ugyldig spørsmål-ID '{cell(row, 'question')}'")
+            continue
+        if q_id not in question_ids[phase]:
+            error(row_number, f"Spørsmål {q_id} finnes ikke i fasen {phase}")
+            continue
+        try:
+            score = number(cell(row, 'score'))
+        except ValueError:
+            error(row_number, f"Ugyldig score '{cell(row, 'score')}'")
+            continue
+        if not 1 <= score <= 5:
+            error(row_number, f"Score må være 1-5, fikk {score}")
+            continue
+
+        init_id = resolve_initiative(name)
+        if init_id is None:
+            error(row_number, f"Initiativet '{name}' har tilgangskode. Åpne prosjektet for å importere til det")
+            continue
+        benefit_id, benefit_name = resolve_benefit(init_id, cell(row, 'benefit'))
+        role = cell(row, 'role')
+        interviewee = cell(row, 'interviewee')
+        date = cell(row, 'date')
+        if mapping.get('interview'):
+            key = (init_id, cell(row, 'interview'))
+        else:
+            key = (init_id, benefit_id, phase, role, interviewee, date)
+        interview = plan['interviews'].get(key)
+        if interview is None:
+            selected_role = role_names.get(fold_text(role))
+            interview = {
+                'init_id': init_id, 'interview_id': import_id('import', *key), 'phase': phase,
+                'value': {
+                    'info': {'interviewer': cell(row, 'interviewer'), 'interviewee': interviewee, 'role': role, 'date': date,
+                             'phase': phase, 'benefit_id': benefit_id, 'benefit_name': benefit_name,
+                             'focus_mode': "Rollebasert" if selected_role else "Alle sporsmal",
+                             'selected_role': selected_role, 'selected_params': [], 'imported': True},
+                    'recommended_questions': get_recommended_questions("role", selected_role, phase), 'responses': {phase: {}}
+                }
+            }
+            plan['interviews'][key] = interview
+        elif interview['phase'] != phase:
+            error(row_number, f"Intervjuet er i fasen {interview['phase']}, raden har {phase}")
+            continue
+        responses = interview['value']['responses'][phase]
+        if str(q_id) in responses:
+            error(row_number, f"Spørsmål {q_id} er besvart to ganger i samme intervju")
+            continue
+        responses[str(q_id)] = {'score': score, 'notes': cell(row, 'notes')}
+        plan['responses'] += 1
+    return plan
+
+def import_edits(plan):
+    # Nye initiativer og gevinster først, deretter ett intervju per gruppe med alle svarene
+    at = datetime.now().isoformat()
+    edits = []
+    for init_id, target in plan['initiatives'].items():
+        if target['new']:
+            edits.append({'op': 'initiative', 'init_id': init_id, 'base': None, 'base_version': None, 'at': at,
+                          'fields': {'name': target['name'], 'description': "Importert fra fil", 'access_code': '', 'created': at}})
+        for benefit_id, name in target['new_benefits'].items():
+            edits.append({'op': 'benefit', 'init_id': init_id, 'benefit_id': benefit_id, 'value': {'name': name, 'created': at}, 'at': at})
+    for interview in plan['interviews'].values():
+        edits.append({'op': 'interview', 'init_id': interview['init_id'], 'interview_id': interview['interview_id'],
+                      'value': interview['value'], 'at': at})
+    return edits
+
+def import_interviews(file, filename, mapping, storage, dry_run=False, open_init_id=None):
+    """Les, valider og skriv en hel fil i én samlet skriving (én sikkerhetskopi for filbasert lager).
+    Returnerer planen og resultatet fra apply_edits (None ved tørrkjøring eller ingen gyldige rader)."""
+    plan = plan_import(read_import_rows(file, filename), mapping, storage, open_init_id)
+    edits = import_edits(plan)
+    if dry_run or not edits:
+        return plan, None
+    return plan, storage.apply_edits(edits)
+
+def show_import():
+    # Import av intervjuer fra tidligere runder, én rad per svar
+    st.markdown("### Importer intervjuer fra fil")
+    st.caption("CSV (semikolon eller komma) eller Excel med én rad per svar. Påkrevde kolonner er merket med *. "
+               "Prosjekter med tilgangskode tar bare imot rader når de er åpnet.")
+    uploaded = st.file_uploader("Fil", type=['csv', 'xlsx'], key="import_file")
+    if uploaded is None:
+        return
+    try:
+        headers = read_import_header(uploaded, uploaded.name)
+    except Exception as e:
+        st.error(f"Filen kunne ikke leses: {e}")
+        return
+    guessed = guess_import_mapping(headers)
+    options = ["(ingen)"] + headers
+    mapping = {}
+    columns = st.columns(4)
+    for position, (field, (label, required, _)) in enumerate(IMPORT_FIELDS.items()):
+        default = guessed.get(field)
+        choice = columns[position % 4].selectbox(f"{label} *" if required else label, options,
+                                                 index=options.index(default) if default else 0, key=f"import_map_{field}")
+        if choice != "(ingen)":
+            mapping[field] = choice
+    missing = [label for field, (label, required, _) in IMPORT_FIELDS.items() if required and field not in mapping]
+    if missing:
+        st.warning(f"Velg kolonne for: {', '.join(missing)}")
+        return
+
+    col_check, col_import = st.columns(2)
+    dry_run = col_check.button("Kontroller fil", use_container_width=True)
+    if not dry_run and not col_import.button("Importer", type="primary", use_container_width=True):
+        return
+    uploaded.seek(0)
+    start = time.perf_counter()
+    try:
+        plan, results = import_interviews(uploaded, uploaded.name, mapping, get_storage(), dry_run=dry_run,
+                                          open_init_id=st.session_state.get('current_project'))
+    except Exception as e:
+        st.error(f"Import feilet: {e}")
+        return
+    elapsed = time.perf_counter() - start
+    valid = plan['rows'] - plan['error_count']
+    new_initiatives = sum(1 for target in plan['initiatives'].values() if target['new'])
+    summary = f"{plan['rows']} rader lest på {elapsed:.1f} s: {valid} gyldige svar i {len(plan['interviews'])} intervjuer, {new_initiatives} nye initiativer."
+    if results is None:
+        st.info(summary if dry_run else f"{summary} Ingenting å importere.")
+    else:
+        imported = sum(1 for edit in results['applied'] if edit['op'] == 'interview')
+        st.success(f"{summary} {imported} intervjuer importert.")
+        existing = sum(1 for edit in results['conflict'] if edit['op'] == 'interview')
+        if existing:
+            st.warning(f"{existing} intervjuer finnes allerede (importert tidligere) og ble hoppet over.")
+        st.session_state.pop('catalog_cache', None)
+    if plan['error_count']:
+        st.error(f"{plan['error_count']} rader har feil og blir ikke importert" +
+                 (f" (viser de første {IMPORT_MAX_ERRORS})" if plan['error_count'] > IMPORT_MAX_ERRORS else ""))
+        st.dataframe(pd.DataFrame(plan['errors'], columns=["Rad", "Feil"]), use_container_width=True, hide_index=True)
+
+# ============================================================================
+# FELTINTERVJUER UTEN NETT
+# ============================================================================
+# Et sett er en selvstendig HTML-side med spørsmålene for ett initiativ, én fase og (valgfritt) én rolle.
+# Siden lagrer en svarfil signert med settets nøkkel (HMAC-SHA256), og mange svarfiler importeres i én skriving.
+# Nøkkelen avledes fra KIT_SECRET_ENV og alt settet gjelder (initiativ, fase, rolle og gevinst), så en svarfil
+# bare kan signeres for det settet ble laget for. Flere app-instanser som deler lager må ha samme verdi.
+KIT_FORMAT = 2
+KIT_SECRET_ENV = "MODENHET_KIT_SECRET"
+KIT_SECRET_FILE = "modenhet_feltnokkel"
+KIT_MAX_FILE_BYTES = 2_000_000
+ANSWER_FIELDS = {'kit_id': str, 'answer_id': str, 'init_id': str, 'phase': str, 'role': (str, type(None)), 'benefit_id': str, 'info': dict, 'responses': dict}
+
+def get_kit_secret():
+    # Fra miljøet, ellers generert én gang og lagret ved datafilen
+    secret = os.environ.get(KIT_SECRET_ENV)
+    if secret:
+        return secret.encode('utf-8')
+    try:
+        fd = os.open(KIT_SECRET_FILE, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o600)
+    except FileExistsError:
+        with open(KIT_SECRET_FILE, 'rb') as f:
+            return f.read()
+    with os.fdopen(fd, 'wb') as f:
+        secret = secrets.token_hex(32).encode('ascii')
+        f.write(secret)
+    return secret
+
+def kit_key(kit_id, init_id, phase, role, benefit_id):
+    # Nøkkelen ligger i settets HTML-side, så den må ikke kunne brukes for andre initiativer, faser eller gevinster
+    binding = json.dumps([kit_id, init_id, phase, role, benefit_id], ensure_ascii=False)
+    return hmac.new(get_kit_secret(), binding.encode('utf-8'), hashlib.sha256).hexdigest()
 
+def sign_answer(answer, payload):
+    # Samme beregning som i settets HTML-side (crypto.subtle): HMAC-SHA256 av svarteksten med settets nøkkel
+    key = kit_key(answer['kit_id'], answer['init_id'], answer['phase'], answer['role'], answer['benefit_id'])
+    return hmac.new(key.encode('utf-8'), payload.encode('utf-8'), hashlib.sha256).hexdigest()
+
+def build_interview_kit(initiative, init_id, phase, role=None, benefit_id="all"):
+    """Alt som trengs for å gjennomføre ett intervju uten nett: spørsmål og skala for fasen,
+    anbefalte spørsmål for rollen og hvem svarene hører til."""
+    kit_id = uuid.uuid4().hex
+    return {
+        'format': KIT_FORMAT, 'kit_id': kit_id, 'key': kit_key(kit_id, init_id, phase, role, benefit_id), 'created': datetime.now().isoformat(timespec='seconds'),
+        'init_id': init_id, 'initiative': initiative['name'], 'phase': phase, 'role': role,
+        'benefit_id': benefit_id, 'benefit_name': initiative['benefits'][benefit_id]['name'] if benefit_id != "all" else "Generelt for initiativet",
+        'recommended': get_recommended_questions("role", role, phase),
+        'questions': [{'id': q['id'], 'title': q['title'], 'question': q['question'], 'scale': q['scale']} for q in questions_data[phase]]
+    }
+
+KIT_HTML = """<!DOCTYPE html>
+<html lang="no">
+<head>
+<meta charset="UTF-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>Feltintervju - __TITLE__</title>
+<style>__CSS__
+    .question { border: 1px solid #E8EEF5; border-radius: 6px; padding: 12px 16px; margin: 12px 0; }
+    .question.answered { border-left: 4px solid #35DE6D; }
+    .scale { font-size: 0.9rem; color: #555; margin: 6px 0; padding-left: 18px; }
+    .levels label { margin-right: 14px; white-space: nowrap; }
+    textarea { width: 100%; min-height: 60px; font: inherit; }
+    .info input { margin: 4px 12px 4px 0; padding: 4px; font: inherit; }
+    button { font: inherit; padding: 8px 18px; background: #0053A6; color: white; border: 0; border-radius: 4px; cursor: pointer; }
+    #status { margin-left: 12px; }
+</style>
+</head>
+<body>
+<h1>Feltintervju</h1>
+<p class="subtitle" id="subtitle"></p>
+<div class="info">
+    <label>Intervjuer <input id="interviewer"></label>
+    <label>Intervjuobjekt* <input id="interviewee"></label>
+    <label>Stilling <input id="role"></label>
+    <label>Dato <input id="date" type="date"></label>
+</div>
+<p><button id="save">Lagre svarfil</button><span id="status"></span></p>
+<div id="questions"></div>
+<p>Svarene lagres fortløpende i nettleseren. Lever svarfilen til den som importerer intervjuene.</p>
+<script>
+const KIT = __KIT__;
+const STORE = "modenhet_kit_" + KIT.kit_id;
+const state = JSON.parse(localStorage.getItem(STORE) || "null") || {answer_id: newId(), info: {date: new Date().toISOString().slice(0, 10)}, responses: {}};
+function newId() {
+    const bytes = new Uint8Array(16);
+    crypto.getRandomValues(bytes);
+    return Array.from(bytes, b => b.toString(16).padStart(2, "0")).join("");
+}
+function persist() { localStorage.setItem(STORE, JSON.stringify(state)); }
+function el(tag, attrs, text) {
+    const node = document.createElement(tag);
+    Object.assign(node, attrs || {});
+    if (text !== undefined) node.textContent = text;
+    return node;
+}
+function renderQuestion(q, parent) {
+    const id = String(q.id);
+    const response = state.responses[id] || {score: 0, notes: ""};
+    const box = el("div", {className: "question" + (response.score ? " answered" : "")});
+    box.append(el("h3", {}, q.id + ". " + q.title), el("p", {}, q.question));
+    const scale = el("ul", {className: "scale"});
+    q.scale.forEach(level => scale.append(el("li", {}, level)));
+    const levels = el("div", {className: "levels"});
+    for (let score = 0; score <= 5; score++) {
+        const input = el("input", {type: "radio", name: "q" + id, value: score, checked: response.score === score});
+        input.addEventListener("change", () => update(id, {score: score}, box));
+        const label = el("label");
+        label.append(input, " " + (score ? "Nivå " + score : "Ikke besvart"));
+        levels.append(label);
+    }
+    const notes = el("textarea", {value: response.notes, placeholder: "Notater"});
+    notes.addEventListener("input", () => update(id, {notes: notes.value}, box));
+    box.append(scale, levels, notes);
+    parent.append(box);
+}
+function update(id, change, box) {
+    const response = Object.assign(state.responses[id] || {score: 0, notes: ""}, change);
+    if (response.score || response.notes.trim()) state.responses[id] = response; else delete state.responses[id];
+    box.classList.toggle("answered", response.score > 0);
+    persist();
+}
+async function sign(text) {
+    const encoder = new TextEncoder();
+    const key = await crypto.subtle.importKey("raw", encoder.encode(KIT.key), {name: "HMAC", hash: "SHA-256"}, false, ["sign"]);
+    const signature = await crypto.subtle.sign("HMAC", key, encoder.encode(text));
+    return Array.from(new Uint8Array(signature), b => b.toString(16).padStart(2, "0")).join("");
+}
+async function save() {
+    const status = document.getElementById("status");
+    if (!state.info.interviewee) { status.textContent = "Fyll inn intervjuobjekt først."; return; }
+    if (!crypto.subtle) { status.textContent = "Nettleseren kan ikke signere svarfilen her. Åpne filen i en nyere nettleser."; return; }
+    const payload = JSON.stringify({format: KIT.format, kit_id: KIT.kit_id, answer_id: state.answer_id, init_id: KIT.init_id,
+        phase: KIT.phase, role: KIT.role, benefit_id: KIT.benefit_id, info: state.info, responses: state.responses,
+        saved: new Date().toISOString()});
+    const blob = new Blob([JSON.stringify({format: KIT.format, payload: payload, signature: await sign(payload)})], {type: "application/json"});
+    const link = el("a", {href: URL.createObjectURL(blob), download: ("svar_" + KIT.initiative + "_" + state.info.interviewee + "_" + state.info.date).replace(/[^\\w\\-]+/g, "_") + ".json"});
+    document.body.append(link);
+    link.click();
+    link.remove();
+    status.textContent = Object.keys(state.responses).length + " svar lagret i svarfilen.";
+}
+document.getElementById("subtitle").textContent = KIT.initiative + " | " + KIT.phase + " | " + KIT.benefit_name + (KIT.role ? " | " + KIT.role : "");
+for (const field of ["interviewer", "interviewee", "role", "date"]) {
+    const input = document.getElementById(field);
+    input.value = state.info[field] || "";
+    input.addEventListener("input", () => { state.info[field] = input.value; persist(); });
+}
+const container = document.getElementById("questions");
+const recommended = KIT.questions.filter(q => KIT.recommended.includes(q.id));
+const others = KIT.questions.filter(q => !KIT.recommended.includes(q.id));
+if (recommended.length) {
+    container.append(el("h2", {}, "Anbefalte spørsmål"));
+    recommended.forEach(q => renderQuestion(q, container));
+}
+const rest = recommended.length ? el("details") : container;
+if (recommended.length) { rest.append(el("summary", {}, "Andre spørsmål (" + others.length + ")")); container.append(rest); }
+others.forEach(q => renderQuestion(q, rest));
+document.getElementById("save").addEventListener("click", save);
+persist();
+</script>
+</body>
+</html>"""
+
+def kit_html(kit):
+    # Hele settet i én fil; JSON-en legges inn i et script-element, så </ må skrives om
+    embedded = json.dumps(kit, ensure_ascii=False).replace("</", "<\\/")
+    title = html_escape(f"{kit['initiative']} - {kit['phase']}")
+    return KIT_HTML.replace("__TITLE__", title).replace("__CSS__", REPORT_CSS).replace("__KIT__", embedded)
+
+def kit_file_name(kit):
+    name = re.sub(r'[^\w-]+', '_', f"{kit['initiative']}_{kit['phase']}")
+    return f"feltintervju_{name}.html"
+
+def read_answer_file(raw):
+    """(svar, None) for en svarfil med gyldig signatur, ellers (None, feilmelding)"""
+    if len(raw) > KIT_MAX_FILE_BYTES:
+        return None, "Filen er for stor til å være en svarfil"
+    try:
+        envelope = json.loads(raw)
+        payload, signature = envelope['payload'], envelope['signature']
+        answer = json.loads(payload)
+    except (ValueError, KeyError, TypeError):
+        return None, "Ikke en svarfil fra feltintervju"
+    if not isinstance(answer, dict) or answer.get('format') != KIT_FORMAT:
+        return None, f"Ukjent format {answer.get('format') if isinstance(answer, dict) else None} - settet må lages på nytt"
+    if any(field not in answer or not isinstance(answer[field], kind) for field, kind in ANSWER_FIELDS.items()):
+        return None, "Svarfilen mangler felt"
+    # Initiativ, fase, rolle og gevinst inngår i nøkkelen, så de kan ikke endres uten at signaturen brytes
+    if not isinstance(signature, str) or not hmac.compare_digest(sign_answer(answer, payload), signature):
+        return None, "Signaturen stemmer ikke: filen er endret etter lagring, eller settet er ikke laget her"
+    return answer, None
+
+def answer_responses(answer):
+    # Svarene i filen kontrollert mot questions_data; (svar, ugyldige spørsmål-id-er)
+    valid_ids = {str(q['id']) for q in questions_data[answer['phase']]}
+    responses, invalid = {}, []
+    for q_id, response in answer['responses'].items():
+        score = response.get('score') if isinstance(response, dict) else None
+        notes = response.get('notes', '') if isinstance(response, dict) else None
+        if q_id not in valid_ids or not isinstance(score, int) or not 0 <= score <= 5 or not isinstance(notes, str):
+            invalid.append(q_id)
+        elif score or notes.strip():
+            responses[q_id] = {'score': score, 'notes': notes}
+    return responses, invalid
+
+def interview_match_key(info):
+    return (fold_text(info['interviewee']).strip(), info['date'], info['phase'])
+
+@timed
+def plan_kit_import(files, storage, include_duplicates=False):
+    """Kontroller svarfiler (navn, innhold) og gjør dem om til intervjuer.
+    Filer med feil avvises; filer som allerede er importert, eller som ligner et eksisterende intervju
+    (samme intervjuobjekt, dato og fase), rapporteres som konflikter og hoppes over med mindre include_duplicates."""
+    catalog = storage.load_catalog()
+    plan = {'files': 0, 'responses': 0, 'errors': [], 'conflicts': [], 'interviews': []}
+    initiatives = {}
+    existing = {}
+    seen = {}
+    for name, raw in files:
+        plan['files'] += 1
+        answer, problem = read_answer_file(raw)
+        if problem:
+            plan['errors'].append((name, problem))
+            continue
+        init_id, phase = answer['init_id'], answer['phase']
+        if init_id not in catalog['initiatives']:
+            plan['errors'].append((name, "Initiativet finnes ikke lenger"))
+            continue
+        if phase not in PHASES:
+            plan['errors'].append((name, f"Ukjent fase '{phase}'"))
+            continue
+        responses, invalid = answer_responses(answer)
+        if invalid:
+            plan['errors'].append((name, f"Ugyldige svar på spørsmål {', '.join(map(str, invalid))}"))
+            continue
+        if not responses:
+            plan['errors'].append((name, "Ingen svar i filen"))
+            continue
+        if init_id not in initiatives:
+            initiatives[init_id] = storage.load_initiative(init_id)
+            if initiatives[init_id] is not None:
+                existing[init_id] = {interview_match_key(interview['info']): iid for iid, interview in initiatives[init_id]['interviews'].items()}
+        initiative = initiatives[init_id]
+        if initiative is None:
+            # Slettet eller uleselig etter at katalogen ble lest
+            plan['errors'].append((name, "Initiativet finnes ikke lenger"))
+            continue
+        benefit_id = answer['benefit_id']
+        if benefit_id != "all" and benefit_id not in initiative['benefits']:
+            plan['errors'].append((name, "Gevinsten finnes ikke lenger"))
+            continue
+        info = answer['info']
+        interview_id = import_id('felt', answer['kit_id'], answer['answer_id'])
+        if interview_id in seen:
+            plan['errors'].append((name, f"Samme svar som i {seen[interview_id]}"))
+            continue
+        seen[interview_id] = name
+        role = answer['role'] if answer['role'] in ROLES else None
+        value = {
+            'info': {'interviewer': str(info.get('interviewer', '')), 'interviewee': str(info.get('interviewee', '')), 'role': str(info.get('role', '')),
+                     'date': str(info.get('date', '')), 'phase': phase, 'benefit_id': benefit_id,
+                     'benefit_name': initiative['benefits'][benefit_id]['name'] if benefit_id != "all" else "Generelt for initiativet",
+                     'focus_mode': "Rollebasert" if role else "Alle sporsmal", 'selected_role': role,
+                     'selected_params': [], 'imported': True, 'kit_id': answer['kit_id']},
+            'recommended_questions': get_recommended_questions("role", role, phase), 'responses': {phase: responses}
+        }
+        if interview_id in initiative['interviews']:
+            plan['conflicts'].append((name, "Allerede importert"))
+            continue
+        match = existing[init_id].get(interview_match_key(value['info']))
+        if match is not None and not include_duplicates:
+            other = initiative['interviews'][match]['info'] if match in initiative['interviews'] else None
+            plan['conflicts'].append((name, f"Ligner intervjuet med {other['interviewee']} {other['date']} ({phase})" if other else "Samme intervjuobjekt, dato og fase som en annen fil"))
+            continue
+        existing[init_id][interview_match_key(value['info'])] = interview_id
+        plan['interviews'].append({'file': name, 'init_id': init_id, 'interview_id': interview_id, 'value': value})
+        plan['responses'] += len(responses)
+    return plan
+
+def import_kit_answers(files, storage, dry_run=False, include_duplicates=False):
+    """Kontroller og skriv alle gyldige svarfiler i én samlet skriving. Intervjuer som noen andre har lagt inn
+    i mellomtiden kommer tilbake som konflikt fra apply_edits. Returnerer planen og resultatet (None ved tørrkjøring)."""
+    plan = plan_kit_import(files, storage, include_duplicates)
+    if dry_run or not plan['interviews']:
+        return plan, None
+    at = datetime.now().isoformat()
+    edits = [{'op': 'interview', 'init_id': item['init_id'], 'interview_id': item['interview_id'], 'value': item['value'], 'at': at, 'file': item['file']}
+             for item in plan['interviews']]
+    return plan, storage.apply_edits(edits)
+
+def show_field_kits(initiative, init_id):
+    # Sett for intervjuer uten nett, og import av svarfilene
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("### Lag sett")
+        benefit_options = {"Generelt for initiativet": "all"}
+        benefit_options.update({benefit['name']: benefit_id for benefit_id, benefit in initiative['benefits'].items()})
+        benefit_id = benefit_options[st.selectbox("Gevinst", options=list(benefit_options), key="kit_benefit")]
+        phase = st.selectbox("Fase", options=PHASES, key="kit_phase")
+        role = st.selectbox("Rolle", options=["(alle spørsmål)"] + list(ROLES), key="kit_role")
+        selection = (init_id, phase, role if role in ROLES else None, benefit_id)
+        if st.session_state.get('field_kit', (None,))[0] != selection:
+            # Samme sett (og nøkkel) gjenbrukes til valget endres
+            st.session_state.field_kit = (selection, build_interview_kit(initiative, *selection))
+        kit = st.session_state.field_kit[1]
+        st.caption(f"{len(kit['questions'])} spørsmål, {len(kit['recommended'])} anbefalt. Siden virker uten nett og lagrer en signert svarfil.")
+        st.download_button("Last ned sett (HTML)", data=kit_html(kit), file_name=kit_file_name(kit), mime="text/html", use_container_width=True)
+    with col2:
+        st.markdown("### Importer svarfiler")
+        uploaded = st.file_uploader("Svarfiler", type=['json'], accept_multiple_files=True, key="kit_answers")
+        include_duplicates = st.checkbox("Importer også svar som ligner eksisterende intervjuer", key="kit_include_duplicates")
+        if not uploaded:
+            return
+        col_check, col_import = st.columns(2)
+        dry_run = col_check.button("Kontroller", use_container_width=True, key="kit_check")
+        if not dry_run and not col_import.button("Importer", type="primary", use_container_width=True, key="kit_import"):
+            return
+        plan, results = import_kit_answers([(file.name, file.getvalue()) for file in uploaded], get_storage(), dry_run, include_duplicates)
+        conflicts = list(plan['conflicts'])
+        if results is None:
+            st.info(f"{plan['files']} filer: {len(plan['interviews'])} intervjuer med {plan['responses']} svar klare for import.")
+        else:
+            imported = len(results['applied'])
+            conflicts += [(edit['file'], "Intervjuet ble lagt inn av andre under importen") for edit in results['conflict']]
+            st.success(f"{imported} intervjuer med {plan['responses']} svar importert i én lagring.")
+            st.session_state.pop('catalog_cache', None)
+        if conflicts:
+            st.warning(f"{len(conflicts)} filer er hoppet over fordi intervjuet finnes fra før")
+            st.dataframe(pd.DataFrame(conflicts, columns=["Fil", "Konflikt"]), use_container_width=True, hide_index=True)
+        if plan['errors']:
+            st.error(f"{len(plan['errors'])} filer kunne ikke importeres")
+            st.dataframe(pd.DataFrame(plan['errors'], columns=["Fil", "Feil"]), use_container_width=True, hide_index=True)
+
+# ============================================================================
+# STYLING
+# ============================================================================
+st.markdown(f"""
+<style>
+@import url('https://fonts.googleapis.com/css2?family=Source+Sans+Pro:wght@400;600;700&display=swap');
+html, body, [class*="css"] {{ font-family: 'Source Sans Pro', sans-serif; font-size: 16px; }}
+.main-header {{ font-size: 2.2rem; color: {COLORS['primary_dark']}; text-align: center; margin-bottom: 0.3rem; font-weight: 700; }}
+.sub-header {{ font-size: 1.1rem; color: {COLORS['primary']}; text-align: center; margin-bottom: 1.5rem; }}
+.metric-card {{ background: {COLORS['gray_light']}; padding: 1.2rem; border-radius: 8px; border-left: 4px solid {COLORS['primary']}; text-align: center; margin: 0.3rem 0; }}
+.metric-value {{ font-size: 2.2rem; font-weight: 700; color: {COLORS['primary_dark']}; }}
+.metric-label {{ font-size: 0.95rem; color: #666; text-transform: uppercase; }}
+.strength-card {{ background: linear-gradient(135deg, #DDFAE2 0%, {COLORS['gray_light']} 100%); padding: 1rem; border-radius: 8px; border-left: 4px solid {COLORS['success']}; margin: 0.5rem 0; font-size: 1.05rem; }}
+.improvement-card {{ background: linear-gradient(135deg, rgba(255, 107, 107, 0.15) 0%, {COLORS['gray_light']} 100%); padding: 1rem; border-radius: 8px; border-left: 4px solid {COLORS['danger']}; margin: 0.5rem 0; font-size: 1.05rem; }}
+.stButton > button {{ background: linear-gradient(135deg, {COLORS['primary']} 0%, {COLORS['primary_dark']} 100%); color: white; border: none; border-radius: 6px; padding: 0.6rem 1.2rem; font-weight: 600; font-size: 1rem; }}
+.stProgress > div > div > div > div {{ background: linear-gradient(90deg, {COLORS['primary_light']} 0%, {COLORS['success']} 100%); }}
+div[data-testid="stMetricValue"] {{ font-size: 2rem; }}
+div[data-testid="stMarkdownContainer"] p {{ font-size: 1.05rem; }}
+div[data-testid="stMarkdownContainer"] li {{ font-size: 1.05rem; }}
+.stSelectbox label, .stTextInput label, .stTextArea label {{ font-size: 1rem; }}
+#MainMenu {{visibility: hidden;}}
+footer {{visibility: hidden;}}
+</style>
+""", unsafe_allow_html=True)
+
+# ============================================================================
+# HJELPEFUNKSJONER
+# ============================================================================
 def get_score_color(score):
     if score >= 4.5: return COLORS['success']
     elif score >= 3.5: return COLORS['primary_light']
@@ -580,7 +3187,21 @@ def get_score_text(score):
     elif score >= 2.5: return "Moderat modenhet"
     elif score >= 1.5: return "Begrenset modenhet"
     else: return "Lav modenhet"
-    if not initiative.get('interviews'):
+
+def get_recommended_questions(mode, selection, phase):
+    if mode == "role" and selection in ROLES:
+        return ROLES[selection].get('recommended_questions', {}).get(phase, [])
+    elif mode == "parameter":
+        recommended = set()
+        for param_name in selection:
+            if param_name in PARAMETERS:
+                recommended.update(PARAMETERS[param_name]['questions'])
+        return list(recommended)
+    return []
+
+@timed
+def calculate_stats(initiative, benefit_filter=None):
+    if not initiative['interviews']:
         return None
     
     all_scores = {}
@@ -592,15 +3213,18 @@ def get_score_text(score):
     interview_count = 0
     for interview in initiative['interviews'].values():
         if benefit_filter and benefit_filter != "all":
-            if interview.get('info', {}).get('benefit_id') != benefit_filter:
+            if interview['info']['benefit_id'] != benefit_filter:
                 continue
         interview_count += 1
         
-        for phase, questions in interview.get('responses', {}).items():
+        for phase, questions in interview['responses'].items():
             for q_id, resp in questions.items():
-                if resp.get('score', 0) > 0:
+                if resp['score'] > 0:
                     all_scores[phase][int(q_id)].append(resp['score'])
-    
+    return stats_from_scores(all_scores, interview_count)
+
+def stats_from_scores(all_scores, interview_count):
+    # Snitt, styrker og forbedringsområder fra scorene per fase og spørsmål; felles for intervjuene og svarmatrisen
     stats = {
         'phases': {},
         'questions': {},
@@ -615,6 +3239,7 @@ def get_score_text(score):
     
     for phase in PHASES:
         phase_scores = []
+        phase_count = 0
         stats['questions'][phase] = {}
         
         for q in questions_data[phase]:
@@ -626,26 +3251,29 @@ def get_score_text(score):
                     'count': len(scores), 'title': q['title'], 'question': q['question']
                 }
                 phase_scores.append(avg)
+                phase_count += len(scores)
                 all_avgs.append(avg)
                 
-                item = {'phase': phase, 'question_id': q['id'], 'title': q['title'], 'score': avg}
+                item = {'phase': phase, 'question_id': q['id'], 'title': q['title'], 'score': avg, 'count': len(scores)}
                 if avg >= 4:
                     stats['high_maturity'].append(item)
                 elif avg < 3:
                     stats['low_maturity'].append(item)
         
         if phase_scores:
-            stats['phases'][phase] = {'avg': np.mean(phase_scores), 'min': min(phase_scores), 'max': max(phase_scores)}
+            stats['phases'][phase] = {'avg': np.mean(phase_scores), 'min': min(phase_scores), 'max': max(phase_scores), 'count': phase_count}
     
     for param_name, param_data in PARAMETERS.items():
         param_scores = []
+        param_count = 0
         for phase in PHASES:
             if phase in stats['questions']:
                 for q_id in param_data['questions']:
                     if q_id in stats['questions'][phase]:
                         param_scores.append(stats['questions'][phase][q_id]['avg'])
+                        param_count += stats['questions'][phase][q_id]['count']
         if param_scores:
-            stats['parameters'][param_name] = {'avg': np.mean(param_scores), 'description': param_data['description']}
+            stats['parameters'][param_name] = {'avg': np.mean(param_scores), 'description': param_data['description'], 'count': param_count}
     
     if all_avgs:
         stats['overall_avg'] = np.mean(all_avgs)
@@ -655,118 +3283,253 @@ def get_score_text(score):
     
     return stats
 
+def get_score_color(score):
+    if score >= 4.5: return COLORS['success']
+    elif score >= 3.5: return COLORS['primary_light']
+    elif score >= 2.5: return COLORS['warning']
+    else: return COLORS['danger']
+
+def get_score_text(score):
+    if score >= 4.5: return "Høy modenhet"
+    elif score >= 3.5: return "God modenhet"
+    elif score >= 2.5: return "Moderat modenhet"
+    elif score >= 1.5: return "Begrenset modenhet"
+    else: return "Lav modenhet"
+
+
 # ============================================================================
 # DIAGRAMMER
 # ============================================================================
+# Et diagram beskrives som en spesifikasjon (type, tittel, etiketter, verdier, farger). Samme spesifikasjon
+# tegnes som Plotly i appen, SVG i HTML-rapporten og på resultatsiden, og som vektorgrafikk i PDF-en.
+CHART_CACHE_SIZE = 512
+CHART_WIDTH = {'radar': 450, 'bar': 500}
+RADAR_HEIGHT = 400
+RADAR_GRID = (0.2, 0.4, 0.6, 0.8, 1.0)
+BAR_HEIGHT = 35
+BAR_GAP = 10
+PDF_CIRCLE_SEGMENTS = 48
+
+_chart_cache = OrderedDict()  # (mål, sammendrag av spesifikasjonen) -> ferdig tegnet diagram
+_chart_cache_lock = threading.Lock()
+
+def chart_spec(kind, labels, values, colors, title="", value_format=".2f"):
+    if not labels:
+        return None
+    labels, values = list(labels), [float(v) for v in values]
+    if kind == 'radar' and len(labels) < 3:
+        # Radar krever minst 3 punkter - dupliser hvis færre
+        labels, values = (labels * 3)[:3], (values * 3)[:3]
+    colors = list(colors) if isinstance(colors, list) else [colors] * len(labels)
+    return {'kind': kind, 'title': title, 'labels': labels, 'values': values, 'colors': colors, 'value_format': value_format}
+
+def level_colors(values):
+    return [COLORS['success'] if v >= 4 else COLORS['primary_light'] if v >= 3 else COLORS['warning'] if v >= 2 else COLORS['danger'] for v in values]
+
+def item_label(item):
+    return f"[{item['phase'][:4]}] {item['title']}"
+
 def create_phase_radar(phase_data):
     if not phase_data:
         return None
-    categories = list(phase_data.keys())
-    values = [phase_data[c]['avg'] for c in categories]
-    # Dupliser hvis færre enn 3 punkter
-    if len(categories) == 1:
-        categories = categories * 3
-        values = values * 3
-    elif len(categories) == 2:
-        categories = categories + [categories[0]]
-        values = values + [values[0]]
-    fig = go.Figure()
-    fig.add_trace(go.Scatterpolar(r=values + [values[0]], theta=categories + [categories[0]], fill='toself', fillcolor='rgba(0, 83, 166, 0.3)', line=dict(color=COLORS['primary'], width=3)))
-    fig.update_layout(polar=dict(radialaxis=dict(visible=True, range=[0, 5], tickvals=[1,2,3,4,5], tickfont=dict(size=14)), angularaxis=dict(tickfont=dict(size=14))), showlegend=False, height=350, margin=dict(l=80, r=80, t=40, b=40), font=dict(size=14))
-    return fig
+    return chart_spec('radar', phase_data, [d['avg'] for d in phase_data.values()], COLORS['primary'], 'Modenhet per fase')
 
 def create_parameter_radar(param_data):
     if not param_data:
         return None
-    categories = list(param_data.keys())
-    values = [param_data[c]['avg'] for c in categories]
-    # Dupliser hvis færre enn 3 punkter
-    if len(categories) == 1:
-        categories = categories * 3
-        values = values * 3
-    elif len(categories) == 2:
-        categories = categories + [categories[0]]
-        values = values + [values[0]]
-    fig = go.Figure()
-    fig.add_trace(go.Scatterpolar(r=values + [values[0]], theta=categories + [categories[0]], fill='toself', fillcolor='rgba(100, 200, 250, 0.3)', line=dict(color=COLORS['primary_light'], width=3)))
-    fig.update_layout(polar=dict(radialaxis=dict(visible=True, range=[0, 5], tickfont=dict(size=14)), angularaxis=dict(tickfont=dict(size=13))), showlegend=False, height=400, margin=dict(l=100, r=100, t=40, b=40), font=dict(size=14))
-    return fig
+    return chart_spec('radar', param_data, [d['avg'] for d in param_data.values()], COLORS['primary_light'], 'Modenhet per parameter')
 
 def create_strength_radar(items, max_items=8):
     if not items:
         return None
     items = items[:max_items]
-    categories = [f"{item['title'][:20]}..." if len(item['title']) > 20 else item['title'] for item in items]
-    values = [item['score'] for item in items]
-    # Radar krever minst 3 punkter - dupliser hvis færre
-    if len(categories) == 1:
-        categories = categories * 3
-        values = values * 3
-    elif len(categories) == 2:
-        categories = categories + [categories[0]]
-        values = values + [values[0]]
-    fig = go.Figure()
-    fig.add_trace(go.Scatterpolar(r=values + [values[0]], theta=categories + [categories[0]], fill='toself', fillcolor='rgba(53, 222, 109, 0.3)', line=dict(color=COLORS['success'], width=3), name='Styrker'))
-    fig.update_layout(polar=dict(radialaxis=dict(visible=True, range=[0, 5], tickvals=[1,2,3,4,5], tickfont=dict(size=14)), angularaxis=dict(tickfont=dict(size=13))), showlegend=False, height=400, margin=dict(l=80, r=80, t=40, b=40), font=dict(size=14))
-    return fig
+    return chart_spec('radar', [item['title'] for item in items], [item['score'] for item in items], COLORS['success'], 'Styrkeområder')
 
 def create_improvement_radar(items, max_items=8):
     if not items:
         return None
     items = items[:max_items]
-    categories = [f"{item['title'][:20]}..." if len(item['title']) > 20 else item['title'] for item in items]
-    values = [item['score'] for item in items]
-    # Radar krever minst 3 punkter - dupliser hvis færre
-    if len(categories) == 1:
-        categories = categories * 3
-        values = values * 3
-    elif len(categories) == 2:
-        categories = categories + [categories[0]]
-        values = values + [values[0]]
-    fig = go.Figure()
-    fig.add_trace(go.Scatterpolar(r=values + [values[0]], theta=categories + [categories[0]], fill='toself', fillcolor='rgba(255, 107, 107, 0.3)', line=dict(color=COLORS['danger'], width=3), name='Forbedring'))
-    fig.update_layout(polar=dict(radialaxis=dict(visible=True, range=[0, 5], tickvals=[1,2,3,4,5], tickfont=dict(size=14))), showlegend=False, height=400, margin=dict(l=80, r=80, t=40, b=40), font=dict(size=14))
-    return fig
+    return chart_spec('radar', [item['title'] for item in items], [item['score'] for item in items], COLORS['danger'], 'Forbedringsområder')
 
 def create_strength_bar_chart(items, max_items=8):
     if not items:
         return None
     items = items[:max_items]
-    labels = [f"{item['phase'][:4]}: {item['title'][:25]}..." if len(item['title']) > 25 else f"{item['phase'][:4]}: {item['title']}" for item in items]
-    scores = [item['score'] for item in items]
-    fig = go.Figure(data=[go.Bar(x=scores, y=labels, orientation='h', marker_color=COLORS['success'], text=[f"{s:.1f}" for s in scores], textposition='outside', textfont=dict(size=16))])
-    fig.update_layout(xaxis=dict(range=[0, 5.5], title="Score", tickfont=dict(size=14)), yaxis=dict(autorange="reversed", tickfont=dict(size=13)), height=max(300, len(items) * 45), margin=dict(l=220, r=60, t=20, b=40), font=dict(size=14))
-    return fig
+    return chart_spec('bar', [item_label(item) for item in items], [item['score'] for item in items], COLORS['success'], 'Styrker - stolpediagram')
 
 def create_improvement_bar_chart(items, max_items=8):
     if not items:
         return None
     items = items[:max_items]
-    labels = [f"{item['phase'][:4]}: {item['title'][:25]}..." if len(item['title']) > 25 else f"{item['phase'][:4]}: {item['title']}" for item in items]
-    scores = [item['score'] for item in items]
-    fig = go.Figure(data=[go.Bar(x=scores, y=labels, orientation='h', marker_color=COLORS['danger'], text=[f"{s:.1f}" for s in scores], textposition='outside', textfont=dict(size=16))])
-    fig.update_layout(xaxis=dict(range=[0, 5.5], title="Score", tickfont=dict(size=14)), yaxis=dict(autorange="reversed", tickfont=dict(size=13)), height=max(300, len(items) * 45), margin=dict(l=220, r=60, t=20, b=40), font=dict(size=14))
-    return fig
+    return chart_spec('bar', [item_label(item) for item in items], [item['score'] for item in items], COLORS['danger'], 'Forbedring - stolpediagram')
 
 def create_parameter_bar_chart(param_data):
     if not param_data:
         return None
-    labels = list(param_data.keys())
-    scores = [param_data[p]['avg'] for p in labels]
-    colors = [COLORS['success'] if s >= 4 else COLORS['primary_light'] if s >= 3 else COLORS['warning'] if s >= 2 else COLORS['danger'] for s in scores]
-    fig = go.Figure(data=[go.Bar(x=scores, y=labels, orientation='h', marker_color=colors, text=[f"{s:.2f}" for s in scores], textposition='outside', textfont=dict(size=15))])
-    fig.update_layout(xaxis=dict(range=[0, 5.5], title="Score", tickfont=dict(size=14)), yaxis=dict(autorange="reversed", tickfont=dict(size=12)), height=max(350, len(labels) * 40), margin=dict(l=200, r=60, t=20, b=40), font=dict(size=14))
-    return fig
+    scores = [d['avg'] for d in param_data.values()]
+    return chart_spec('bar', param_data, scores, level_colors(scores), 'Parametere - stolpediagram')
 
 def create_phase_bar_chart(phase_data):
     if not phase_data:
         return None
-    labels = list(phase_data.keys())
-    scores = [phase_data[p]['avg'] for p in labels]
-    colors = [COLORS['success'] if s >= 4 else COLORS['primary_light'] if s >= 3 else COLORS['warning'] if s >= 2 else COLORS['danger'] for s in scores]
-    fig = go.Figure(data=[go.Bar(x=scores, y=labels, orientation='h', marker_color=colors, text=[f"{s:.2f}" for s in scores], textposition='outside', textfont=dict(size=16))])
-    fig.update_layout(xaxis=dict(range=[0, 5.5], title="Score", tickfont=dict(size=14)), yaxis=dict(autorange="reversed", tickfont=dict(size=14)), height=max(250, len(labels) * 50), margin=dict(l=150, r=60, t=20, b=40), font=dict(size=14))
-    return fig
+    scores = [d['avg'] for d in phase_data.values()]
+    return chart_spec('bar', phase_data, scores, level_colors(scores), 'Faser - stolpediagram')
+
+def chart_digest(spec):
+    return hashlib.sha1(json.dumps(spec, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+@functools.lru_cache(maxsize=64)
+def radar_geometry(n):
+    # Enhetsvektor for hver av n akser, med første akse rett opp; trigonometrien regnes én gang per antall akser
+    return tuple((math.cos(2 * math.pi * i / n - math.pi / 2), math.sin(2 * math.pi * i / n - math.pi / 2)) for i in range(n))
+
+def hex_rgb(color):
+    return tuple(int(color[i:i + 2], 16) for i in (1, 3, 5))
+
+def truncate_label(text, length):
+    return text[:length] + "..." if len(text) > length else text
+
+def chart_layout(spec):
+    """Diagrammet som enkle figurer i piksler: (bredde, høyde, figurer). Figurene er
+    ('circle', cx, cy, r, farge), ('line', x1, y1, x2, y2, farge), ('polygon', punkter, farge, fyll),
+    ('rect', x, y, b, h, farge) og ('text', x, y, tekst, størrelse, fet, forankring)."""
+    width = CHART_WIDTH[spec['kind']]
+    shapes = []
+    if spec['kind'] == 'radar':
+        height = RADAR_HEIGHT
+        cx, cy = width / 2, height / 2
+        radius = min(width, height) // 2 - 70
+        axes = radar_geometry(len(spec['labels']))
+        shapes += [('circle', cx, cy, radius * r, COLORS['gray']) for r in RADAR_GRID]
+        shapes += [('line', cx, cy, cx + radius * dx, cy + radius * dy, COLORS['gray']) for dx, dy in axes]
+        points = tuple((cx + v / 5 * radius * dx, cy + v / 5 * radius * dy) for v, (dx, dy) in zip(spec['values'], axes))
+        shapes.append(('polygon', points, spec['colors'][0], 0.3))
+        shapes += [('text', cx + (radius + 45) * dx, cy + (radius + 45) * dy, truncate_label(label, 18), 13, False, 'middle')
+                   for label, (dx, dy) in zip(spec['labels'], axes)]
+    else:
+        height = len(spec['labels']) * (BAR_HEIGHT + BAR_GAP) + 60
+        bar_area = width - 220
+        for i, (label, value, color) in enumerate(zip(spec['labels'], spec['values'], spec['colors'])):
+            y = 50 + i * (BAR_HEIGHT + BAR_GAP)
+            bar = value / 5 * bar_area
+            shapes.append(('text', 5, y + BAR_HEIGHT / 2 + 5, truncate_label(label, 22), 12, False, 'start'))
+            shapes.append(('rect', 180, y, bar, BAR_HEIGHT, color))
+            shapes.append(('text', 185 + bar, y + BAR_HEIGHT / 2 + 5, format(value, spec['value_format']), 14, True, 'start'))
+    if spec['title']:
+        shapes.append(('text', width / 2, 24, spec['title'], 16, True, 'middle'))
+    return width, height, tuple(shapes)
+
+def chart_svg(spec):
+    width, height, shapes = render_chart(spec, 'layout')
+    dark = COLORS['primary_dark']
+    svg = [f'<svg width="{width}" height="{height}" viewBox="0 0 {width} {height}" style="max-width:100%;height:auto" xmlns="http://www.w3.org/2000/svg">']
+    for shape in shapes:
+        kind = shape[0]
+        if kind == 'circle':
+            _, cx, cy, r, color = shape
+            svg.append(f'<circle cx="{cx:.1f}" cy="{cy:.1f}" r="{r:.1f}" fill="none" stroke="{color}" stroke-width="1"/>')
+        elif kind == 'line':
+            _, x1, y1, x2, y2, color = shape
+            svg.append(f'<line x1="{x1:.1f}" y1="{y1:.1f}" x2="{x2:.1f}" y2="{y2:.1f}" stroke="{color}" stroke-width="1"/>')
+        elif kind == 'polygon':
+            _, points, color, opacity = shape
+            svg.append(f'<polygon points="{" ".join(f"{x:.1f},{y:.1f}" for x, y in points)}" fill="{color}" fill-opacity="{opacity}" stroke="{color}" stroke-width="2"/>')
+        elif kind == 'rect':
+            _, x, y, w, h, color = shape
+            svg.append(f'<rect x="{x:.1f}" y="{y:.1f}" width="{w:.1f}" height="{h:.1f}" fill="{color}" rx="4"/>')
+        else:
+            _, x, y, text, size, bold, anchor = shape
+            weight = ' font-weight="bold"' if bold else ''
+            svg.append(f'<text x="{x:.1f}" y="{y:.1f}" text-anchor="{anchor}" font-size="{size}"{weight} fill="{dark}">{html_escape(text)}</text>')
+    svg.append('</svg>')
+    return ''.join(svg)
+
+def chart_plotly(spec):
+    # Plotly-figuren som en ren dict; den er billig å lage, lagre og sende til nettleseren
+    if spec['kind'] == 'radar':
+        color = spec['colors'][0]
+        labels = [truncate_label(label, 20) for label in spec['labels']]
+        return {
+            'data': [{'type': 'scatterpolar', 'r': spec['values'] + spec['values'][:1], 'theta': labels + labels[:1], 'fill': 'toself',
+                      'fillcolor': 'rgba({}, {}, {}, 0.3)'.format(*hex_rgb(color)), 'line': {'color': color, 'width': 3}}],
+            'layout': {'polar': {'radialaxis': {'visible': True, 'range': [0, 5], 'tickvals': [1, 2, 3, 4, 5], 'tickfont': {'size': 14}},
+                                 'angularaxis': {'tickfont': {'size': 13}}},
+                       'showlegend': False, 'height': RADAR_HEIGHT, 'margin': {'l': 80, 'r': 80, 't': 40, 'b': 40}, 'font': {'size': 14}}
+        }
+    labels = [truncate_label(label, 30) for label in spec['labels']]
+    return {
+        'data': [{'type': 'bar', 'x': spec['values'], 'y': labels, 'orientation': 'h', 'marker': {'color': spec['colors']},
+                  'text': [format(v, spec['value_format']) for v in spec['values']], 'textposition': 'outside', 'textfont': {'size': 15}}],
+        'layout': {'xaxis': {'range': [0, 5.5], 'title': {'text': "Score"}, 'tickfont': {'size': 14}},
+                   'yaxis': {'autorange': "reversed", 'tickfont': {'size': 13}},
+                   'height': max(300, len(labels) * 45), 'margin': {'l': 220, 'r': 60, 't': 20, 'b': 40}, 'font': {'size': 14}}
+    }
+
+CHART_RENDERERS = {'layout': chart_layout, 'svg': chart_svg, 'plotly': chart_plotly}
+
+@timed
+def render_chart(spec, target):
+    """Tegn diagrammet for 'plotly', 'svg' eller 'layout' (grunnlaget for SVG og PDF).
+    Resultatet caches på tvers av sesjoner etter innholdet i spesifikasjonen, så like data tegnes én gang."""
+    key = (target, chart_digest(spec))
+    with _chart_cache_lock:
+        if key in _chart_cache:
+            _chart_cache.move_to_end(key)
+            return _chart_cache[key]
+    rendered = CHART_RENDERERS[target](spec)
+    with _chart_cache_lock:
+        _chart_cache[key] = rendered
+        while len(_chart_cache) > CHART_CACHE_SIZE:
+            _chart_cache.popitem(last=False)
+    return rendered
+
+def draw_pdf_chart(pdf, spec, x, y, width):
+    """Tegn diagrammet som vektorgrafikk med øvre venstre hjørne i (x, y) og gitt bredde i mm. Returnerer høyden i mm."""
+    layout_width, layout_height, shapes = render_chart(spec, 'layout')
+    scale = width / layout_width
+    pdf.set_line_width(0.2)
+    for shape in shapes:
+        kind = shape[0]
+        if kind == 'circle':
+            _, cx, cy, r, color = shape
+            pdf.set_draw_color(*hex_rgb(color))
+            pdf.polygon([(x + (cx + r * dx) * scale, y + (cy + r * dy) * scale) for dx, dy in radar_geometry(PDF_CIRCLE_SEGMENTS)], style='D')
+        elif kind == 'line':
+            _, x1, y1, x2, y2, color = shape
+            pdf.set_draw_color(*hex_rgb(color))
+            pdf.line(x + x1 * scale, y + y1 * scale, x + x2 * scale, y + y2 * scale)
+        elif kind == 'polygon':
+            _, points, color, opacity = shape
+            points = [(x + px * scale, y + py * scale) for px, py in points]
+            pdf.set_draw_color(*hex_rgb(color))
+            pdf.set_fill_color(*hex_rgb(color))
+            with pdf.local_context(fill_opacity=opacity):
+                pdf.polygon(points, style='F')
+            pdf.set_line_width(0.5)
+            pdf.polygon(points, style='D')
+            pdf.set_line_width(0.2)
+        elif kind == 'rect':
+            _, rx, ry, w, h, color = shape
+            pdf.set_fill_color(*hex_rgb(color))
+            pdf.rect(x + rx * scale, y + ry * scale, w * scale, h * scale, style='F')
+        else:
+            _, tx, ty, text, size, bold, anchor = shape
+            # Standardfontene i PDF dekker bare latin-1
+            text = text.encode('latin-1', 'replace').decode('latin-1')
+            pdf.set_font('Helvetica', 'B' if bold else '', size * scale * 72 / 25.4)
+            tx = x + tx * scale - (pdf.get_string_width(text) / 2 if anchor == 'middle' else 0)
+            pdf.text(tx, y + ty * scale, text)
+    pdf.set_draw_color(0, 0, 0)
+    return layout_height * scale
+
+def show_chart(spec):
+    # Plotly i appen, eller ferdig SVG når brukeren har valgt enkle diagrammer (raskere og mindre data til nettleseren)
+    if spec is None:
+        return
+    if st.session_state.get('static_charts'):
+        st.markdown(f'<div style="text-align:center">{render_chart(spec, "svg")}</div>', unsafe_allow_html=True)
+    else:
+        st.plotly_chart(render_chart(spec, 'plotly'), use_container_width=True)
 
 # ============================================================================
 # RAPPORT-GENERERING
@@ -783,116 +3546,65 @@ def get_anonymous_name(index):
         return ANONYMOUS_NAMES[index]
     return f"Deltaker {index + 1}"
 
-def generate_html_report(initiative, stats):
-    # Generer HTML-rapport
-    def create_svg_radar(categories, values, color, title="", width=450, height=400):
-        if not categories or not values:
-            return ""
-        # Dupliser hvis færre enn 3 punkter
-        if len(categories) == 1:
-            categories = categories * 3
-            values = values * 3
-        elif len(categories) == 2:
-            categories = categories + [categories[0]]
-            values = values + [values[0]]
-        import math
-        cx, cy = width // 2, height // 2
-        radius = min(width, height) // 2 - 70
-        n = len(categories)
-        svg = f'<svg width="{width}" height="{height}" xmlns="http://www.w3.org/2000/svg">'
-        for r in [0.2, 0.4, 0.6, 0.8, 1.0]:
-            svg += f'<circle cx="{cx}" cy="{cy}" r="{radius * r}" fill="none" stroke="#E8E8E8" stroke-width="1"/>'
-        for i in range(n):
-            angle = (2 * math.pi * i / n) - math.pi / 2
-            x = cx + radius * math.cos(angle)
-            y = cy + radius * math.sin(angle)
-            svg += f'<line x1="{cx}" y1="{cy}" x2="{x}" y2="{y}" stroke="#E8E8E8" stroke-width="1"/>'
-        points = []
-        for i, val in enumerate(values):
-            angle = (2 * math.pi * i / n) - math.pi / 2
-            r = (val / 5) * radius
-            x = cx + r * math.cos(angle)
-            y = cy + r * math.sin(angle)
-            points.append(f"{x},{y}")
-        svg += f'<polygon points="{" ".join(points)}" fill="{color}" fill-opacity="0.3" stroke="{color}" stroke-width="2"/>'
-        for i, cat in enumerate(categories):
-            angle = (2 * math.pi * i / n) - math.pi / 2
-            x = cx + (radius + 45) * math.cos(angle)
-            y = cy + (radius + 45) * math.sin(angle)
-            label = cat[:18] + "..." if len(cat) > 18 else cat
-            svg += f'<text x="{x}" y="{y}" text-anchor="middle" font-size="13" fill="#172141">{label}</text>'
-        if title:
-            svg += f'<text x="{cx}" y="22" text-anchor="middle" font-size="16" font-weight="bold" fill="#172141">{title}</text>'
-        svg += '</svg>'
-        return svg
-
-    def create_svg_bar_chart(labels, values, colors, title="", width=500, height=None):
-        if not labels or not values:
-            return ""
-        bar_height = 35
-        if height is None:
-            height = len(labels) * (bar_height + 10) + 60
-        max_val = 5
-        bar_area_width = width - 220
-        
-        svg = f'<svg width="{width}" height="{height}" xmlns="http://www.w3.org/2000/svg">'
-        if title:
-            svg += f'<text x="{width//2}" y="25" text-anchor="middle" font-size="16" font-weight="bold" fill="#172141">{title}</text>'
-        
-        y_offset = 50
-        for i, (label, val) in enumerate(zip(labels, values)):
-            y = y_offset + i * (bar_height + 10)
-            bar_width = (val / max_val) * bar_area_width
-            color = colors[i] if isinstance(colors, list) else colors
-            
-            # Label
-            display_label = label[:22] + "..." if len(label) > 22 else label
-            svg += f'<text x="5" y="{y + bar_height//2 + 5}" font-size="12" fill="#172141">{display_label}</text>'
-            # Bar
-            svg += f'<rect x="180" y="{y}" width="{bar_width}" height="{bar_height}" fill="{color}" rx="4"/>'
-            # Value
-            svg += f'<text x="{185 + bar_width}" y="{y + bar_height//2 + 5}" font-size="14" font-weight="bold" fill="#172141">{val:.2f}</text>'
-        
-        svg += '</svg>'
-        return svg
+def low_confidence_badge(count, min_sample):
+    return f' <span class="low-confidence">Få svar ({count})</span>' if low_confidence(count, min_sample) else ""
+
+def low_confidence_mark(count, min_sample):
+    # Tekst og PDF: stjerne ved resultater med færre svar enn minstekravet
+    return " *" if low_confidence(count, min_sample) else ""
 
+def low_confidence_summary(stats, min_sample):
+    answered = sum(len(questions) for questions in stats['questions'].values())
+    return f"{len(low_confidence_questions(stats, min_sample))} av {answered} besvarte spørsmål har færre enn {min_sample} svar"
+
+# Felles stilark for HTML-rapporten og den statiske resultatsiden
+REPORT_CSS = """
+        body { font-family: 'Source Sans Pro', Arial, sans-serif; padding: 40px; max-width: 1200px; margin: 0 auto; color: #172141; line-height: 1.7; font-size: 16px; }
+        h1 { color: #172141; text-align: center; margin-bottom: 5px; font-size: 2rem; }
+        h2 { color: #0053A6; border-bottom: 2px solid #64C8FA; padding-bottom: 8px; margin-top: 40px; font-size: 1.6rem; }
+        h3 { color: #0053A6; margin-top: 25px; font-size: 1.3rem; }
+        h4 { color: #172141; margin-top: 20px; font-size: 1.15rem; }
+        .subtitle { text-align: center; color: #0053A6; margin-bottom: 30px; font-size: 1.1rem; }
+        table { width: 100%; border-collapse: collapse; margin: 15px 0; font-size: 1rem; }
+        th { background: #0053A6; color: white; padding: 12px; text-align: left; font-size: 1rem; }
+        td { padding: 10px 12px; border-bottom: 1px solid #E8E8E8; font-size: 1rem; }
+        tr:nth-child(even) { background: #F2FAFD; }
+        .metric-row { display: flex; gap: 20px; margin: 20px 0; flex-wrap: wrap; }
+        .metric-card { flex: 1; min-width: 150px; background: #F2FAFD; padding: 18px; border-radius: 8px; border-left: 4px solid #0053A6; text-align: center; }
+        .metric-value { font-size: 2.4rem; font-weight: 700; color: #0053A6; }
+        .metric-label { font-size: 1rem; color: #666; text-transform: uppercase; }
+        .charts-row { display: flex; gap: 30px; margin: 20px 0; flex-wrap: wrap; justify-content: center; }
+        .chart-container { flex: 1; min-width: 350px; max-width: 500px; text-align: center; }
+        .item { padding: 12px 16px; margin: 8px 0; border-radius: 6px; font-size: 1.05rem; }
+        .item-strength { background: #DDFAE2; border-left: 4px solid #35DE6D; }
+        .item-improvement { background: rgba(255, 107, 107, 0.15); border-left: 4px solid #FF6B6B; }
+        .benefit-section { background: #F8F9FA; padding: 25px; margin: 30px 0; border-radius: 10px; border: 1px solid #E8E8E8; }
+        .benefit-header { background: #0053A6; color: white; padding: 15px 20px; margin: -25px -25px 20px -25px; border-radius: 10px 10px 0 0; }
+        .comment-phase { background: #64C8FA; color: white; padding: 12px 18px; margin-top: 20px; border-radius: 6px 6px 0 0; font-size: 1.1rem; font-weight: 600; }
+        .comment-question { background: #F2FAFD; padding: 12px 18px; border-left: 3px solid #0053A6; margin: 10px 0; }
+        .comment-question h4 { margin: 0 0 10px 0; color: #172141; font-size: 1.05rem; }
+        .comment-item { background: white; padding: 12px 18px; margin: 10px 0; border-radius: 4px; border: 1px solid #E8E8E8; }
+        .comment-meta { font-size: 0.95rem; color: #666; margin-bottom: 6px; }
+        .comment-text { color: #172141; font-size: 1.05rem; }
+        .theme-line { font-size: 0.95rem; color: #0053A6; margin: 0 0 8px 0; }
+        .score-badge { display: inline-block; background: #64C8FA; color: white; padding: 3px 10px; border-radius: 12px; font-size: 0.9rem; margin-left: 8px; }
+        .low-confidence { display: inline-block; background: #FFF1E0; color: #B35C00; border: 1px solid #FFA040; padding: 1px 8px; border-radius: 10px; font-size: 0.85rem; margin-left: 8px; }
+        .note { color: #666; font-size: 0.95rem; }
+        .footer { text-align: center; margin-top: 40px; padding-top: 20px; border-top: 1px solid #E8E8E8; color: #666; font-size: 0.95rem; }
+        .page-break { page-break-before: always; }
+"""
+
+@timed
+def generate_html_report(initiative, stats, themes=None, min_sample=None, public=False):
+    """Generer HTML-rapport. Resultater med færre svar enn min_sample (standard MIN_SAMPLE) merkes som usikre.
+    Med public (den statiske resultatsiden) utelates intervjuoversikten og kommentarene."""
+    min_sample = MIN_SAMPLE if min_sample is None else min_sample
     html = f"""<!DOCTYPE html>
 <html lang="no">
 <head>
     <meta charset="UTF-8">
-    <title>Modenhetsvurdering - {initiative['name']}</title>
-    <style>
-        body {{ font-family: 'Source Sans Pro', Arial, sans-serif; padding: 40px; max-width: 1200px; margin: 0 auto; color: #172141; line-height: 1.7; font-size: 16px; }}
-        h1 {{ color: #172141; text-align: center; margin-bottom: 5px; font-size: 2rem; }}
-        h2 {{ color: #0053A6; border-bottom: 2px solid #64C8FA; padding-bottom: 8px; margin-top: 40px; font-size: 1.6rem; }}
-        h3 {{ color: #0053A6; margin-top: 25px; font-size: 1.3rem; }}
-        h4 {{ color: #172141; margin-top: 20px; font-size: 1.15rem; }}
-        .subtitle {{ text-align: center; color: #0053A6; margin-bottom: 30px; font-size: 1.1rem; }}
-        table {{ width: 100%; border-collapse: collapse; margin: 15px 0; font-size: 1rem; }}
-        th {{ background: #0053A6; color: white; padding: 12px; text-align: left; font-size: 1rem; }}
-        td {{ padding: 10px 12px; border-bottom: 1px solid #E8E8E8; font-size: 1rem; }}
-        tr:nth-child(even) {{ background: #F2FAFD; }}
-        .metric-row {{ display: flex; gap: 20px; margin: 20px 0; flex-wrap: wrap; }}
-        .metric-card {{ flex: 1; min-width: 150px; background: #F2FAFD; padding: 18px; border-radius: 8px; border-left: 4px solid #0053A6; text-align: center; }}
-        .metric-value {{ font-size: 2.4rem; font-weight: 700; color: #0053A6; }}
-        .metric-label {{ font-size: 1rem; color: #666; text-transform: uppercase; }}
-        .charts-row {{ display: flex; gap: 30px; margin: 20px 0; flex-wrap: wrap; justify-content: center; }}
-        .chart-container {{ flex: 1; min-width: 350px; max-width: 500px; text-align: center; }}
-        .item {{ padding: 12px 16px; margin: 8px 0; border-radius: 6px; font-size: 1.05rem; }}
-        .item-strength {{ background: #DDFAE2; border-left: 4px solid #35DE6D; }}
-        .item-improvement {{ background: rgba(255, 107, 107, 0.15); border-left: 4px solid #FF6B6B; }}
-        .benefit-section {{ background: #F8F9FA; padding: 25px; margin: 30px 0; border-radius: 10px; border: 1px solid #E8E8E8; }}
-        .benefit-header {{ background: #0053A6; color: white; padding: 15px 20px; margin: -25px -25px 20px -25px; border-radius: 10px 10px 0 0; }}
-        .comment-phase {{ background: #64C8FA; color: white; padding: 12px 18px; margin-top: 20px; border-radius: 6px 6px 0 0; font-size: 1.1rem; font-weight: 600; }}
-        .comment-question {{ background: #F2FAFD; padding: 12px 18px; border-left: 3px solid #0053A6; margin: 10px 0; }}
-        .comment-question h4 {{ margin: 0 0 10px 0; color: #172141; font-size: 1.05rem; }}
-        .comment-item {{ background: white; padding: 12px 18px; margin: 10px 0; border-radius: 4px; border: 1px solid #E8E8E8; }}
-        .comment-meta {{ font-size: 0.95rem; color: #666; margin-bottom: 6px; }}
-        .comment-text {{ color: #172141; font-size: 1.05rem; }}
-        .score-badge {{ display: inline-block; background: #64C8FA; color: white; padding: 3px 10px; border-radius: 12px; font-size: 0.9rem; margin-left: 8px; }}
-        .footer {{ text-align: center; margin-top: 40px; padding-top: 20px; border-top: 1px solid #E8E8E8; color: #666; font-size: 0.95rem; }}
-        .page-break {{ page-break-before: always; }}
-    </style>
+    <title>Modenhetsvurdering - {html_escape(initiative['name'])}</title>
+    <style>{REPORT_CSS}</style>
 </head>
 <body>
     <h1>Modenhetsvurdering - Gevinstrealisering</h1>
@@ -902,12 +3614,14 @@ def generate_html_report(initiative, stats):
     
     <h3>1.1 Sammendrag</h3>
     <table>
-        <tr><td><strong>Endringsinitiativ</strong></td><td>{initiative['name']}</td></tr>
-        <tr><td><strong>Beskrivelse</strong></td><td>{initiative.get('description', '-')}</td></tr>
+        <tr><td><strong>Endringsinitiativ</strong></td><td>{html_escape(initiative['name'])}</td></tr>
+        <tr><td><strong>Beskrivelse</strong></td><td>{html_escape(initiative['description'] or '-')}</td></tr>
         <tr><td><strong>Rapportdato</strong></td><td>{datetime.now().strftime('%d.%m.%Y')}</td></tr>
         <tr><td><strong>Antall intervjuer</strong></td><td>{stats['total_interviews']}</td></tr>
         <tr><td><strong>Samlet modenhet</strong></td><td><strong>{stats['overall_avg']:.2f}</strong> ({get_score_text(stats['overall_avg'])})</td></tr>
+        <tr><td><strong>Dekning</strong></td><td>{low_confidence_summary(stats, min_sample)}</td></tr>
     </table>
+    <p class="note">Resultater merket <span class="low-confidence">Få svar</span> bygger på færre enn {min_sample} svar og er usikre.</p>
     
     <div class="metric-row">
         <div class="metric-card">
@@ -931,35 +3645,27 @@ def generate_html_report(initiative, stats):
 
     if stats['phases']:
         html += "<h3>1.2 Modenhet per fase</h3>"
-        html += "<table><tr><th>Fase</th><th>Gjennomsnitt</th><th>Min</th><th>Maks</th></tr>"
+        html += "<table><tr><th>Fase</th><th>Gjennomsnitt</th><th>Min</th><th>Maks</th><th>Svar</th></tr>"
         for phase, data in stats['phases'].items():
-            html += f"<tr><td>{phase}</td><td><strong>{data['avg']:.2f}</strong></td><td>{data['min']:.2f}</td><td>{data['max']:.2f}</td></tr>"
+            html += f"<tr><td>{phase}</td><td><strong>{data['avg']:.2f}</strong></td><td>{data['min']:.2f}</td><td>{data['max']:.2f}</td><td>{data['count']}{low_confidence_badge(data['count'], min_sample)}</td></tr>"
         html += "</table>"
         
-        phase_cats = list(stats['phases'].keys())
-        phase_vals = [stats['phases'][p]['avg'] for p in phase_cats]
-        phase_colors = ['#35DE6D' if v >= 4 else '#64C8FA' if v >= 3 else '#FFA040' if v >= 2 else '#FF6B6B' for v in phase_vals]
-        
         html += '<div class="charts-row">'
         html += '<div class="chart-container">'
-        html += create_svg_radar(phase_cats, phase_vals, '#0053A6', 'Modenhet per fase')
+        html += render_chart(create_phase_radar(stats['phases']), 'svg')
         html += '</div>'
         html += '<div class="chart-container">'
-        html += create_svg_bar_chart(phase_cats, phase_vals, phase_colors, 'Faser - stolpediagram')
+        html += render_chart(create_phase_bar_chart(stats['phases']), 'svg')
         html += '</div>'
         html += '</div>'
         
         if stats['parameters']:
-            param_cats = list(stats['parameters'].keys())
-            param_vals = [stats['parameters'][p]['avg'] for p in param_cats]
-            param_colors = ['#35DE6D' if v >= 4 else '#64C8FA' if v >= 3 else '#FFA040' if v >= 2 else '#FF6B6B' for v in param_vals]
-            
             html += '<div class="charts-row">'
             html += '<div class="chart-container">'
-            html += create_svg_radar(param_cats, param_vals, '#64C8FA', 'Modenhet per parameter')
+            html += render_chart(create_parameter_radar(stats['parameters']), 'svg')
             html += '</div>'
             html += '<div class="chart-container">'
-            html += create_svg_bar_chart(param_cats, param_vals, param_colors, 'Parametere - stolpediagram')
+            html += render_chart(create_parameter_bar_chart(stats['parameters']), 'svg')
             html += '</div>'
             html += '</div>'
 
@@ -967,15 +3673,11 @@ def generate_html_report(initiative, stats):
     html += '<div class="charts-row">'
     if stats['high_maturity']:
         html += '<div class="chart-container">'
-        strength_cats = [item['title'][:20] for item in stats['high_maturity'][:8]]
-        strength_vals = [item['score'] for item in stats['high_maturity'][:8]]
-        html += create_svg_radar(strength_cats, strength_vals, '#35DE6D', 'Styrkeområder')
+        html += render_chart(create_strength_radar(stats['high_maturity']), 'svg')
         html += '</div>'
     if stats['low_maturity']:
         html += '<div class="chart-container">'
-        improve_cats = [item['title'][:20] for item in stats['low_maturity'][:8]]
-        improve_vals = [item['score'] for item in stats['low_maturity'][:8]]
-        html += create_svg_radar(improve_cats, improve_vals, '#FF6B6B', 'Forbedringsområder')
+        html += render_chart(create_improvement_radar(stats['low_maturity']), 'svg')
         html += '</div>'
     html += '</div>'
     
@@ -983,62 +3685,67 @@ def generate_html_report(initiative, stats):
     html += '<div class="charts-row">'
     if stats['high_maturity']:
         html += '<div class="chart-container">'
-        strength_labels = [f"[{item['phase'][:4]}] {item['title'][:18]}" for item in stats['high_maturity'][:8]]
-        strength_vals = [item['score'] for item in stats['high_maturity'][:8]]
-        html += create_svg_bar_chart(strength_labels, strength_vals, '#35DE6D', 'Styrker - stolpediagram')
+        html += render_chart(create_strength_bar_chart(stats['high_maturity']), 'svg')
         html += '</div>'
     if stats['low_maturity']:
         html += '<div class="chart-container">'
-        improve_labels = [f"[{item['phase'][:4]}] {item['title'][:18]}" for item in stats['low_maturity'][:8]]
-        improve_vals = [item['score'] for item in stats['low_maturity'][:8]]
-        html += create_svg_bar_chart(improve_labels, improve_vals, '#FF6B6B', 'Forbedring - stolpediagram')
+        html += render_chart(create_improvement_bar_chart(stats['low_maturity']), 'svg')
         html += '</div>'
     html += '</div>'
 
     if stats['high_maturity']:
         html += "<h4>Styrkeområder (score >= 4)</h4>"
         for item in stats['high_maturity'][:10]:
-            html += f'<div class="item item-strength"><strong>[{item["phase"]}]</strong> {item["title"]}: <strong>{item["score"]:.2f}</strong></div>'
+            html += f'<div class="item item-strength"><strong>[{item["phase"]}]</strong> {item["title"]}: <strong>{item["score"]:.2f}</strong>{low_confidence_badge(item["count"], min_sample)}</div>'
 
     if stats['low_maturity']:
         html += "<h4>Forbedringsområder (score < 3)</h4>"
         for item in stats['low_maturity'][:10]:
-            html += f'<div class="item item-improvement"><strong>[{item["phase"]}]</strong> {item["title"]}: <strong>{item["score"]:.2f}</strong></div>'
+            html += f'<div class="item item-improvement"><strong>[{item["phase"]}]</strong> {item["title"]}: <strong>{item["score"]:.2f}</strong>{low_confidence_badge(item["count"], min_sample)}</div>'
 
     if stats['parameters']:
         html += "<h3>1.4 Resultater per parameter</h3>"
-        html += "<table><tr><th>Parameter</th><th>Score</th><th>Beskrivelse</th></tr>"
+        html += "<table><tr><th>Parameter</th><th>Score</th><th>Svar</th><th>Beskrivelse</th></tr>"
         for name, data in stats['parameters'].items():
-            html += f"<tr><td>{name}</td><td><strong>{data['avg']:.2f}</strong></td><td>{data['description']}</td></tr>"
+            html += f"<tr><td>{name}</td><td><strong>{data['avg']:.2f}</strong></td><td>{data['count']}{low_confidence_badge(data['count'], min_sample)}</td><td>{data['description']}</td></tr>"
         html += "</table>"
 
+    if public:
+        html += f'<div class="footer">Generert {datetime.now().strftime("%d.%m.%Y %H:%M")} | Bane NOR - Modenhetsvurdering Gevinstrealisering</div></body></html>'
+        return html
+
     html += "<h3>1.5 Intervjuoversikt (anonymisert)</h3>"
     html += "<table><tr><th>Deltaker</th><th>Dato</th><th>Gevinst</th><th>Fase</th><th>Snitt</th></tr>"
-    for idx, interview in enumerate(initiative.get('interviews', {}).values()):
-        info = interview.get('info', {})
-        total_answered = sum(1 for phase in interview.get('responses', {}).values() for resp in phase.values() if resp.get('score', 0) > 0)
-        total_score = sum(resp.get('score', 0) for phase in interview.get('responses', {}).values() for resp in phase.values() if resp.get('score', 0) > 0)
-        avg = total_score / total_answered if total_answered > 0 else 0
+    for idx, interview in enumerate(initiative['interviews'].values()):
+        info = interview['info']
+        avg = summary_avg(interview['summary'])
         anon_name = get_anonymous_name(idx)
         avg_str = f"{avg:.2f}" if avg > 0 else "-"
-        html += f"<tr><td>{anon_name}</td><td>{info.get('date', '-')}</td><td>{info.get('benefit_name', 'Generelt')}</td><td>{info.get('phase', '-')}</td><td>{avg_str}</td></tr>"
+        html += f"<tr><td>{anon_name}</td><td>{html_escape(info['date'])}</td><td>{html_escape(info['benefit_name'])}</td><td>{info['phase']}</td><td>{avg_str}</td></tr>"
     html += "</table>"
 
     # Del 2: Kommentarer
     html += '<div class="page-break"></div>'
     html += "<h2>DEL 2: Kommentarer</h2>"
-    
+
+    if themes and themes['parameters']:
+        html += "<h3>Nøkkeltemaer</h3>"
+        html += "<table><tr><th>Parameter</th><th>Notater</th><th>Toppord</th><th>Ordpar</th><th>Ved lav score</th><th>Ved høy score</th></tr>"
+        for name, theme in themes['parameters'].items():
+            html += f"<tr><td>{name}</td><td>{theme['docs']}</td><td>{html_escape(format_theme_terms(theme['top_terms']))}</td><td>{html_escape(format_theme_terms(theme['bigrams']))}</td><td>{html_escape(format_theme_terms(theme['low_terms']))}</td><td>{html_escape(format_theme_terms(theme['high_terms']))}</td></tr>"
+        html += "</table>"
+
     for phase in PHASES:
         phase_comments = {}
-        for idx, interview in enumerate(initiative.get('interviews', {}).values()):
-            responses = interview.get('responses', {}).get(phase, {})
+        for idx, interview in enumerate(initiative['interviews'].values()):
+            responses = interview['responses'].get(phase, {})
             for q_id, resp in responses.items():
-                notes = resp.get('notes', '').strip()
+                notes = resp['notes'].strip()
                 if notes:
                     if q_id not in phase_comments:
                         phase_comments[q_id] = []
                     anon_name = get_anonymous_name(idx)
-                    phase_comments[q_id].append({'participant': anon_name, 'score': resp.get('score', 0), 'notes': notes})
+                    phase_comments[q_id].append({'participant': anon_name, 'score': resp['score'], 'notes': notes})
         
         if phase_comments:
             html += f'<div class="comment-phase"><strong>{phase}</strong></div>'
@@ -1046,18 +3753,23 @@ def generate_html_report(initiative, stats):
             for q_id in sorted(phase_comments.keys(), key=lambda x: int(x)):
                 q_title = phase_questions.get(q_id, f"Sporsmal {q_id}")
                 html += f'<div class="comment-question"><h4>{q_id}. {q_title}</h4>'
+                theme = themes['questions'].get((phase, q_id)) if themes else None
+                if theme:
+                    html += f'<p class="theme-line"><strong>Nøkkeltemaer:</strong> {html_escape(format_theme_terms(theme["top_terms"]))}</p>'
                 for comment in phase_comments[q_id]:
                     html += f'''<div class="comment-item">
                         <div class="comment-meta">{comment['participant']} <span class="score-badge">Nivå {comment['score']}</span></div>
-                        <div class="comment-text">{comment['notes']}</div>
+                        <div class="comment-text">{html_escape(comment['notes'])}</div>
                     </div>'''
                 html += '</div>'
 
     html += f'<div class="footer">Generert {datetime.now().strftime("%d.%m.%Y %H:%M")} | Bane NOR - Modenhetsvurdering Gevinstrealisering</div></body></html>'
     return html
 
-def generate_txt_report(initiative, stats):
+@timed
+def generate_txt_report(initiative, stats, themes=None, min_sample=None):
     # Generer TXT-rapport
+    min_sample = MIN_SAMPLE if min_sample is None else min_sample
     lines = []
     lines.append("=" * 60)
     lines.append("MODENHETSVURDERING - GEVINSTREALISERING")
@@ -1066,71 +3778,83 @@ def generate_txt_report(initiative, stats):
     lines.append("1. SAMMENDRAG")
     lines.append("-" * 40)
     lines.append(f"Endringsinitiativ: {initiative['name']}")
-    lines.append(f"Beskrivelse: {initiative.get('description', '-')}")
+    lines.append(f"Beskrivelse: {initiative['description'] or '-'}")
     lines.append(f"Rapportdato: {datetime.now().strftime('%d.%m.%Y')}")
     lines.append(f"Antall intervjuer: {stats['total_interviews']}")
     lines.append(f"Samlet modenhet: {stats['overall_avg']:.2f} ({get_score_text(stats['overall_avg'])})")
+    lines.append(f"Dekning: {low_confidence_summary(stats, min_sample)}")
+    lines.append(f"  * = færre enn {min_sample} svar, usikkert resultat")
     lines.append("")
 
     if stats['phases']:
         lines.append("2. MODENHET PER FASE")
         lines.append("-" * 40)
         for phase, data in stats['phases'].items():
-            lines.append(f"  {phase}: {data['avg']:.2f} (min: {data['min']:.2f}, maks: {data['max']:.2f})")
+            lines.append(f"  {phase}: {data['avg']:.2f} (min: {data['min']:.2f}, maks: {data['max']:.2f}, svar: {data['count']}){low_confidence_mark(data['count'], min_sample)}")
         lines.append("")
 
     if stats['high_maturity']:
         lines.append("3. STYRKEOMRADER (score >= 4)")
         lines.append("-" * 40)
         for item in stats['high_maturity'][:10]:
-            lines.append(f"  [{item['phase']}] {item['title']}: {item['score']:.2f}")
+            lines.append(f"  [{item['phase']}] {item['title']}: {item['score']:.2f}{low_confidence_mark(item['count'], min_sample)}")
         lines.append("")
 
     if stats['low_maturity']:
         lines.append("4. FORBEDRINGSOMRADER (score < 3)")
         lines.append("-" * 40)
         for item in stats['low_maturity'][:10]:
-            lines.append(f"  [{item['phase']}] {item['title']}: {item['score']:.2f}")
+            lines.append(f"  [{item['phase']}] {item['title']}: {item['score']:.2f}{low_confidence_mark(item['count'], min_sample)}")
         lines.append("")
 
     if stats['parameters']:
         lines.append("5. RESULTATER PER PARAMETER")
         lines.append("-" * 40)
         for name, data in stats['parameters'].items():
-            lines.append(f"  {name}: {data['avg']:.2f}")
+            lines.append(f"  {name}: {data['avg']:.2f} (svar: {data['count']}){low_confidence_mark(data['count'], min_sample)}")
         lines.append("")
 
     lines.append("6. INTERVJUOVERSIKT (anonymisert)")
     lines.append("-" * 40)
-    for idx, interview in enumerate(initiative.get('interviews', {}).values()):
-        info = interview.get('info', {})
-        total_answered = sum(1 for phase in interview.get('responses', {}).values() for resp in phase.values() if resp.get('score', 0) > 0)
-        total_score = sum(resp.get('score', 0) for phase in interview.get('responses', {}).values() for resp in phase.values() if resp.get('score', 0) > 0)
-        avg = total_score / total_answered if total_answered > 0 else 0
+    for idx, interview in enumerate(initiative['interviews'].values()):
+        info = interview['info']
+        avg = summary_avg(interview['summary'])
         anon_name = get_anonymous_name(idx)
         avg_str = f"{avg:.2f}" if avg > 0 else "-"
-        lines.append(f"  {anon_name} | {info.get('date', '-')} | {info.get('benefit_name', 'Generelt')} | {info.get('phase', '-')} | Snitt: {avg_str}")
+        lines.append(f"  {anon_name} | {info['date']} | {info['benefit_name']} | {info['phase']} | Snitt: {avg_str}")
     lines.append("")
 
     lines.append("7. KOMMENTARER")
     lines.append("-" * 40)
+    if themes and themes['parameters']:
+        lines.append("  Nøkkeltemaer per parameter:")
+        for name, theme in themes['parameters'].items():
+            lines.append(f"    {name} ({theme['docs']} notater): {format_theme_terms(theme['top_terms'])}")
+            if theme['low_terms']:
+                lines.append(f"      Ved lav score: {format_theme_terms(theme['low_terms'])}")
+            if theme['high_terms']:
+                lines.append(f"      Ved høy score: {format_theme_terms(theme['high_terms'])}")
+        lines.append("")
     for phase in PHASES:
         phase_comments = {}
-        for idx, interview in enumerate(initiative.get('interviews', {}).values()):
-            responses = interview.get('responses', {}).get(phase, {})
+        for idx, interview in enumerate(initiative['interviews'].values()):
+            responses = interview['responses'].get(phase, {})
             for q_id, resp in responses.items():
-                notes = resp.get('notes', '').strip()
+                notes = resp['notes'].strip()
                 if notes:
                     if q_id not in phase_comments:
                         phase_comments[q_id] = []
                     anon_name = get_anonymous_name(idx)
-                    phase_comments[q_id].append({'participant': anon_name, 'score': resp.get('score', 0), 'notes': notes})
+                    phase_comments[q_id].append({'participant': anon_name, 'score': resp['score'], 'notes': notes})
         if phase_comments:
             lines.append(f"\n  [{phase}]")
             phase_questions = {str(q['id']): q['title'] for q in questions_data.get(phase, [])}
             for q_id in sorted(phase_comments.keys(), key=lambda x: int(x)):
                 q_title = phase_questions.get(q_id, f"Sporsmal {q_id}")
                 lines.append(f"    {q_id}. {q_title}")
+                theme = themes['questions'].get((phase, q_id)) if themes else None
+                if theme:
+                    lines.append(f"      Nøkkeltemaer: {format_theme_terms(theme['top_terms'])}")
                 for comment in phase_comments[q_id]:
                     lines.append(f"      - {comment['participant']} (Nivå {comment['score']}): {comment['notes']}")
                 lines.append("")
@@ -1146,10 +3870,39 @@ def safe_text(text):
         text = text.replace(old, new)
     return text
 
-def generate_pdf_report(initiative, stats):
+@timed
+def generate_pdf_report(initiative, stats, min_sample=None):
     # Generer PDF-rapport
     if not FPDF_AVAILABLE:
         return None
+    min_sample = MIN_SAMPLE if min_sample is None else min_sample
+
+    def chart_row(*specs):
+        # Diagrammene side om side under teksten, på ny side hvis de ikke får plass.
+        # Et diagram som ikke kan tegnes utelates; resten av rapporten lages likevel.
+        charts = []
+        for spec in specs:
+            if not spec:
+                continue
+            try:
+                layout_width, layout_height, _ = render_chart(spec, 'layout')
+            except Exception:
+                continue
+            charts.append((spec, layout_height / layout_width))
+        if not charts:
+            return
+        width = (pdf.w - pdf.l_margin - pdf.r_margin - 10) / 2
+        height = max(ratio for _, ratio in charts) * width
+        if pdf.get_y() + height > pdf.page_break_trigger:
+            pdf.add_page()
+        top = pdf.get_y()
+        for i, (spec, _) in enumerate(charts):
+            try:
+                draw_pdf_chart(pdf, spec, pdf.l_margin + i * (width + 10), top, width)
+            except Exception:
+                continue
+        pdf.set_y(top + height + 5)
+
     try:
         pdf = FPDF()
         pdf.add_page()
@@ -1167,6 +3920,7 @@ def generate_pdf_report(initiative, stats):
         pdf.cell(0, 7, f"Rapportdato: {datetime.now().strftime('%d.%m.%Y')}", ln=True)
         pdf.cell(0, 7, f"Antall intervjuer: {stats['total_interviews']}", ln=True)
         pdf.cell(0, 7, safe_text(f"Samlet modenhet: {stats['overall_avg']:.2f} ({get_score_text(stats['overall_avg'])})"), ln=True)
+        pdf.cell(0, 7, safe_text(f"Dekning: {low_confidence_summary(stats, min_sample)} (merket *)"), ln=True)
         pdf.ln(5)
 
         if stats['phases']:
@@ -1174,26 +3928,31 @@ def generate_pdf_report(initiative, stats):
             pdf.cell(0, 10, '2. Modenhet per fase', ln=True)
             pdf.set_font('Helvetica', '', 11)
             for phase, data in stats['phases'].items():
-                pdf.cell(0, 7, safe_text(f"  {phase}: {data['avg']:.2f}"), ln=True)
+                pdf.cell(0, 7, safe_text(f"  {phase}: {data['avg']:.2f}{low_confidence_mark(data['count'], min_sample)}"), ln=True)
             pdf.ln(5)
+            chart_row(create_phase_radar(stats['phases']), create_phase_bar_chart(stats['phases']))
+            if stats['parameters']:
+                chart_row(create_parameter_radar(stats['parameters']), create_parameter_bar_chart(stats['parameters']))
 
         if stats['high_maturity']:
             pdf.set_font('Helvetica', 'B', 14)
             pdf.cell(0, 10, safe_text('3. Styrkeområder'), ln=True)
             pdf.set_font('Helvetica', '', 10)
             for item in stats['high_maturity'][:8]:
-                text = safe_text(f"  [{item['phase'][:4]}] {item['title'][:40]}: {item['score']:.2f}")
+                text = safe_text(f"  [{item['phase'][:4]}] {item['title'][:40]}: {item['score']:.2f}{low_confidence_mark(item['count'], min_sample)}")
                 pdf.cell(0, 6, text, ln=True)
             pdf.ln(5)
+            chart_row(create_strength_radar(stats['high_maturity']), create_strength_bar_chart(stats['high_maturity']))
 
         if stats['low_maturity']:
             pdf.set_font('Helvetica', 'B', 14)
             pdf.cell(0, 10, safe_text('4. Forbedringsområder'), ln=True)
             pdf.set_font('Helvetica', '', 10)
             for item in stats['low_maturity'][:8]:
-                text = safe_text(f"  [{item['phase'][:4]}] {item['title'][:40]}: {item['score']:.2f}")
+                text = safe_text(f"  [{item['phase'][:4]}] {item['title'][:40]}: {item['score']:.2f}{low_confidence_mark(item['count'], min_sample)}")
                 pdf.cell(0, 6, text, ln=True)
             pdf.ln(5)
+            chart_row(create_improvement_radar(stats['low_maturity']), create_improvement_bar_chart(stats['low_maturity']))
 
         pdf.ln(10)
         pdf.set_font('Helvetica', 'I', 9)
@@ -1202,10 +3961,1171 @@ def generate_pdf_report(initiative, stats):
     except Exception as e:
         return None
 
+# ============================================================================
+# STATISK RESULTATSIDE
+# ============================================================================
+SITE_DIR = "resultatside"
+SITE_MANIFEST = "manifest.json"
+SITE_FORMAT = 3  # Økes når sidene endrer innhold, slik at alle bygges på nytt
+
+def safe_file_stem(init_id):
+    return re.sub(r'[^A-Za-z0-9_-]', '_', str(init_id))
+
+def site_page_name(init_id):
+    return safe_file_stem(init_id) + ".html"
+
+def interview_trend(initiative):
+    # Intervjuer og snittscore per måned (intervjudato), eldste først
+    months = {}
+    for interview in initiative['interviews'].values():
+        month = interview['info']['date'][:7] or "Uten dato"
+        summary = interview['summary']
+        entry = months.setdefault(month, {'interviews': 0, 'sum': 0, 'count': 0})
+        entry['interviews'] += 1
+        entry['sum'] += summary['score_sum']
+        entry['count'] += summary['answered']
+    return [{'month': month, 'interviews': entry['interviews'], 'avg': entry['sum'] / entry['count'] if entry['count'] else None}
+            for month, entry in sorted(months.items())]
+
+def render_site_page(initiative, stats):
+    # Rapporten uten intervjuoversikt og notater, med lenke tilbake til oversikten og utvikling over tid
+    rows = "".join(f"<tr><td>{html_escape(item['month'])}</td><td>{item['interviews']}</td><td>{item['avg']:.2f}</td></tr>" if item['avg'] is not None
+                   else f"<tr><td>{html_escape(item['month'])}</td><td>{item['interviews']}</td><td>-</td></tr>" for item in interview_trend(initiative))
+    trend = f"<h2>Utvikling over tid</h2><table><tr><th>Måned</th><th>Intervjuer</th><th>Gjennomsnitt</th></tr>{rows}</table>"
+    html = generate_html_report(initiative, stats, public=True)
+    html = html.replace("<body>", '<body>\n    <p><a href="index.html">&larr; Alle initiativer</a></p>', 1)
+    return html.replace('<div class="footer">', trend + '<div class="footer">', 1)
+
+def render_site_index(manifest):
+    rows = ""
+    for init_id, page in sorted(manifest['pages'].items(), key=lambda item: item[1]['name'].lower()):
+        overall = f"{page['overall_avg']:.2f} ({get_score_text(page['overall_avg'])})" if page['file'] else "Ingen svar enda"
+        name = f'<a href="{page["file"]}">{html_escape(page["name"])}</a>' if page['file'] else html_escape(page['name'])
+        rows += f"<tr><td>{name}</td><td>{page['interviews']}</td><td>{overall}</td><td>{(page['modified'] or '')[:10]}</td></tr>"
+    return f"""<!DOCTYPE html>
+<html lang="no">
+<head>
+    <meta charset="UTF-8">
+    <title>Modenhetsvurdering - resultater</title>
+    <style>{REPORT_CSS}</style>
+</head>
+<body>
+    <h1>Modenhetsvurdering - Gevinstrealisering</h1>
+    <p class="subtitle">Resultater per endringsinitiativ</p>
+    <table><tr><th>Endringsinitiativ</th><th>Intervjuer</th><th>Samlet modenhet</th><th>Sist endret</th></tr>{rows}</table>
+    <div class="footer">Oppdatert {datetime.now().strftime("%d.%m.%Y %H:%M")} | Bane NOR - Modenhetsvurdering Gevinstrealisering</div>
+</body>
+</html>"""
+
+def write_text_atomic(path, text):
+    tmp_file = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_file, path)
+
+@timed
+def build_static_site(storage, out_dir=SITE_DIR, force=False):
+    """Skriv én HTML-side per initiativ og en oversiktsside, for visning fra en vanlig webserver.
+    Bare initiativer med ny versjon bygges på nytt. Initiativer med tilgangskode tas ikke med, og sidene
+    viser verken intervjuoversikt eller notater (generate_html_report med public).
+    Returnerer {'built': [...], 'removed': [...], 'unchanged': n}."""
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, SITE_MANIFEST)
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = None
+    if force or manifest is None or manifest.get('format') != SITE_FORMAT:
+        manifest = {'format': SITE_FORMAT, 'pages': {}}
+
+    catalog = storage.load_catalog()
+    public = {init_id: entry for init_id, entry in catalog['initiatives'].items() if not entry['has_code']}
+    result = {'built': [], 'removed': [], 'unchanged': 0}
+    for init_id in list(manifest['pages']):
+        if init_id not in public:
+            page = manifest['pages'].pop(init_id)
+            if page['file'] and os.path.exists(os.path.join(out_dir, page['file'])):
+                os.remove(os.path.join(out_dir, page['file']))
+            result['removed'].append(init_id)
+
+    for init_id, entry in public.items():
+        page = manifest['pages'].get(init_id)
+        if page and page['version'] == entry['version'] and (not page['file'] or os.path.exists(os.path.join(out_dir, page['file']))):
+            result['unchanged'] += 1
+            continue
+        initiative = storage.load_initiative(init_id)
+        if initiative is None:
+            continue
+        stats = calculate_stats(initiative)
+        page = {'name': entry['name'], 'version': entry['version'], 'modified': entry['modified'],
+                'interviews': entry['interview_count'], 'file': None, 'overall_avg': None}
+        if stats and stats['total_interviews'] > 0:
+            page.update({'file': site_page_name(init_id), 'overall_avg': stats['overall_avg']})
+            write_text_atomic(os.path.join(out_dir, page['file']), render_site_page(initiative, stats))
+        manifest['pages'][init_id] = page
+        result['built'].append(init_id)
+
+    if result['built'] or result['removed'] or not os.path.exists(os.path.join(out_dir, "index.html")):
+        write_text_atomic(os.path.join(out_dir, "index.html"), render_site_index(manifest))
+        write_text_atomic(manifest_path, json.dumps(manifest, indent=2, ensure_ascii=False))
+    return result
+
+# ============================================================================
+# FORHÅNDSBEREGNING
+# ============================================================================
+PRECOMPUTE_DIR = "forhandsberegnet"
+PRECOMPUTE_FORMAT = 4
+RESULT_CHARTS = {
+    'phase_radar': (create_phase_radar, 'phases'),
+    'phase_bar': (create_phase_bar_chart, 'phases'),
+    'parameter_radar': (create_parameter_radar, 'parameters'),
+    'parameter_bar': (create_parameter_bar_chart, 'parameters'),
+    'strength_radar': (create_strength_radar, 'high_maturity'),
+    'strength_bar': (create_strength_bar_chart, 'high_maturity'),
+    'improvement_radar': (create_improvement_radar, 'low_maturity'),
+    'improvement_bar': (create_improvement_bar_chart, 'low_maturity'),
+}
+
+def precomputed_path(init_id, version, out_dir=PRECOMPUTE_DIR):
+    # Versjonen og filformatet er en del av filnavnet, så en lesende app aldri får resultater for en annen utgave
+    return os.path.join(out_dir, f"{safe_file_stem(init_id)}.v{version}.f{PRECOMPUTE_FORMAT}.pkl")
+
+def remove_precomputed(init_id, keep=None, out_dir=PRECOMPUTE_DIR):
+    prefix = f"{safe_file_stem(init_id)}.v"
+    for name in os.listdir(out_dir):
+        path = os.path.join(out_dir, name)
+        if name.startswith(prefix) and name.endswith('.pkl') and path != keep:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+def compute_results(initiative, themes=None):
+    """Alt Resultater og Rapport trenger for ett initiativ: statistikk for alle gevinster og
+    hver gevinst for seg, figurene og rapportfilene"""
+    results = {'stats': {}, 'charts': {}, 'reports': None}
+    for benefit_id in ['all'] + list(initiative['benefits']):
+        stats = calculate_stats(initiative, benefit_id if benefit_id != 'all' else None)
+        results['stats'][benefit_id] = stats
+        if stats and stats['total_interviews'] > 0:
+            results['charts'][benefit_id] = {name: build(stats[key]) for name, (build, key) in RESULT_CHARTS.items() if stats[key]}
+    stats = results['stats']['all']
+    if stats and stats['total_interviews'] > 0:
+        results['reports'] = {
+            'html': generate_html_report(initiative, stats, themes),
+            'txt': generate_txt_report(initiative, stats, themes),
+            'pdf': generate_pdf_report(initiative, stats) if FPDF_AVAILABLE else None
+        }
+    return results
+
+@timed
+def precompute_initiative(storage, init_id, out_dir=PRECOMPUTE_DIR):
+    """Beregn og lagre resultater for gjeldende versjon av initiativet. Lagerets skrivelås holdes
+    aldri: initiativet leses som et øyeblikksbilde, og resultatene skrives bare til out_dir.
+    Returnerer versjonen som ble beregnet, eller None hvis initiativet er slettet."""
+    os.makedirs(out_dir, exist_ok=True)
+    initiative = storage.load_initiative(init_id)
+    if initiative is None:
+        remove_precomputed(init_id, out_dir=out_dir)
+        return None
+    version = initiative['version']
+    path = precomputed_path(init_id, version, out_dir)
+    if not os.path.exists(path):
+        themes = get_initiative_themes(load_current_search_index(storage.get_token()), init_id)
+        results = compute_results(initiative, themes)
+        results.update({'init_id': init_id, 'version': version, 'computed_at': datetime.now().isoformat()})
+        write_pickle_atomic(path, results)
+    remove_precomputed(init_id, keep=path, out_dir=out_dir)
+    return version
+
+def get_precomputed(init_id, initiative):
+    """Forhåndsberegnede resultater for akkurat denne versjonen av initiativet, eller None.
+    Endringer som ikke er lagret enda gir en annen versjon, og da beregnes alt som før."""
+    if any(edit['init_id'] == init_id for edit in st.session_state.get('pending_edits', [])):
+        return None
+    key = (init_id, initiative['version'])
+    cached = st.session_state.get('precomputed_cache')
+    if cached and cached[0] == key:
+        return cached[1]
+    results = load_pickle(precomputed_path(*key))
+    if results is not None:
+        st.session_state.precomputed_cache = (key, results)
+    return results
+
+def result_stats(precomputed, initiative, benefit_filter, init_id=None):
+    # Forhåndsberegnet, ellers fra svarmatrisen når den er oppdatert for denne versjonen, ellers beregnet fra intervjuene
+    if precomputed is not None and benefit_filter in precomputed['stats']:
+        return precomputed['stats'][benefit_filter]
+    columns = fresh_score_columns(init_id, initiative) if init_id is not None else None
+    if columns is not None:
+        return stats_from_columns(columns, init_id, benefit_filter)
+    return calculate_stats(initiative, benefit_filter if benefit_filter != "all" else None)
+
+def result_chart(precomputed, benefit_filter, name, stats):
+    charts = precomputed['charts'].get(benefit_filter, {}) if precomputed is not None else {}
+    if name in charts:
+        return charts[name]
+    build, key = RESULT_CHARTS[name]
+    return build(stats[key])
+
+# ============================================================================
+# DEKNING OG UTVALGSSTØRRELSE
+# ============================================================================
+# Intervjuene følger anbefalte spørsmål per rolle, så mange (fase, spørsmål) har bare ett eller to svar.
+# Svarene telles én gang per initiativversjon i en tabell [rolle, gevinst, spørsmål, nivå]; dekning per rolle,
+# gevinst og parameter og simuleringen under er summer og matriseprodukter over den.
+SCORE_LEVELS = np.arange(6)  # nivå 0 (ubrukt) til 5
+QUESTION_KEYS = [(phase, q['id']) for phase in PHASES for q in questions_data[phase]]
+QUESTION_POSITION = {key: index for index, key in enumerate(QUESTION_KEYS)}
+NO_ROLE = "Uten rolle"
+MIN_SAMPLE_ENV = "MODENHET_MIN_SAMPLE"
+MIN_SAMPLE_DEFAULT = 3
+try:
+    MIN_SAMPLE = max(1, int(os.environ.get(MIN_SAMPLE_ENV, MIN_SAMPLE_DEFAULT)))
+except ValueError:
+    MIN_SAMPLE = MIN_SAMPLE_DEFAULT
+
+def low_confidence(count, min_sample=None):
+    # Resultater med færre svar enn minstekravet vises, men merkes som usikre
+    return count < (MIN_SAMPLE if min_sample is None else min_sample)
+
+def low_confidence_questions(stats, min_sample=None):
+    return [(phase, q_id, q['count']) for phase, questions in stats['questions'].items()
+            for q_id, q in questions.items() if low_confidence(q['count'], min_sample)]
+
+@timed
+def build_score_counts(initiative):
+    """Antall svar per nivå for hver rolle, gevinst og (fase, spørsmål): counts[rolle, gevinst, spørsmål, nivå],
+    og antall intervjuer per rolle og gevinst. Intervjuer uten valgt rolle telles under NO_ROLE."""
+    roles = list(ROLES) + [NO_ROLE]
+    role_position = {role: index for index, role in enumerate(roles)}
+    benefits = ['all'] + list(initiative['benefits'])
+    benefits += sorted({interview['info']['benefit_id'] for interview in initiative['interviews'].values()} - set(benefits))
+    benefit_position = {benefit_id: index for index, benefit_id in enumerate(benefits)}
+    counts = np.zeros((len(roles), len(benefits), len(QUESTION_KEYS), len(SCORE_LEVELS)))
+    interviews = np.zeros((len(roles), len(benefits)))
+    for interview in initiative['interviews'].values():
+        info = interview['info']
+        row = role_position.get(info['selected_role'], role_position[NO_ROLE])
+        column = benefit_position[info['benefit_id']]
+        interviews[row, column] += 1
+        for phase, questions in interview['responses'].items():
+            for q_id, resp in questions.items():
+                if resp['score'] > 0:
+                    counts[row, column, QUESTION_POSITION[(phase, int(q_id))], resp['score']] += 1
+    return score_count_tables(roles, benefits, counts, interviews)
+
+def score_count_tables(roles, benefits, counts, interviews):
+    # Tellingene med aksene og matrisene dekningen og simuleringen regner med
+    keys = QUESTION_KEYS
+    return {
+        'keys': keys, 'roles': roles, 'benefits': benefits, 'counts': counts, 'answers': counts.sum(axis=3), 'interviews': interviews,
+        'phase_matrix': np.array([[key[0] == phase for key in keys] for phase in PHASES], dtype=float),
+        'parameter_matrix': np.array([[key[1] in data['questions'] for key in keys] for data in PARAMETERS.values()], dtype=float),
+        'titles': {key: q['title'] for key, q in zip(keys, (q for phase in PHASES for q in questions_data[phase]))}
+    }
+
+def get_score_counts(init_id, initiative):
+    # Én telling per sesjon og initiativversjon. Med endringer som ikke er lagret enda telles det på nytt, som i get_precomputed
+    key = (init_id, initiative['version'])
+    cached = st.session_state.get('score_counts')
+    if cached and cached[0] == key and not any(edit['init_id'] == init_id for edit in st.session_state.get('pending_edits', [])):
+        return cached[1]
+    columns = fresh_score_columns(init_id, initiative)
+    score_counts = score_counts_from_columns(columns, init_id) if columns is not None else build_score_counts(initiative)
+    st.session_state.score_counts = (key, score_counts)
+    return score_counts
+
+def question_coverage(score_counts, role=None, benefit=None):
+    """Antall svar per (fase, spørsmål) for én rolle og/eller én gevinst (None: alle)"""
+    answers = score_counts['answers']
+    if role is not None:
+        answers = answers[[score_counts['roles'].index(role)]]
+    if benefit is not None:
+        answers = answers[:, [score_counts['benefits'].index(benefit)]]
+    return answers.sum(axis=(0, 1))
+
+def parameter_coverage(score_counts, by):
+    """Antall svar per parameter fordelt på rolle (by='role') eller gevinst (by='benefit'): [parameter, gruppe]"""
+    answers = score_counts['answers'].sum(axis=1 if by == 'role' else 0)
+    return score_counts['parameter_matrix'] @ answers.T
+
+def coverage_style(min_sample):
+    # Cellefarge: ubesvart, under minstekravet eller nok svar
+    def style(count):
+        if count == 0:
+            return f"background-color: {COLORS['gray']}; color: #999999"
+        if count < min_sample:
+            return "background-color: rgba(255, 107, 107, 0.35)"
+        return "background-color: #DDFAE2"
+    return style
+
+def show_coverage(init_id, initiative):
+    score_counts = get_score_counts(init_id, initiative)
+    st.session_state.setdefault('min_sample', MIN_SAMPLE)
+    benefit_names = {benefit_id: initiative['benefits'][benefit_id]['name'] if benefit_id in initiative['benefits'] else
+                     ("Generelt" if benefit_id == 'all' else benefit_id) for benefit_id in score_counts['benefits']}
+    col1, col2, col3 = st.columns([2, 2, 3])
+    min_sample = col1.number_input("Minste antall svar", min_value=1, max_value=50, key='min_sample',
+                                   help="Resultater med færre svar merkes som usikre her og i rapportene")
+    by = col2.radio("Fordel på", ["Rolle", "Gevinst"], horizontal=True, key="coverage_by")
+    if by == "Rolle":
+        groups = {role: role for role in score_counts['roles']}
+    else:
+        groups = {benefit_names[benefit_id]: benefit_id for benefit_id in score_counts['benefits']}
+    selected = col3.selectbox(by, options=["Alle"] + list(groups), key="coverage_group")
+    group = groups.get(selected)
+
+    answers = question_coverage(score_counts, role=group if by == "Rolle" else None, benefit=group if by == "Gevinst" else None)
+    answered = answers > 0
+    thin = answered & (answers < min_sample)
+    st.caption(f"{int(thin.sum())} av {int(answered.sum())} besvarte spørsmål har færre enn {min_sample} svar, "
+               f"og {int((~answered).sum())} av {len(answers)} er ikke besvart.")
+    style = coverage_style(min_sample)
+    questions = questions_data[PHASES[0]]
+    grid = pd.DataFrame(answers.reshape(len(PHASES), len(questions)).T.astype(int), columns=PHASES,
+                        index=[f"{q['id']}. {q['title']}" for q in questions])
+    st.markdown("#### Svar per fase og spørsmål")
+    st.dataframe(grid.style.map(style), use_container_width=True)
+
+    st.markdown(f"#### Svar per parameter og {by.lower()}")
+    by_group = parameter_coverage(score_counts, 'role' if by == "Rolle" else 'benefit')
+    interviews = score_counts['interviews'].sum(axis=1 if by == "Rolle" else 0)
+    columns = [index for index in range(len(interviews)) if interviews[index] > 0]
+    names = score_counts['roles'] if by == "Rolle" else [benefit_names[benefit_id] for benefit_id in score_counts['benefits']]
+    table = pd.DataFrame(by_group[:, columns].astype(int), index=list(PARAMETERS), columns=[names[index] for index in columns])
+    table.insert(0, "Alle", by_group.sum(axis=1).astype(int))
+    st.dataframe(table.style.map(style), use_container_width=True)
+    st.caption("Intervjuer per gruppe: " + ", ".join(f"{names[index]}: {int(interviews[index])}" for index in columns))
+    show_interview_plan(init_id, initiative, score_counts)
+
+# ============================================================================
+# SVARMATRISE
+# ============================================================================
+# Avledet, skrivebeskyttet utgave av alle scorer i kolonner, for analyser som ellers måtte lese og pakke ut hele
+# datafilen. Én fil: hode, beskrivelse (JSON med teksttabell og initiativer) og kolonnene på 64-byte-grenser.
+# Leserne åpner den med numpy.memmap, så prosesser og appinstanser deler sidene i operativsystemets cache uten
+# å kopiere. Tekster (intervju-id, gevinst, rolle, dato) lagres som koder i teksttabellen. Filen byttes ut i sin
+# helhet, og bygges på nytt fra lageret hvis den mangler eller ikke kan leses.
+SCORE_COLUMNS_MAGIC = b"MODNKOLS"
+SCORE_COLUMNS_FORMAT = 1
+SCORE_COLUMNS_HEADER = struct.Struct(">8sHI")  # magisk tekst, format og lengde av beskrivelsen
+SCORE_COLUMNS_ALIGN = 64
+SCORE_COLUMNS = {
+    'interview_offsets': np.int64,  # per initiativ + 1: første intervju
+    'response_offsets': np.int64,   # per intervju + 1: første svar
+    'interview': np.int32, 'benefit': np.int32, 'role': np.int32, 'date': np.int32, 'phase': np.int8,  # per intervju
+    'question': np.int16, 'score': np.int8,  # per svar; spørsmålet som indeks i QUESTION_KEYS
+}
+SCORE_COLUMN_STRINGS = ('interview', 'benefit', 'role', 'date')
+
+def encode_initiative_columns(initiative, code):
+    """Kolonnene for ett initiativ; code(tekst) gir tekstens kode i teksttabellen.
+    'lengths' er antall svar per intervju. Svar på ukjente spørsmål eller med ugyldig score tas ikke med."""
+    columns = {name: [] for name in SCORE_COLUMN_STRINGS + ('phase', 'question', 'score', 'lengths')}
+    for iid, interview in initiative['interviews'].items():
+        info = interview['info']
+        columns['interview'].append(code(iid))
+        columns['benefit'].append(code(info['benefit_id']))
+        columns['role'].append(code(info['selected_role'] if info['selected_role'] in ROLES else NO_ROLE))
+        columns['date'].append(code(info['date']))
+        columns['phase'].append(PHASES.index(info['phase']) if info['phase'] in PHASES else -1)
+        count = 0
+        for phase, questions in interview['responses'].items():
+            for q_id, resp in questions.items():
+                index = QUESTION_POSITION.get((phase, int(q_id)))
+                if index is not None and 0 <= resp['score'] < len(SCORE_LEVELS):
+                    columns['question'].append(index)
+                    columns['score'].append(resp['score'])
+                    count += 1
+        columns['lengths'].append(count)
+    return columns
+
+def copy_initiative_columns(old, row, code):
+    # Kolonnene for et uendret initiativ fra forrige fil, med tekstkodene lagt om til den nye teksttabellen
+    start, end = old['interview_offsets'][row], old['interview_offsets'][row + 1]
+    first, last = old['response_offsets'][start], old['response_offsets'][end]
+    columns = {'lengths': np.diff(old['response_offsets'][start:end + 1]), 'phase': old['phase'][start:end],
+               'question': old['question'][first:last], 'score': old['score'][first:last]}
+    for name in SCORE_COLUMN_STRINGS:
+        used, inverse = np.unique(old[name][start:end], return_inverse=True)
+        columns[name] = np.array([code(old['strings'][value]) for value in used], dtype=np.int32)[inverse]
+    return columns
+
+def write_score_columns(path, parts, strings):
+    """Skriv svarmatrisen for parts [(init_id, beskrivelse, kolonner)] til en midlertidig fil og bytt ut.
+    Lesere som har den forrige filen åpen beholder den til de åpner på nytt."""
+    def joined(name, dtype):
+        return np.concatenate([np.asarray(columns[name], dtype=dtype) for _, _, columns in parts] or [np.zeros(0, dtype=dtype)])
+
+    lengths = joined('lengths', np.int64)
+    arrays = {'interview_offsets': np.concatenate([[0], np.cumsum([len(columns['phase']) for _, _, columns in parts], dtype=np.int64)]),
+              'response_offsets': np.concatenate([[0], np.cumsum(lengths)])}
+    arrays.update({name: joined(name, dtype) for name, dtype in SCORE_COLUMNS.items() if name not in arrays})
+    layout, offset = {}, 0
+    for name, dtype in SCORE_COLUMNS.items():
+        layout[name] = [np.dtype(dtype).str, offset, len(arrays[name])]
+        offset += -(-arrays[name].nbytes // SCORE_COLUMNS_ALIGN) * SCORE_COLUMNS_ALIGN
+    meta = json.dumps({'schema': SCHEMA_VERSION, 'questions': len(QUESTION_KEYS), 'created': datetime.now().isoformat(), 'strings': strings,
+                       'initiatives': {init_id: dict(entry, row=row) for row, (init_id, entry, _) in enumerate(parts)},
+                       'columns': layout}, ensure_ascii=False).encode('utf-8')
+    data_start = -(-(SCORE_COLUMNS_HEADER.size + len(meta)) // SCORE_COLUMNS_ALIGN) * SCORE_COLUMNS_ALIGN
+    tmp_file = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_file, 'wb') as f:
+        f.write(SCORE_COLUMNS_HEADER.pack(SCORE_COLUMNS_MAGIC, SCORE_COLUMNS_FORMAT, len(meta)))
+        f.write(meta)
+        for name in SCORE_COLUMNS:
+            f.seek(data_start + layout[name][1])
+            f.write(arrays[name].tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp_file, path)
+
+def open_score_columns(path=SCORE_COLUMNS_FILE):
+    """Svarmatrisen åpnet med numpy.memmap (bare lesing): kolonnene som arrays uten kopiering, og 'initiatives'
+    {init_id: {'row', 'version', 'name', 'benefits'}}, 'strings' og 'codes' (tekst -> kode).
+    None hvis filen mangler, er skrevet for et annet format eller skjema, eller ikke kan leses."""
+    try:
+        with open(path, 'rb') as f:
+            magic, columns_format, length = SCORE_COLUMNS_HEADER.unpack(f.read(SCORE_COLUMNS_HEADER.size))
+            if magic != SCORE_COLUMNS_MAGIC or columns_format != SCORE_COLUMNS_FORMAT:
+                return None
+            meta = json.loads(f.read(length))
+            data = np.memmap(f, dtype=np.uint8, mode='r')
+    except (OSError, ValueError, struct.error):
+        return None
+    if meta['schema'] != SCHEMA_VERSION or meta['questions'] != len(QUESTION_KEYS):
+        return None
+    data_start = -(-(SCORE_COLUMNS_HEADER.size + length) // SCORE_COLUMNS_ALIGN) * SCORE_COLUMNS_ALIGN
+    columns = {'initiatives': meta['initiatives'], 'strings': meta['strings'], 'created': meta['created'],
+               'codes': {text: index for index, text in enumerate(meta['strings'])}}
+    for name, (dtype, offset, count) in meta['columns'].items():
+        start = data_start + offset
+        end = start + count * np.dtype(dtype).itemsize
+        if end > len(data):
+            return None
+        columns[name] = data[start:end].view(dtype)
+    return columns
+
+@timed
+def refresh_score_columns(storage, path=SCORE_COLUMNS_FILE):
+    """Oppdater svarmatrisen etter lageret. Bare initiativer med ny versjon leses og kodes; de andre kopieres som
+    kolonneutsnitt fra forrige fil. Returnerer {'updated': [...], 'removed': [...], 'unchanged': n}."""
+    versions = storage.get_versions()
+    old = open_score_columns(path)
+    previous = old['initiatives'] if old else {}
+    changed = [init_id for init_id, version in versions.items() if init_id not in previous or previous[init_id]['version'] != version]
+    result = {'updated': [], 'removed': [init_id for init_id in previous if init_id not in versions], 'unchanged': len(versions) - len(changed)}
+    if not changed and not result['removed'] and old is not None:
+        return result
+    loaded = dict(storage.iter_initiatives(changed)) if changed else {}
+    strings, codes = [], {}
+
+    def code(text):
+        if text not in codes:
+            codes[text] = len(strings)
+            strings.append(text)
+        return codes[text]
+
+    parts = []
+    for init_id in versions:
+        if init_id in loaded:
+            initiative = loaded[init_id]
+            entry = {'version': initiative['version'], 'name': initiative['name'], 'benefits': list(initiative['benefits'])}
+            parts.append((init_id, entry, encode_initiative_columns(initiative, code)))
+            result['updated'].append(init_id)
+        elif init_id in previous and init_id not in changed:
+            entry = {field: previous[init_id][field] for field in ('version', 'name', 'benefits')}
+            parts.append((init_id, entry, copy_initiative_columns(old, previous[init_id]['row'], code)))
+    write_score_columns(path, parts, strings)
+    return result
+
+@st.cache_resource
+def get_score_columns_cache():
+    # Sist åpnede svarmatrise i prosessen, delt av alle sesjoner: {'entry': (filens identitet, kolonner)}
+    return {}
+
+def current_score_columns(path=SCORE_COLUMNS_FILE):
+    # Åpnes på nytt bare når filen er byttet ut
+    try:
+        info = os.stat(path)
+    except OSError:
+        return None
+    key = (path, info.st_ino, info.st_mtime_ns, info.st_size)
+    cache = get_score_columns_cache()
+    entry = cache.get('entry')
+    if entry is None or entry[0] != key:
+        entry = cache['entry'] = (key, open_score_columns(path))
+    return entry[1]
+
+def fresh_score_columns(init_id, initiative):
+    """Svarmatrisen hvis den har akkurat denne versjonen av initiativet, ellers None.
+    Endringer som ikke er lagret enda gir samme versjon med annet innhold, og da brukes den ikke (som i get_precomputed)."""
+    if any(edit['init_id'] == init_id for edit in st.session_state.get('pending_edits', [])):
+        return None
+    columns = current_score_columns()
+    entry = columns['initiatives'].get(init_id) if columns else None
+    return columns if entry is not None and entry['version'] == initiative['version'] else None
+
+def initiative_rows(columns, init_id):
+    # Intervjuene (start, slutt) og svarene (første, siste) for initiativet
+    row = columns['initiatives'][init_id]['row']
+    start, end = int(columns['interview_offsets'][row]), int(columns['interview_offsets'][row + 1])
+    return start, end, int(columns['response_offsets'][start]), int(columns['response_offsets'][end])
+
+@timed
+def stats_from_columns(columns, init_id, benefit_filter=None):
+    """Samme resultat som calculate_stats, regnet fra svarmatrisen uten å bygge intervjuene som Python-objekter"""
+    start, end, first, last = initiative_rows(columns, init_id)
+    if start == end:
+        return None
+    selected = np.ones(end - start, dtype=bool)
+    if benefit_filter and benefit_filter != "all":
+        selected = columns['benefit'][start:end] == columns['codes'].get(benefit_filter, -1)
+    scores = columns['score'][first:last]
+    keep = np.repeat(selected, np.diff(columns['response_offsets'][start:end + 1])) & (scores > 0)
+    counts = np.bincount(columns['question'][first:last][keep].astype(np.intp) * len(SCORE_LEVELS) + scores[keep],
+                         minlength=len(QUESTION_KEYS) * len(SCORE_LEVELS)).reshape(len(QUESTION_KEYS), len(SCORE_LEVELS))
+    all_scores = {phase: {} for phase in PHASES}
+    for (phase, q_id), row in zip(QUESTION_KEYS, counts):
+        all_scores[phase][q_id] = np.repeat(SCORE_LEVELS, row).tolist()
+    return stats_from_scores(all_scores, int(selected.sum()))
+
+@timed
+def score_counts_from_columns(columns, init_id):
+    """Samme som build_score_counts, regnet fra svarmatrisen"""
+    start, end, first, last = initiative_rows(columns, init_id)
+    roles = list(ROLES) + [NO_ROLE]
+    benefits = ['all'] + columns['initiatives'][init_id]['benefits']
+    used = [columns['strings'][value] for value in np.unique(columns['benefit'][start:end])]
+    benefits += sorted(set(used) - set(benefits))
+
+    def positions(name, labels):
+        # Kode -> posisjon på aksen, for kodene initiativet bruker
+        used, inverse = np.unique(columns[name][start:end], return_inverse=True)
+        return np.array([labels.index(columns['strings'][value]) for value in used], dtype=np.intp)[inverse]
+
+    role_index, benefit_index = positions('role', roles), positions('benefit', benefits)
+    interviews = np.bincount(role_index * len(benefits) + benefit_index, minlength=len(roles) * len(benefits)).reshape(len(roles), len(benefits))
+    lengths = np.diff(columns['response_offsets'][start:end + 1])
+    scores = columns['score'][first:last]
+    keep = scores > 0
+    cells = (np.repeat(role_index * len(benefits) + benefit_index, lengths)[keep] * len(QUESTION_KEYS)
+             + columns['question'][first:last][keep]) * len(SCORE_LEVELS) + scores[keep]
+    counts = np.bincount(cells, minlength=len(roles) * len(benefits) * len(QUESTION_KEYS) * len(SCORE_LEVELS))
+    return score_count_tables(roles, benefits, counts.reshape(len(roles), len(benefits), len(QUESTION_KEYS), len(SCORE_LEVELS)).astype(float),
+                              interviews.astype(float))
+
+# ============================================================================
+# INTERVJUPLANLEGGING
+# ============================================================================
+# Hvilke nye intervjuer (rolle x fase x gevinst) gir minst target svar på hvert spørsmål, eller hver parameter, med
+# færrest mulig intervjuer? Et rollebasert intervju antas å gi ett svar på hvert anbefalte spørsmål for rollen i fasen.
+# Anbefalingene og gruppene er bitmasker over QUESTION_KEYS; planen finnes med grådig dekning (hver runde velges
+# intervjuet som dekker mest av det som mangler), og til slutt fjernes intervjuer som ikke lenger trengs.
+PLAN_MAX_INTERVIEWS = 1000  # per gevinst; stopper planleggingen ved urealistiske mål
+PLAN_BY = {'questions': "Hvert spørsmål", 'parameters': "Hver parameter"}
+
+def parameter_masks():
+    return [sum(1 << index for index, key in enumerate(QUESTION_KEYS) if key[1] in data['questions']) for data in PARAMETERS.values()]
+
+@functools.lru_cache(maxsize=None)
+def plan_options(by):
+    """Mulige intervjuer [(rolle, fase)], gruppene målet gjelder, hvor mange svar hvert intervju gir per gruppe
+    (intervju x gruppe) og hvilke spørsmål som hører til hver gruppe (gruppe x spørsmål)"""
+    position = QUESTION_POSITION
+    options, masks = [], []
+    for role, role_data in ROLES.items():
+        for phase in PHASES:
+            mask = sum(1 << position[(phase, q_id)] for q_id in role_data['recommended_questions'].get(phase, []) if (phase, q_id) in position)
+            if mask:
+                options.append((role, phase))
+                masks.append(mask)
+    if by == 'questions':
+        names, groups = QUESTION_KEYS, [1 << index for index in range(len(QUESTION_KEYS))]
+    else:
+        names, groups = list(PARAMETERS), parameter_masks()
+    contributions = np.array([[(mask & group).bit_count() for group in groups] for mask in masks])
+    membership = np.array([[(group >> index) & 1 for index in range(len(QUESTION_KEYS))] for group in groups])
+    return options, names, contributions, membership
+
+@timed
+def plan_cover(answers, target, by='questions'):
+    """Færrest mulig intervjuer slik at hvert spørsmål (by='questions') eller hver parameter (by='parameters')
+    får minst target svar. answers: svar per QUESTION_KEYS. Returnerer {'picks': [(rolle, fase)], 'missing': svar som mangler,
+    'unreachable': grupper ingen rolle har anbefalt, 'lower_bound': ingen plan kan ha færre intervjuer}."""
+    options, names, contributions, membership = plan_options(by)
+    totals = membership @ answers
+    reach = contributions.max(axis=0)
+    needed = np.where(reach > 0, np.maximum(target - totals, 0), 0).astype(int)
+    unreachable = [name for name, total, can in zip(names, totals, reach) if total < target and not can]
+    lower_bound = 0
+    if needed.any():
+        lower_bound = max(int(np.max(-(-needed // np.maximum(reach, 1)))), -(-int(needed.sum()) // int(contributions.sum(axis=1).max())))
+    sizes = contributions.sum(axis=1)
+    deficit = needed.copy()
+    picks = []
+    while deficit.any() and len(picks) < PLAN_MAX_INTERVIEWS:
+        gains = np.minimum(contributions, deficit).sum(axis=1)
+        best = int(np.lexsort((sizes, -gains))[0])  # mest dekning, deretter korteste intervju
+        deficit = np.maximum(deficit - contributions[best], 0)
+        picks.append(best)
+    # Fjern intervjuer bakfra så lenge resten fortsatt dekker det som manglet
+    total = contributions[picks].sum(axis=0)
+    for index in reversed(range(len(picks))):
+        if np.all(total - contributions[picks[index]] >= needed):
+            total = total - contributions[picks[index]]
+            del picks[index]
+    return {'picks': [options[pick] for pick in picks], 'missing': int(needed.sum()), 'unreachable': unreachable, 'lower_bound': lower_bound}
+
+def plan_interviews(score_counts, target, by='questions', benefit_ids=None):
+    """Intervjuplan for ett initiativ. Uten benefit_ids planlegges for initiativet samlet (nye intervjuer som 'Generelt'),
+    ellers for hver gevinst for seg. Returnerer {'interviews': [{'benefit_id', 'role', 'phase'}], 'missing', 'lower_bound',
+    'unreachable': [(gevinst, gruppe)]}."""
+    answers = score_counts['answers'].sum(axis=0)
+    if benefit_ids is None:
+        problems = [('all', answers.sum(axis=0))]
+    else:
+        problems = [(benefit_id, answers[score_counts['benefits'].index(benefit_id)]) for benefit_id in benefit_ids]
+    plan = {'interviews': [], 'missing': 0, 'lower_bound': 0, 'unreachable': []}
+    for benefit_id, counts in problems:
+        result = plan_cover(counts, target, by)
+        plan['interviews'] += [{'benefit_id': benefit_id, 'role': role, 'phase': phase} for role, phase in result['picks']]
+        plan['missing'] += result['missing']
+        plan['lower_bound'] += result['lower_bound']
+        plan['unreachable'] += [(benefit_id, name) for name in result['unreachable']]
+    return plan
+
+def plan_rows(plan):
+    # Like intervjuer samlet: [(gevinst, rolle, fase, antall)] i planens rekkefølge
+    counts = Counter((item['benefit_id'], item['role'], item['phase']) for item in plan['interviews'])
+    return [key + (count,) for key, count in counts.items()]
+
+@timed
+def plan_portfolio(storage, target, by='questions', per_benefit=False, init_ids=None):
+    """Intervjuplan for hvert initiativ i lageret (eller init_ids): {init_id: (navn, plan)}. Initiativene er uavhengige,
+    så planen for porteføljen er planene for hvert initiativ."""
+    plans = {}
+    # Initiativer der svarmatrisen har gjeldende versjon telles fra den; bare de andre leses fra lageret
+    versions = storage.get_versions()
+    columns = open_score_columns()
+    fresh = {}
+    if columns is not None:
+        fresh = {init_id: entry for init_id, entry in columns['initiatives'].items()
+                 if versions.get(init_id) == entry['version'] and (init_ids is None or init_id in init_ids)}
+    for init_id, entry in fresh.items():
+        benefit_ids = entry['benefits'] if per_benefit and entry['benefits'] else None
+        plans[init_id] = (entry['name'], plan_interviews(score_counts_from_columns(columns, init_id), target, by, benefit_ids))
+    stale = [init_id for init_id in (versions if init_ids is None else init_ids) if init_id not in fresh]
+    for init_id, initiative in storage.iter_initiatives(stale):
+        benefit_ids = list(initiative['benefits']) if per_benefit and initiative['benefits'] else None
+        plans[init_id] = (initiative['name'], plan_interviews(build_score_counts(initiative), target, by, benefit_ids))
+    return plans
+
+def benefit_label(initiative, benefit_id):
+    return initiative['benefits'][benefit_id]['name'] if benefit_id in initiative['benefits'] else "Generelt for initiativet"
+
+def prefill_planned_interview(initiative, row):
+    # Fyller ut skjemaet for nytt intervju (widgetene i Intervju-fanen har disse nøklene)
+    benefit_id, role, phase, _ = row
+    st.session_state.new_interview_benefit = benefit_label(initiative, benefit_id)
+    st.session_state.new_interview_phase = phase
+    st.session_state.new_interview_focus = "Rollebasert"
+    st.session_state.new_interview_role = role
+
+def remove_planned_interview(init_id, benefit_id, role, phase):
+    # Et intervju som er startet fra planen er ikke lenger planlagt
+    plan = st.session_state.get('interview_plan')
+    if plan and plan['init_id'] == init_id:
+        for index, item in enumerate(plan['interviews']):
+            if (item['benefit_id'], item['role'], item['phase']) == (benefit_id, role, phase):
+                del plan['interviews'][index]
+                break
+
+def use_interview_plan(init_id, plan):
+    # Som tilbakekall, så Intervju-fanen (som tegnes før Resultater) viser planen i samme kjøring
+    st.session_state.interview_plan = {'init_id': init_id, 'interviews': list(plan['interviews'])}
+
+def show_planned_interviews(init_id, initiative):
+    plan = st.session_state.get('interview_plan')
+    if not plan or plan['init_id'] != init_id or not plan['interviews']:
+        return
+    rows = plan_rows(plan)
+    choice = st.selectbox(f"Fra intervjuplanen ({len(plan['interviews'])} igjen)", options=range(len(rows)), key="planned_interview",
+                          format_func=lambda index: f"{rows[index][1]} - {rows[index][2]} - {benefit_label(initiative, rows[index][0])} ({rows[index][3]})")
+    st.button("Fyll ut fra planen", on_click=prefill_planned_interview, args=(initiative, rows[min(choice, len(rows) - 1)]), use_container_width=True)
+
+def show_interview_plan(init_id, initiative, score_counts):
+    st.markdown("#### Planlegg neste intervjuer")
+    st.session_state.setdefault('plan_target', st.session_state.get('min_sample', MIN_SAMPLE))
+    col1, col2, col3 = st.columns(3)
+    target = col1.number_input("Mål: antall svar", min_value=1, max_value=50, key="plan_target")
+    by = col2.radio("Gjelder", options=list(PLAN_BY), format_func=PLAN_BY.get, horizontal=True, key="plan_by")
+    per_benefit = col3.radio("Gevinster", options=[False, True], format_func=lambda value: "Per gevinst" if value else "Samlet",
+                             horizontal=True, key="plan_per_benefit", disabled=not initiative['benefits'])
+    plan = plan_interviews(score_counts, target, by, list(initiative['benefits']) if per_benefit and initiative['benefits'] else None)
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Nye intervjuer", len(plan['interviews']))
+    col2.metric("Minst mulig", plan['lower_bound'], help="Ingen plan kan klare målet med færre intervjuer")
+    col3.metric("Svar som mangler", plan['missing'])
+    if plan['unreachable']:
+        names = [f"{key[0]} {key[1]}" if isinstance(key, tuple) else key for _, key in plan['unreachable']]
+        st.caption(f"Ingen rolle har anbefalt {len(names)} av {'spørsmålene' if by == 'questions' else 'parameterne'} under målet, "
+                   f"så de dekkes ikke av planen: {', '.join(sorted(set(names))[:12])}{' ...' if len(set(names)) > 12 else ''}")
+    if not plan['interviews']:
+        st.success("Målet er nådd for alt som kan dekkes med rollebaserte intervjuer")
+        return
+    st.dataframe(pd.DataFrame([{'Rolle': role, 'Fase': phase, 'Gevinst': benefit_label(initiative, benefit_id), 'Intervjuer': count}
+                               for benefit_id, role, phase, count in plan_rows(plan)]), hide_index=True, use_container_width=True)
+    st.button("Bruk planen i Intervju-fanen", key="use_interview_plan", on_click=use_interview_plan, args=(init_id, plan))
+    planned = st.session_state.get('interview_plan')
+    if planned and planned['init_id'] == init_id and planned['interviews']:
+        st.caption(f"Intervju-fanen har en plan med {len(planned['interviews'])} intervjuer igjen; skjemaet for nytt intervju kan fylles ut fra den.")
+
+# ============================================================================
+# HVA OM - SIMULERING
+# ============================================================================
+# Et scenario er målnivåer per (rollegruppe, spørsmål): alle svar under målnivået løftes til det. Snittene regnes
+# fra svartellingen over, med samme regler som calculate_stats (snitt av spørsmålssnitt, styrke fra 4, forbedringsområde under 3).
+HIGH_MATURITY = 4
+LOW_MATURITY = 3
+WHAT_IF_TOP = 10
+
+def build_what_if_base(score_counts, benefit_filter=None):
+    """Grunnlaget for simuleringen: svar per nivå for hver rollegruppe og hvert (fase, spørsmål) for én gevinst
+    (None: alle), og for hvert målnivå hvor mye summen av svarene øker om de løftes dit ('lift')."""
+    counts = score_counts['counts']
+    if benefit_filter is None:
+        counts = counts.sum(axis=1)
+    elif benefit_filter in score_counts['benefits']:
+        counts = counts[:, score_counts['benefits'].index(benefit_filter)]
+    else:
+        counts = np.zeros_like(counts[:, 0])
+    # gap[nivå, mål] = hvor mye ett svar på nivået øker når det løftes til målet
+    gap = np.maximum(SCORE_LEVELS[None, :] - SCORE_LEVELS[:, None], 0)
+    base = {name: score_counts[name] for name in ('keys', 'roles', 'phase_matrix', 'parameter_matrix', 'titles')}
+    base.update({'sums': (counts @ SCORE_LEVELS).sum(axis=0), 'answers': counts.sum(axis=(0, 2)),
+                 'role_answers': counts.sum(axis=2), 'lift': counts @ gap})
+    return base
+
+def what_if_targets(base, changes):
+    """Målnivå per (rollegruppe, spørsmål) for en liste endringer {'questions', 'parameters', 'phase', 'role', 'level'}.
+    Overlappende endringer gir høyeste nivå."""
+    targets = np.zeros(base['lift'].shape[:2], dtype=int)
+    for change in changes:
+        columns = np.array([(key in change['questions'] or any(key[1] in PARAMETERS[name]['questions'] for name in change['parameters']))
+                            and (change['phase'] is None or key[0] == change['phase']) for key in base['keys']])
+        rows = np.array([change['role'] is None or role == change['role'] for role in base['roles']])
+        targets = np.maximum(targets, np.where(rows[:, None] & columns[None, :], change['level'], 0))
+    return targets
+
+def lifted_sums(base, targets):
+    return base['sums'] + np.take_along_axis(base['lift'], targets[..., None], axis=2)[..., 0].sum(axis=0)
+
+def what_if_averages(base, sums):
+    answered = base['answers'] > 0
+    averages = np.divide(sums, base['answers'], out=np.zeros_like(sums), where=answered)
+
+    def grouped(matrix):
+        count = matrix @ answered
+        return np.divide(matrix @ averages, count, out=np.full(len(matrix), np.nan), where=count > 0)
+
+    return {'questions': averages, 'answered': answered, 'phases': grouped(base['phase_matrix']),
+            'parameters': grouped(base['parameter_matrix']), 'overall': float(averages[answered].mean()) if answered.any() else None,
+            'high': answered & (averages >= HIGH_MATURITY), 'low': answered & (averages < LOW_MATURITY)}
+
+@timed
+def simulate_what_if(base, changes, rank_level=HIGH_MATURITY):
+    """Snitt per spørsmål, fase og parameter, samlet snitt og klassifisering før og etter endringene,
+    og spørsmålene som gir størst økning i samlet snitt om de (i tillegg) løftes til rank_level."""
+    targets = what_if_targets(base, changes)
+    before = what_if_averages(base, base['sums'])
+    after = what_if_averages(base, lifted_sums(base, targets))
+    # Løft av hvert spørsmål for seg oppå scenarioet: alle rollegrupper til minst rank_level
+    raised = np.maximum(targets, rank_level)
+    extra = (np.take_along_axis(base['lift'], raised[..., None], axis=2) - np.take_along_axis(base['lift'], targets[..., None], axis=2))[..., 0].sum(axis=0)
+    question_gain = np.divide(extra, base['answers'], out=np.zeros_like(extra), where=after['answered'])
+    overall_gain = question_gain / max(after['answered'].sum(), 1)
+    parameter_count = base['parameter_matrix'] @ after['answered']
+    parameter_gain = base['parameter_matrix'] * question_gain[None, :] / np.maximum(parameter_count, 1)[:, None]
+    ranking = []
+    for index in np.argsort(-overall_gain, kind='stable')[:WHAT_IF_TOP]:
+        if overall_gain[index] <= 0:
+            break
+        best = int(np.argmax(parameter_gain[:, index]))
+        ranking.append({'key': base['keys'][index], 'title': base['titles'][base['keys'][index]], 'avg': after['questions'][index],
+                        'question_gain': question_gain[index], 'overall_gain': overall_gain[index],
+                        'parameter': list(PARAMETERS)[best] if parameter_gain[best, index] > 0 else None,
+                        'parameter_gain': parameter_gain[best, index]})
+    return {'before': before, 'after': after, 'ranking': ranking, 'changed_answers': int((base['role_answers'] * (targets > 0)).sum())}
+
+def what_if_rows(names, before, after):
+    return [{'name': name, 'before': old, 'after': new, 'delta': new - old}
+            for name, old, new in zip(names, before, after) if not np.isnan(old)]
+
+def what_if_label(base, key):
+    return f"{key[0]} {key[1]}. {base['titles'][key]}"
+
+def get_what_if_base(init_id, initiative, benefit_filter):
+    # Ett grunnlag per svartelling og gevinstfilter
+    score_counts = get_score_counts(init_id, initiative)
+    cached = st.session_state.get('what_if_base')
+    if cached and cached[0] is score_counts and cached[1] == benefit_filter:
+        return cached[2]
+    base = build_what_if_base(score_counts, benefit_filter if benefit_filter != "all" else None)
+    st.session_state.what_if_base = (score_counts, benefit_filter, base)
+    return base
+
+@st.fragment
+def show_what_if(init_id, initiative, benefit_filter):
+    # Kjøres som eget fragment, så en endring i simuleringen ikke tegner resten av siden på nytt
+    base = get_what_if_base(init_id, initiative, benefit_filter)
+    answered = [key for key, count in zip(base['keys'], base['answers']) if count > 0]
+    changes = st.session_state.setdefault('what_if_changes', [])
+    with st.form("what_if_add", clear_on_submit=True):
+        col1, col2, col3, col4 = st.columns([3, 3, 2, 2])
+        questions = col1.multiselect("Spørsmål", options=answered, format_func=lambda key: what_if_label(base, key))
+        parameters = col2.multiselect("Parametere", options=list(PARAMETERS))
+        phase = col3.selectbox("Fase", options=["Alle faser"] + PHASES)
+        role = col4.selectbox("Rollegruppe", options=["Alle roller"] + base['roles'])
+        level = st.slider("Løft svar under nivået til", 1, 5, HIGH_MATURITY)
+        if st.form_submit_button("Legg til endring") and (questions or parameters):
+            changes.append({'id': uuid.uuid4().hex[:8], 'questions': set(questions), 'parameters': list(parameters),
+                            'phase': phase if phase in PHASES else None, 'role': role if role in ROLES or role == NO_ROLE else None, 'level': level})
+    for change in changes:
+        col1, col2, col3 = st.columns([6, 3, 1])
+        scope = [what_if_label(base, key) for key in sorted(change['questions'])] + change['parameters']
+        col1.caption(f"{'; '.join(scope)} | {change['phase'] or 'Alle faser'} | {change['role'] or 'Alle roller'}")
+        change['level'] = col2.slider("Nivå", 1, 5, change['level'], key=f"what_if_level_{change['id']}", label_visibility="collapsed")
+        col3.button("Fjern", key=f"what_if_remove_{change['id']}", on_click=changes.remove, args=(change,))
+    rank_level = st.slider("Ranger spørsmål etter gevinst ved løft til nivå", 2, 5, HIGH_MATURITY, key="what_if_rank_level")
+
+    result = simulate_what_if(base, changes, rank_level)
+    before, after = result['before'], result['after']
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Samlet snitt", format_score(after['overall']), format_score(after['overall'] - before['overall'], True) if changes and before['overall'] is not None else None)
+    col2.metric("Styrker", int(after['high'].sum()), int(after['high'].sum() - before['high'].sum()) if changes else None)
+    col3.metric("Forbedringsområder", int(after['low'].sum()), int(after['low'].sum() - before['low'].sum()) if changes else None, delta_color="inverse")
+    col4.metric("Svar som løftes", result['changed_answers'])
+    if changes:
+        col1, col2 = st.columns(2)
+        with col1:
+            st.markdown("#### Faser")
+            st.dataframe(delta_table(what_if_rows(PHASES, before['phases'], after['phases'])), hide_index=True, use_container_width=True)
+        with col2:
+            st.markdown("#### Parametere")
+            st.dataframe(delta_table(what_if_rows(list(PARAMETERS), before['parameters'], after['parameters'])), hide_index=True, use_container_width=True)
+        new_high = [what_if_label(base, key) for key, old, new in zip(base['keys'], before['high'], after['high']) if new and not old]
+        no_longer_low = [what_if_label(base, key) for key, old, new in zip(base['keys'], before['low'], after['low']) if old and not new]
+        if new_high:
+            st.success("Blir styrkeområder: " + "; ".join(new_high))
+        if no_longer_low:
+            st.info("Ikke lenger forbedringsområder: " + "; ".join(no_longer_low))
+    st.markdown(f"#### Størst gevinst ved løft til nivå {rank_level}")
+    if result['ranking']:
+        st.dataframe(pd.DataFrame([{'Spørsmål': what_if_label(base, item['key']), 'Snitt': format_score(item['avg']),
+                                    'Spørsmål +': format_score(item['question_gain'], True), 'Samlet +': f"{item['overall_gain']:+.3f}",
+                                    'Parameter': item['parameter'] or '-', 'Parameter +': format_score(item['parameter_gain'], True) if item['parameter'] else '-'}
+                                   for item in result['ranking']]), hide_index=True, use_container_width=True)
+    else:
+        st.info(f"Alle besvarte spørsmål er allerede på nivå {rank_level} eller høyere")
+
+# ============================================================================
+# ENDRINGER OVER TID
+# ============================================================================
+def delta_rows(before, after, names=None):
+    # Snitt før og etter for hver nøkkel som finnes i minst én av utgavene, i rekkefølgen de vises ellers
+    rows = []
+    for key in list(after) + [key for key in before if key not in after]:
+        old = before[key]['avg'] if key in before else None
+        new = after[key]['avg'] if key in after else None
+        rows.append({'key': key, 'name': names[key] if names else key, 'before': old, 'after': new,
+                     'delta': new - old if old is not None and new is not None else None})
+    return rows
+
+def flat_questions(stats):
+    return {(phase, q_id): q for phase, questions in stats['questions'].items() for q_id, q in questions.items()} if stats else {}
+
+@timed
+def compare_initiative(before, after, benefit_filter=None):
+    """Endringer mellom to utgaver av et initiativ: snitt per fase, parameter og spørsmål før og etter,
+    og intervjuer som er lagt til. before eller after kan være None (initiativet fantes ikke)."""
+    old = calculate_stats(before, benefit_filter) if before else None
+    new = calculate_stats(after, benefit_filter) if after else None
+    old_questions, new_questions = flat_questions(old), flat_questions(new)
+    titles = {key: f"{key[0][:4]} {key[1]}: {q['title']}" for key, q in {**old_questions, **new_questions}.items()}
+    questions = [row for row in delta_rows(old_questions, new_questions, titles) if row['delta'] != 0]
+    questions.sort(key=lambda row: -abs(row['delta']) if row['delta'] is not None else 0)
+    old_interviews = before['interviews'] if before else {}
+    added = []
+    for iid, interview in (after['interviews'] if after else {}).items():
+        info = interview['info']
+        if iid in old_interviews or (benefit_filter and info['benefit_id'] != benefit_filter):
+            continue
+        summary = interview['summary']
+        added.append({'date': info['date'], 'benefit': info['benefit_name'], 'phase': info['phase'],
+                      'answered': summary['answered'], 'avg': summary_avg(summary)})
+    added.sort(key=lambda row: row['date'])
+    old_overall = old['overall_avg'] if old and old['total_interviews'] else None
+    new_overall = new['overall_avg'] if new and new['total_interviews'] else None
+    return {
+        'overall': {'before': old_overall, 'after': new_overall,
+                    'delta': new_overall - old_overall if old_overall is not None and new_overall is not None else None},
+        'interviews': {'before': old['total_interviews'] if old else 0, 'after': new['total_interviews'] if new else 0},
+        'phases': delta_rows(old['phases'] if old else {}, new['phases'] if new else {}),
+        'parameters': delta_rows(old['parameters'] if old else {}, new['parameters'] if new else {}),
+        'questions': questions,
+        'new_interviews': added
+    }
+
+def format_score(value, signed=False):
+    if value is None:
+        return "-"
+    return f"{value:+.2f}" if signed else f"{value:.2f}"
+
+def delta_table(rows):
+    return pd.DataFrame([{'': row['name'], 'Før': format_score(row['before']), 'Etter': format_score(row['after']),
+                          'Endring': format_score(row['delta'], True)} for row in rows])
+
+def delta_csv(comparison):
+    # Alle endringer i én tabell, for videre bruk i Excel
+    out = StringIO()
+    writer = csv.writer(out, delimiter=';')
+    writer.writerow(['Nivå', 'Navn', 'Før', 'Etter', 'Endring'])
+    writer.writerow(['Samlet', 'Samlet modenhet'] + [format_score(comparison['overall'][key], key == 'delta') for key in ('before', 'after', 'delta')])
+    for level, key in (('Fase', 'phases'), ('Parameter', 'parameters'), ('Spørsmål', 'questions')):
+        for row in comparison[key]:
+            writer.writerow([level, row['name'], format_score(row['before']), format_score(row['after']), format_score(row['delta'], True)])
+    return out.getvalue()
+
+def generate_delta_report(initiative, comparison, start_label, end_label):
+    # HTML-rapport over endringene, med samme stilark som hovedrapporten
+    def table(rows, heading):
+        body = "".join(f"<tr><td>{html_escape(str(row['name']))}</td><td>{format_score(row['before'])}</td><td>{format_score(row['after'])}</td>"
+                       f"<td><strong>{format_score(row['delta'], True)}</strong></td></tr>" for row in rows)
+        return f"<table><tr><th>{heading}</th><th>Før</th><th>Etter</th><th>Endring</th></tr>{body}</table>" if rows else "<p>Ingen endringer.</p>"
+
+    overall = comparison['overall']
+    interviews = comparison['interviews']
+    added = "".join(f"<tr><td>{row['date']}</td><td>{html_escape(row['benefit'])}</td><td>{row['phase']}</td><td>{row['answered']}</td>"
+                    f"<td>{format_score(row['avg'] or None)}</td></tr>" for row in comparison['new_interviews'])
+    return f"""<!DOCTYPE html>
+<html lang="no">
+<head>
+    <meta charset="UTF-8">
+    <title>Endringer - {html_escape(initiative['name'])}</title>
+    <style>{REPORT_CSS}</style>
+</head>
+<body>
+    <h1>Endringer i modenhet - {html_escape(initiative['name'])}</h1>
+    <p class="subtitle">Fra {start_label} til {end_label}</p>
+    <table>
+        <tr><td><strong>Samlet modenhet</strong></td><td>{format_score(overall['before'])} &rarr; {format_score(overall['after'])} ({format_score(overall['delta'], True)})</td></tr>
+        <tr><td><strong>Antall intervjuer</strong></td><td>{interviews['before']} &rarr; {interviews['after']}</td></tr>
+        <tr><td><strong>Nye intervjuer</strong></td><td>{len(comparison['new_interviews'])}</td></tr>
+    </table>
+    <h2>Faser</h2>
+    {table(comparison['phases'], 'Fase')}
+    <h2>Parametere</h2>
+    {table(comparison['parameters'], 'Parameter')}
+    <h2>Spørsmål med endring</h2>
+    {table(comparison['questions'], 'Spørsmål')}
+    <h2>Nye intervjuer (anonymisert)</h2>
+    {f"<table><tr><th>Dato</th><th>Gevinst</th><th>Fase</th><th>Besvarte</th><th>Snitt</th></tr>{added}</table>" if added else "<p>Ingen nye intervjuer.</p>"}
+    <div class="footer">Generert {datetime.now().strftime('%d.%m.%Y %H:%M')} | Bane NOR - Modenhetsvurdering Gevinstrealisering</div>
+</body>
+</html>"""
+
+def show_delta_tab(initiative, init_id):
+    st.markdown("## Endringer over tid")
+    if not get_storage().keeps_history:
+        st.info("Historikk lagres som sikkerhetskopier i fillageret, og er ikke tilgjengelig for dette lageret.")
+        return
+    index = ensure_backup_index()
+    records = index['timeline'].get(init_id) if index else None
+    if not records:
+        st.info("Det finnes ingen historikk for dette initiativet enda. Historikk lagres ved hver lagring.")
+        return
+    first = datetime.fromisoformat(records[0][0])
+    today = datetime.now().date()
+    col1, col2 = st.columns(2)
+    with col1:
+        start_date = st.date_input("Fra dato", value=max(first.date(), today - timedelta(days=30)), min_value=first.date(), max_value=today, key="delta_start_date")
+        start_time = st.time_input("Fra klokkeslett", value=datetime.min.time(), key="delta_start_time")
+    with col2:
+        to_now = st.checkbox("Til nå (gjeldende utgave)", value=True, key="delta_to_now")
+        if not to_now:
+            end_date = st.date_input("Til dato", value=today, min_value=first.date(), max_value=today, key="delta_end_date")
+            end_time = st.time_input("Til klokkeslett", value=datetime.max.time().replace(microsecond=0), key="delta_end_time")
+    benefit_options = {"Alle gevinster": None}
+    benefit_options.update({benefit['name']: benefit_id for benefit_id, benefit in initiative['benefits'].items()})
+    benefit_filter = benefit_options[st.selectbox("Gevinst:", options=list(benefit_options), key="delta_benefit")]
+
+    start = datetime.combine(start_date, start_time)
+    before = initiative_at(index, init_id, start.isoformat(timespec='microseconds'))
+    if to_now:
+        after, end_label = initiative, "nå"
+    else:
+        end = datetime.combine(end_date, end_time)
+        after, end_label = initiative_at(index, init_id, end.isoformat(timespec='microseconds')), end.strftime('%d.%m.%Y %H:%M')
+    comparison = compare_initiative(before, after, benefit_filter)
+    start_label = start.strftime('%d.%m.%Y %H:%M')
+    if before is None:
+        st.caption(f"Initiativet fantes ikke {start_label} - alt vises som nytt.")
+
+    overall = comparison['overall']
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Samlet modenhet", format_score(overall['after']), format_score(overall['delta'], True) if overall['delta'] is not None else None)
+    col2.metric("Intervjuer", comparison['interviews']['after'], comparison['interviews']['after'] - comparison['interviews']['before'])
+    col3.metric("Nye intervjuer", len(comparison['new_interviews']))
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("### Faser")
+        if comparison['phases']:
+            st.dataframe(delta_table(comparison['phases']), hide_index=True, use_container_width=True)
+    with col2:
+        st.markdown("### Parametere")
+        if comparison['parameters']:
+            st.dataframe(delta_table(comparison['parameters']), hide_index=True, use_container_width=True)
+    st.markdown("### Spørsmål med endring")
+    if comparison['questions']:
+        st.dataframe(delta_table(comparison['questions']), hide_index=True, use_container_width=True)
+    else:
+        st.info("Ingen endringer i snitt per spørsmål")
+    st.markdown("### Nye intervjuer")
+    if comparison['new_interviews']:
+        st.dataframe(pd.DataFrame([{'Dato': row['date'], 'Gevinst': row['benefit'], 'Fase': row['phase'], 'Besvarte': row['answered'],
+                                    'Snitt': format_score(row['avg'] or None)} for row in comparison['new_interviews']]), hide_index=True, use_container_width=True)
+    else:
+        st.info("Ingen nye intervjuer i perioden")
+    file_stem = f"modenhet_endringer_{initiative['name']}_{start.strftime('%Y%m%d')}"
+    col1, col2 = st.columns(2)
+    col1.download_button("Last ned rapport (HTML)", data=generate_delta_report(initiative, comparison, start_label, end_label),
+                         file_name=f"{file_stem}.html", mime="text/html", use_container_width=True)
+    col2.download_button("Last ned endringer (CSV)", data=delta_csv(comparison), file_name=f"{file_stem}.csv", mime="text/csv", use_container_width=True)
+
+# ============================================================================
+# EKSPORT AV RÅDATA
+# ============================================================================
+RAW_EXPORT_COLUMNS = ['initiative', 'benefit', 'interview', 'participant', 'role', 'phase',
+                      'question', 'parameter', 'score', 'has_notes', 'date']
+RAW_EXPORT_FORMATS = {
+    'csv': ("CSV", "text/csv", ".csv"),
+    'parquet': ("Parquet", "application/vnd.apache.parquet", ".parquet"),
+    'arrow': ("Arrow", "application/vnd.apache.arrow.stream", ".arrows"),
+}
+QUESTION_PARAMETERS = {
+    q_id: "; ".join(name for name, param in PARAMETERS.items() if q_id in param['questions'])
+    for q_id in {q['id'] for questions in questions_data.values() for q in questions}
+}
+
+def iter_raw_responses(initiative):
+    """Én rad per besvart spørsmål, i rekkefølgen til RAW_EXPORT_COLUMNS.
+    Deltakerne anonymiseres på samme måte som i rapportene."""
+    name = initiative['name']
+    for position, (iid, interview) in enumerate(initiative['interviews'].items()):
+        info = interview['info']
+        participant = get_anonymous_name(position)
+        for phase, questions in interview['responses'].items():
+            for q_id, resp in questions.items():
+                score = resp['score']
+                if score > 0:
+                    yield (name, info['benefit_name'], iid, participant, info['role'], phase,
+                           int(q_id), QUESTION_PARAMETERS.get(int(q_id), ''), score, bool(resp['notes'].strip()),
+                           info['date'])
+
+def raw_export_schema():
+    text = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ('initiative', text), ('benefit', text), ('interview', pa.string()), ('participant', text), ('role', text),
+        ('phase', text), ('question', pa.int8()), ('parameter', text), ('score', pa.int8()), ('has_notes', pa.bool_()),
+        ('date', pa.date32())
+    ])
+
+def parse_export_date(text, cache):
+    if text not in cache:
+        try:
+            cache[text] = datetime.strptime(text, '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            cache[text] = None
+    return cache[text]
+
+def raw_record_batch(rows, schema, date_cache):
+    columns = list(zip(*rows)) if rows else [() for _ in RAW_EXPORT_COLUMNS]
+    arrays = []
+    for field, values in zip(schema, columns):
+        if field.name == 'date':
+            values = [parse_export_date(value, date_cache) for value in values]
+        if pa.types.is_dictionary(field.type):
+            arrays.append(pa.array(values, pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(values, field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+@timed
+def export_raw_responses(storage, out, fmt='csv', init_ids=None):
+    """Skriv alle svar i langt format til out (filsti eller binær fil), ett initiativ om gangen,
+    slik at bare ett initiativ er i minnet. CSV strømmes rad for rad; Parquet får én radgruppe og
+    Arrow (IPC-strøm) én batch per initiativ. Returnerer antall rader."""
+    if fmt not in RAW_EXPORT_FORMATS:
+        raise ValueError(f"Ukjent eksportformat: {fmt}")
+    if fmt != 'csv' and not PYARROW_AVAILABLE:
+        raise RuntimeError(f"Eksport til {fmt} krever pyarrow: pip install pyarrow")
+    if isinstance(out, (str, os.PathLike)):
+        with open(out, 'wb') as f:
+            return export_raw_responses(storage, f, fmt, init_ids)
+
+    count = 0
+    if fmt == 'csv':
+        text = TextIOWrapper(out, encoding='utf-8-sig', newline='')
+        try:
+            writer = csv.writer(text, delimiter=';')
+            writer.writerow(RAW_EXPORT_COLUMNS)
+            for _, initiative in storage.iter_initiatives(init_ids):
+                for row in iter_raw_responses(initiative):
+                    writer.writerow(row[:9] + (int(row[9]),) + row[10:])
+                    count += 1
+            text.flush()
+        finally:
+            text.detach()
+        return count
+
+    schema = raw_export_schema()
+    writer = pq.ParquetWriter(out, schema) if fmt == 'parquet' else pa.ipc.new_stream(out, schema)
+    date_cache = {}
+    try:
+        for _, initiative in storage.iter_initiatives(init_ids):
+            rows = list(iter_raw_responses(initiative))
+            if rows:
+                writer.write_batch(raw_record_batch(rows, schema, date_cache))
+                count += len(rows)
+        if count == 0:
+            # Tom fil med riktig skjema, slik at lesere ikke feiler
+            writer.write_batch(raw_record_batch([], schema, date_cache))
+    finally:
+        writer.close()
+    return count
+
+def raw_export_bytes(init_ids, fmt):
+    # For nedlastingsknapper; kalles først når brukeren trykker
+    buffer = BytesIO()
+    export_raw_responses(get_storage(), buffer, fmt, init_ids)
+    return buffer.getvalue()
+
+def show_raw_export(init_ids, file_stem, key):
+    # Nedlasting av rådata i alle formater; filen lages først ved klikk
+    columns = st.columns(len(RAW_EXPORT_FORMATS))
+    for column, (fmt, (label, mime, extension)) in zip(columns, RAW_EXPORT_FORMATS.items()):
+        if fmt != 'csv' and not PYARROW_AVAILABLE:
+            column.caption(f"For {label}: pip install pyarrow")
+            continue
+        column.download_button(f"Rådata ({label})", data=functools.partial(raw_export_bytes, init_ids, fmt),
+                               file_name=f"{file_stem}{extension}", mime=mime, key=f"{key}_{fmt}", use_container_width=True)
+
 # ============================================================================
 # HOVEDAPPLIKASJON
 # ============================================================================
-def show_project_selector(data):
+def show_project_selector():
     # Viser prosjektvelger
     st.markdown(f'''
     <div style="text-align:center;margin-bottom:2rem;">
@@ -1218,15 +5138,22 @@ def show_project_selector(data):
 
     with col1:
         st.markdown("### Apne eksisterende prosjekt")
-        if data['initiatives']:
-            project_names = {init_id: init['name'] for init_id, init in data['initiatives'].items()}
-            selected_project = st.selectbox("Velg prosjekt", options=list(project_names.keys()), format_func=lambda x: project_names[x])
-            initiative = data['initiatives'][selected_project]
-            has_code = initiative.get('access_code', '') != ''
+        catalog = get_catalog()
+        if catalog['initiatives']:
+            selected_project = catalog_picker(
+                catalog['initiatives'], "project", "Velg prosjekt",
+                lambda k, e: f"{e['name']} ({e['interview_count']} intervjuer)",
+                fields=('name',),
+                sort_options={"Relevans": ('relevance', False), "Navn": ('name', False), "Sist endret": ('modified', True), "Opprettet": ('created', True), "Antall intervjuer": ('interview_count', True)}
+            )
+            if selected_project is None:
+                return
+            has_code = catalog['initiatives'][selected_project]['has_code']
             if has_code:
                 entered_code = st.text_input("Tilgangskode", type="password", key="access_code_input")
                 if st.button("Apne prosjekt", use_container_width=True):
-                    if entered_code == initiative.get('access_code', ''):
+                    initiative = get_storage().load_initiative(selected_project)
+                    if initiative is not None and entered_code == initiative['access_code']:
                         st.session_state['current_project'] = selected_project
                         st.rerun()
                     else:
@@ -1251,19 +5178,64 @@ def show_project_selector(data):
                 elif new_code and new_code != new_code_confirm:
                     st.error("Tilgangskodene matcher ikke")
                 else:
-                    init_id = datetime.now().strftime("%Y%m%d%H%M%S")
-                    data['initiatives'][init_id] = {
+                    init_id = uuid.uuid4().hex  # unik også når flere oppretter samtidig
+                    stage_initiative(init_id, {
                         'name': new_name,
                         'description': new_desc,
                         'access_code': new_code,
-                        'created': datetime.now().isoformat(),
-                        'benefits': {},
-                        'interviews': {}
-                    }
-                    persist_data()
-                    st.session_state['current_project'] = init_id
-                    st.success(f"'{new_name}' opprettet!")
-                    st.rerun()
+                        'created': datetime.now().isoformat()
+                    })
+                    # Prosjektet åpnes bare når det er lagret; ellers vises konflikten eller ventende lagring
+                    if persist_data():
+                        st.session_state['current_project'] = init_id
+                        st.success(f"'{new_name}' opprettet!")
+                        st.rerun()
+
+    st.markdown("---")
+    show_note_search()
+    st.markdown("---")
+    with st.expander("Importer intervjuer fra tidligere runder"):
+        show_import()
+
+def show_note_search():
+    # Fritekstsøk i notater på tvers av initiativer
+    st.markdown("### Søk i intervjunotater")
+    col_query, col_rebuild = st.columns([4, 1])
+    query = col_query.text_input("Søkeord", key="note_search_query", placeholder="F.eks. nullpunkter")
+    if col_rebuild.button("Bygg indeks på nytt", use_container_width=True):
+        storage = get_storage()
+        token = storage.get_token()
+        rebuild_search_index(storage.load_all(), token)
+        st.session_state.pop('search_index_cache', None)
+        st.success("Søkeindeksen er bygget på nytt")
+    if not query:
+        return
+    index = get_search_index()
+    # Prosjekter med tilgangskode vises bare når de er åpnet
+    allowed = {init_id for init_id, entry in get_catalog()['initiatives'].items()
+               if not entry['has_code'] or init_id == st.session_state.get('current_project')}
+    start = time.perf_counter()
+    hits = search_notes(index, query, allowed)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    st.caption(f"{len(hits)} treff på {elapsed_ms:.1f} ms. Prosjekter med tilgangskode er utelatt.")
+    positions = {}
+    initiatives = {}
+    for (init_id, iid, phase, q_id), _ in hits:
+        if init_id not in initiatives:
+            initiatives[init_id] = get_storage().load_initiative(init_id)
+        initiative = initiatives[init_id]
+        if initiative is None or iid not in initiative['interviews']:
+            continue
+        if init_id not in positions:
+            positions[init_id] = {key: idx for idx, key in enumerate(initiative['interviews'])}
+        resp = initiative['interviews'][iid]['responses'].get(phase, {}).get(q_id, {})
+        q_title = next((q['title'] for q in questions_data.get(phase, []) if str(q['id']) == q_id), f"Sporsmal {q_id}")
+        score = resp.get('score', 0)
+        score_text = f" | Nivå {score}" if score > 0 else ""
+        st.markdown(f'''<div style="padding:10px 14px;margin:6px 0;background:{COLORS['gray_light']};border-left:3px solid {COLORS['primary']};border-radius:4px;">
+            <div style="font-size:0.9rem;color:#666;">{html_escape(initiative['name'])} | {phase} | {q_id}. {q_title} | {get_anonymous_name(positions[init_id][iid])}{score_text}</div>
+            <div>{html_escape(resp.get('notes', ''))}</div>
+        </div>''', unsafe_allow_html=True)
 
 def show_main_app(data, current_project_id):
     # Viser hovedapplikasjonen
@@ -1286,7 +5258,7 @@ def show_main_app(data, current_project_id):
             refresh_data()
             st.rerun()
 
-    tab1, tab2, tab3, tab4, tab5 = st.tabs(["Om vurderingen", "Gevinster", "Intervju", "Resultater", "Rapport"])
+    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["Om vurderingen", "Gevinster", "Intervju", "Resultater", "Rapport", "Endringer"])
 
     # TAB 1: OM VURDERINGEN
     with tab1:
@@ -1313,7 +5285,7 @@ def show_main_app(data, current_project_id):
     # TAB 2: GEVINSTER
     with tab2:
         st.markdown(f"## Gevinster for {initiative['name']}")
-        st.write(f"**Beskrivelse:** {initiative.get('description', 'Ingen')}")
+        st.write(f"**Beskrivelse:** {initiative['description'] or 'Ingen'}")
         st.markdown("---")
         col1, col2 = st.columns([2, 1])
         with col2:
@@ -1322,22 +5294,20 @@ def show_main_app(data, current_project_id):
                 new_benefit = st.text_input("Gevinstnavn", placeholder="F.eks. Redusert reisetid")
                 if st.form_submit_button("Legg til", use_container_width=True):
                     if new_benefit:
-                        if 'benefits' not in initiative:
-                            initiative['benefits'] = {}
-                        initiative['benefits'][datetime.now().strftime("%Y%m%d%H%M%S%f")] = {
+                        stage_benefit(current_project_id, datetime.now().strftime("%Y%m%d%H%M%S%f"), {
                             'name': new_benefit,
                             'created': datetime.now().isoformat()
-                        }
+                        })
                         persist_data()
                         st.rerun()
         with col1:
             st.markdown("### Registrerte gevinster")
-            if initiative.get('benefits'):
-                for ben_id, benefit in initiative.get('benefits', {}).items():
+            if initiative['benefits']:
+                for ben_id, benefit in initiative['benefits'].items():
                     col_a, col_b = st.columns([4, 1])
                     col_a.write(f"- **{benefit['name']}**")
                     if col_b.button("Slett", key=f"del_ben_{ben_id}"):
-                        del initiative['benefits'][ben_id]
+                        stage_benefit(current_project_id, ben_id, None)
                         persist_data()
                         st.rerun()
             else:
@@ -1350,22 +5320,22 @@ def show_main_app(data, current_project_id):
                 new_code = st.text_input("Ny tilgangskode", type="password")
                 new_code_confirm = st.text_input("Bekreft ny kode", type="password")
                 if st.form_submit_button("Oppdater kode"):
-                    if current_code != initiative.get('access_code', ''):
+                    if current_code != initiative['access_code']:
                         st.error("Feil nåværende kode")
                     elif new_code != new_code_confirm:
                         st.error("Nye koder matcher ikke")
                     else:
-                        initiative['access_code'] = new_code
-                        persist_data()
-                        st.success("Tilgangskode oppdatert!")
+                        stage_initiative(current_project_id, {'access_code': new_code})
+                        if persist_data():
+                            st.success("Tilgangskode oppdatert!")
         with st.expander("Slett prosjekt", expanded=False):
             st.warning("Dette vil slette prosjektet og alle tilhorende data permanent!")
             confirm_name = st.text_input("Skriv prosjektnavnet for å bekrefte sletting")
             if st.button("Slett prosjekt permanent", type="primary"):
                 if confirm_name == initiative['name']:
-                    del data['initiatives'][current_project_id]
-                    persist_data()
-                    del st.session_state['current_project']
+                    stage_delete_initiative(current_project_id)
+                    if persist_data():
+                        del st.session_state['current_project']
                     st.rerun()
                 else:
                     st.error("Prosjektnavnet stemmer ikke")
@@ -1377,18 +5347,19 @@ def show_main_app(data, current_project_id):
             col1, col2 = st.columns(2)
             with col1:
                 st.markdown("### Start nytt intervju")
+                show_planned_interviews(current_project_id, initiative)
                 benefit_options = {"Generelt for initiativet": "all"}
-                for ben_id, ben in initiative.get('benefits', {}).items():
+                for ben_id, ben in initiative['benefits'].items():
                     benefit_options[ben['name']] = ben_id
-                selected_benefit_name = st.selectbox("Gevinst", options=list(benefit_options.keys()))
+                selected_benefit_name = st.selectbox("Gevinst", options=list(benefit_options.keys()), key="new_interview_benefit")
                 selected_benefit_id = benefit_options[selected_benefit_name]
-                selected_phase = st.selectbox("Fase", options=PHASES)
-                focus_mode = st.radio("Fokusmodus", options=["Rollebasert", "Parameterbasert", "Alle sporsmal"], horizontal=True)
+                selected_phase = st.selectbox("Fase", options=PHASES, key="new_interview_phase")
+                focus_mode = st.radio("Fokusmodus", options=["Rollebasert", "Parameterbasert", "Alle sporsmal"], horizontal=True, key="new_interview_focus")
                 selected_role = None
                 selected_params = []
                 recommended = []
                 if focus_mode == "Rollebasert":
-                    selected_role = st.selectbox("Rolle", options=list(ROLES.keys()))
+                    selected_role = st.selectbox("Rolle", options=list(ROLES.keys()), key="new_interview_role")
                     recommended = get_recommended_questions("role", selected_role, selected_phase)
                     st.caption(ROLES[selected_role]['description'])
                     st.success(f"{len(recommended)} anbefalte sporsmal. Alle 23 tilgjengelige.")
@@ -1403,40 +5374,50 @@ def show_main_app(data, current_project_id):
                     date = st.date_input("Dato", value=datetime.now())
                     if st.form_submit_button("Start intervju", use_container_width=True):
                         if interviewee:
-                            interview_id = datetime.now().strftime("%Y%m%d%H%M%S")
-                            initiative['interviews'][interview_id] = {
+                            interview_id = uuid.uuid4().hex
+                            stage_interview(current_project_id, interview_id, {
                                 'info': {'interviewer': interviewer, 'interviewee': interviewee, 'role': role_title, 'date': date.strftime('%Y-%m-%d'), 'phase': selected_phase, 'benefit_id': selected_benefit_id, 'benefit_name': selected_benefit_name, 'focus_mode': focus_mode, 'selected_role': selected_role, 'selected_params': selected_params},
                                 'recommended_questions': recommended, 'responses': {}
-                            }
-                            persist_data()
-                            st.session_state['active_interview'] = {'init_id': current_project_id, 'interview_id': interview_id}
-                            st.rerun()
+                            })
+                            if persist_data():
+                                if selected_role:
+                                    remove_planned_interview(current_project_id, selected_benefit_id, selected_role, selected_phase)
+                                st.session_state['active_interview'] = {'init_id': current_project_id, 'interview_id': interview_id}
+                                st.rerun()
             with col2:
                 st.markdown("### Fortsett eksisterende")
-                if initiative.get('interviews'):
-                    interview_options = {f"{i['info']['interviewee']} - {i['info'].get('benefit_name', 'Generelt')} ({i['info'].get('phase', '?')})": iid for iid, i in initiative['interviews'].items()}
-                    selected_interview = st.selectbox("Velg intervju", options=list(interview_options.keys()))
-                    if st.button("Fortsett", use_container_width=True):
-                        st.session_state['active_interview'] = {'init_id': current_project_id, 'interview_id': interview_options[selected_interview]}
+                interview_entries = get_catalog()['interviews'].get(current_project_id, {})
+                if interview_entries:
+                    selected_interview = catalog_picker(
+                        interview_entries, "interview", "Velg intervju",
+                        lambda k, e: f"{e['interviewee']} - {e['benefit_name']} ({e['phase']})",
+                        fields=('interviewee', 'benefit_name', 'phase'),
+                        sort_options={"Relevans": ('relevance', False), "Sist endret": ('modified', True), "Dato": ('date', True), "Intervjuobjekt": ('interviewee', False), "Besvarte": ('answered', True)}
+                    )
+                    if selected_interview and st.button("Fortsett", use_container_width=True):
+                        st.session_state['active_interview'] = {'init_id': current_project_id, 'interview_id': selected_interview}
                         st.rerun()
                 else:
                     st.info("Ingen intervjuer registrert enda.")
+            st.markdown("---")
+            with st.expander("Feltintervju uten nett (sett og import av svarfiler)"):
+                show_field_kits(initiative, current_project_id)
         else:
             active = st.session_state['active_interview']
             if active['init_id'] in data['initiatives']:
                 active_initiative = data['initiatives'][active['init_id']]
                 if active['interview_id'] in active_initiative['interviews']:
                     interview = active_initiative['interviews'][active['interview_id']]
-                    phase = interview['info'].get('phase', 'Planlegging')
-                    recommended = interview.get('recommended_questions', [])
+                    phase = interview['info']['phase']
+                    recommended = interview['recommended_questions']
                     st.markdown(f"### Intervju: {interview['info']['interviewee']}")
-                    st.caption(f"Gevinst: {interview['info'].get('benefit_name', 'Generelt')} | Fase: {phase}")
+                    st.caption(f"Gevinst: {interview['info']['benefit_name']} | Fase: {phase}")
                     if phase not in interview['responses']:
                         interview['responses'][phase] = {}
-                    answered = sum(1 for q_id in range(1, 25) if interview['responses'][phase].get(str(q_id), {}).get('score', 0) > 0)
-                    st.progress(answered / 24)
-                    st.caption(f"Besvart: {answered} av 24")
                     questions = questions_data[phase]
+                    answered = interview['summary']['phases'].get(phase, 0)
+                    st.progress(min(answered / len(questions), 1.0))
+                    st.caption(f"Besvart: {answered} av {len(questions)}")
                     recommended_qs = [q for q in questions if q['id'] in recommended]
                     other_qs = [q for q in questions if q['id'] not in recommended]
                     if recommended_qs:
@@ -1454,7 +5435,7 @@ def show_main_app(data, current_project_id):
                                 new_score = st.radio("Nivå:", options=[0,1,2,3,4,5], index=resp['score'], key=f"s_{phase}_{q['id']}", horizontal=True, format_func=lambda x: "Ikke vurdert" if x == 0 else f"Nivå {x}")
                                 new_notes = st.text_area("Notater:", value=resp['notes'], key=f"n_{phase}_{q['id']}", height=80)
                                 if st.button("Lagre", key=f"save_{phase}_{q['id']}"):
-                                    interview['responses'][phase][q_id_str] = {'score': new_score, 'notes': new_notes}
+                                    stage_response(active['init_id'], active['interview_id'], phase, q_id_str, {'score': new_score, 'notes': new_notes})
                                     persist_data()
                                     st.rerun()
                     if other_qs:
@@ -1472,7 +5453,7 @@ def show_main_app(data, current_project_id):
                                 new_score = st.radio("Nivå:", options=[0,1,2,3,4,5], index=resp['score'], key=f"s_{phase}_{q['id']}", horizontal=True, format_func=lambda x: "Ikke vurdert" if x == 0 else f"Nivå {x}")
                                 new_notes = st.text_area("Notater:", value=resp['notes'], key=f"n_{phase}_{q['id']}", height=80)
                                 if st.button("Lagre", key=f"save_{phase}_{q['id']}"):
-                                    interview['responses'][phase][q_id_str] = {'score': new_score, 'notes': new_notes}
+                                    stage_response(active['init_id'], active['interview_id'], phase, q_id_str, {'score': new_score, 'notes': new_notes})
                                     persist_data()
                                     st.rerun()
                     col1, col2 = st.columns(2)
@@ -1487,11 +5468,14 @@ def show_main_app(data, current_project_id):
     with tab4:
         st.markdown("## Resultater og analyse")
         benefit_filter_options = {"Alle gevinster": "all"}
-        for ben_id, ben in initiative.get('benefits', {}).items():
+        for ben_id, ben in initiative['benefits'].items():
             benefit_filter_options[ben['name']] = ben_id
         benefit_filter_name = st.selectbox("Filtrer på gevinst:", options=list(benefit_filter_options.keys()))
         benefit_filter = benefit_filter_options[benefit_filter_name]
-        stats = calculate_stats(initiative, benefit_filter if benefit_filter != "all" else None)
+        st.toggle("Enkle diagrammer", key='static_charts', help="Viser diagrammene som bilder - raskere, men uten interaktivitet")
+        precomputed = get_precomputed(current_project_id, initiative)
+        stats = result_stats(precomputed, initiative, benefit_filter, current_project_id)
+        min_sample = st.session_state.get('min_sample', MIN_SAMPLE)
         if not stats or stats['total_interviews'] == 0:
             st.info("Ingen intervjuer gjennomført enda")
         else:
@@ -1510,59 +5494,69 @@ def show_main_app(data, current_project_id):
                             <span style="flex:1;font-weight:600;">{phase_name}</span>
                             <span style="color:{get_score_color(phase_data['avg'])};font-weight:700;font-size:1.2rem;">{phase_data['avg']:.2f}</span>
                         </div>''', unsafe_allow_html=True)
-                    fig = create_phase_radar(stats['phases'])
-                    if fig:
-                        st.plotly_chart(fig, use_container_width=True)
-                    fig_bar = create_phase_bar_chart(stats['phases'])
-                    if fig_bar:
-                        st.plotly_chart(fig_bar, use_container_width=True)
+                    show_chart(result_chart(precomputed, benefit_filter, 'phase_radar', stats))
+                    show_chart(result_chart(precomputed, benefit_filter, 'phase_bar', stats))
             with col2:
                 st.markdown("### Modenhet per parameter")
                 if stats['parameters']:
-                    fig = create_parameter_radar(stats['parameters'])
-                    if fig:
-                        st.plotly_chart(fig, use_container_width=True)
-                    fig_bar = create_parameter_bar_chart(stats['parameters'])
-                    if fig_bar:
-                        st.plotly_chart(fig_bar, use_container_width=True)
+                    show_chart(result_chart(precomputed, benefit_filter, 'parameter_radar', stats))
+                    show_chart(result_chart(precomputed, benefit_filter, 'parameter_bar', stats))
             st.markdown("---")
             col1, col2 = st.columns(2)
             with col1:
                 st.markdown("### Styrkeområder")
                 if stats['high_maturity']:
-                    fig = create_strength_radar(stats['high_maturity'])
-                    if fig:
-                        st.plotly_chart(fig, use_container_width=True)
-                    fig_bar = create_strength_bar_chart(stats['high_maturity'])
-                    if fig_bar:
-                        st.plotly_chart(fig_bar, use_container_width=True)
+                    show_chart(result_chart(precomputed, benefit_filter, 'strength_radar', stats))
+                    show_chart(result_chart(precomputed, benefit_filter, 'strength_bar', stats))
                     st.markdown("#### Detaljer")
                     for item in stats['high_maturity'][:5]:
-                        st.markdown(f'<div class="strength-card"><strong>[{item["phase"]}]</strong> {item["title"]}: <strong>{item["score"]:.2f}</strong></div>', unsafe_allow_html=True)
+                        st.markdown(f'<div class="strength-card"><strong>[{item["phase"]}]</strong> {item["title"]}: <strong>{item["score"]:.2f}</strong>{" (få svar: " + str(item["count"]) + ")" if low_confidence(item["count"], min_sample) else ""}</div>', unsafe_allow_html=True)
                 else:
                     st.info("Ingen styrkeområder identifisert")
             with col2:
                 st.markdown("### Forbedringsområder")
                 if stats['low_maturity']:
-                    fig = create_improvement_radar(stats['low_maturity'])
-                    if fig:
-                        st.plotly_chart(fig, use_container_width=True)
-                    fig_bar = create_improvement_bar_chart(stats['low_maturity'])
-                    if fig_bar:
-                        st.plotly_chart(fig_bar, use_container_width=True)
+                    show_chart(result_chart(precomputed, benefit_filter, 'improvement_radar', stats))
+                    show_chart(result_chart(precomputed, benefit_filter, 'improvement_bar', stats))
                     st.markdown("#### Detaljer")
                     for item in stats['low_maturity'][:5]:
-                        st.markdown(f'<div class="improvement-card"><strong>[{item["phase"]}]</strong> {item["title"]}: <strong>{item["score"]:.2f}</strong></div>', unsafe_allow_html=True)
+                        st.markdown(f'<div class="improvement-card"><strong>[{item["phase"]}]</strong> {item["title"]}: <strong>{item["score"]:.2f}</strong>{" (få svar: " + str(item["count"]) + ")" if low_confidence(item["count"], min_sample) else ""}</div>', unsafe_allow_html=True)
                 else:
                     st.success("Ingen kritiske forbedringsområder!")
+            st.markdown("---")
+            with st.expander("Dekning og utvalgsstørrelse"):
+                st.caption("Antall svar bak hvert resultat. Celler med færre svar enn minstekravet er usikre og merkes i rapportene.")
+                show_coverage(current_project_id, initiative)
+            with st.expander("Hva om: simulering av forbedringer"):
+                st.caption("Legg til tenkte forbedringer for spørsmål, parametere eller rollegrupper og se hvordan snitt og styrke-/forbedringsområder endrer seg.")
+                show_what_if(current_project_id, initiative, benefit_filter)
+            st.markdown("### Nøkkeltemaer i notater")
+            themes = get_initiative_themes(get_search_index(), current_project_id, benefit_filter)
+            if themes['parameters']:
+                theme_rows = [{'Parameter': name, 'Notater': theme['docs'], 'Toppord': format_theme_terms(theme['top_terms']), 'Ordpar': format_theme_terms(theme['bigrams']), 'Ved lav score': format_theme_terms(theme['low_terms']), 'Ved høy score': format_theme_terms(theme['high_terms'])} for name, theme in themes['parameters'].items()]
+                st.dataframe(pd.DataFrame(theme_rows), use_container_width=True, hide_index=True)
+                with st.expander("Temaer per spørsmål"):
+                    question_rows = []
+                    for phase in PHASES:
+                        for q in questions_data[phase]:
+                            theme = themes['questions'].get((phase, str(q['id'])))
+                            if theme:
+                                question_rows.append({'Fase': phase, 'Spørsmål': f"{q['id']}. {q['title']}", 'Notater': theme['docs'], 'Toppord': format_theme_terms(theme['top_terms']), 'Ved lav score': format_theme_terms(theme['low_terms']), 'Ved høy score': format_theme_terms(theme['high_terms'])})
+                    st.dataframe(pd.DataFrame(question_rows), use_container_width=True, hide_index=True)
+            else:
+                st.info("Ingen notater registrert enda")
 
     # TAB 5: RAPPORT
     with tab5:
         st.markdown("## Generer rapport")
-        stats = calculate_stats(initiative)
+        stats = result_stats(precomputed, initiative, "all", current_project_id)
         if not stats or stats['total_interviews'] == 0:
             st.info("Gjennomfor minst ett intervju forst")
         else:
+            min_sample = st.session_state.get('min_sample', MIN_SAMPLE)
+            # Forhåndsberegnede rapporter er merket med standard minstekrav
+            reports = precomputed['reports'] if precomputed is not None and min_sample == MIN_SAMPLE else None
+            themes = get_initiative_themes(get_search_index(), current_project_id) if reports is None else None
             st.markdown("### Eksportformat")
             col1, col2, col3 = st.columns(3)
             with col1:
@@ -1570,18 +5564,19 @@ def show_main_app(data, current_project_id):
                 csv_data = []
                 for phase in stats['questions']:
                     for q_id, q_data in stats['questions'][phase].items():
-                        csv_data.append({'Fase': phase, 'SporsmalID': q_id, 'Tittel': q_data['title'], 'Gjennomsnitt': round(q_data['avg'], 2), 'AntallSvar': q_data['count']})
+                        csv_data.append({'Fase': phase, 'SporsmalID': q_id, 'Tittel': q_data['title'], 'Gjennomsnitt': round(q_data['avg'], 2), 'AntallSvar': q_data['count'],
+                                         'LavSikkerhet': 'ja' if low_confidence(q_data['count'], min_sample) else 'nei'})
                 csv_df = pd.DataFrame(csv_data)
                 st.download_button("Last ned CSV", data=csv_df.to_csv(index=False, sep=';'), file_name=f"modenhet_{initiative['name']}_{datetime.now().strftime('%Y%m%d')}.csv", mime="text/csv", use_container_width=True)
             with col2:
                 st.markdown("#### TXT")
-                txt_report = generate_txt_report(initiative, stats)
+                txt_report = reports['txt'] if reports else generate_txt_report(initiative, stats, themes, min_sample)
                 st.download_button("Last ned TXT", data=txt_report, file_name=f"modenhet_{initiative['name']}_{datetime.now().strftime('%Y%m%d')}.txt", mime="text/plain", use_container_width=True)
             with col3:
                 st.markdown("#### PDF")
                 if FPDF_AVAILABLE:
                     try:
-                        pdf_data = generate_pdf_report(initiative, stats)
+                        pdf_data = reports['pdf'] if reports and reports['pdf'] else generate_pdf_report(initiative, stats, min_sample)
                         if pdf_data:
                             st.download_button("Last ned PDF", data=pdf_data, file_name=f"modenhet_{initiative['name']}_{datetime.now().strftime('%Y%m%d')}.pdf", mime="application/pdf", use_container_width=True)
                         else:
@@ -1592,32 +5587,126 @@ def show_main_app(data, current_project_id):
                     st.info("For PDF: pip install fpdf2")
             st.markdown("---")
             st.markdown("#### HTML-rapport")
-            html_report = generate_html_report(initiative, stats)
+            html_report = reports['html'] if reports else generate_html_report(initiative, stats, themes, min_sample)
             st.download_button("Last ned HTML", data=html_report, file_name=f"modenhet_{initiative['name']}_{datetime.now().strftime('%Y%m%d')}.html", mime="text/html", use_container_width=True)
             st.markdown("---")
+            st.markdown("#### Rådata")
+            st.caption("Alle svar med ett svar per rad (anonymisert), for videre analyse i Power BI, Excel eller pandas.")
+            show_raw_export([current_project_id], f"modenhet_radata_{initiative['name']}_{datetime.now().strftime('%Y%m%d')}", "raw_export")
+            st.markdown("---")
             st.markdown("### Intervjuoversikt")
             interview_data = []
-            for iid, interview in initiative.get('interviews', {}).items():
-                info = interview.get('info', {})
-                total_answered = sum(1 for phase in interview.get('responses', {}).values() for resp in phase.values() if resp.get('score', 0) > 0)
-                total_score = sum(resp.get('score', 0) for phase in interview.get('responses', {}).values() for resp in phase.values() if resp.get('score', 0) > 0)
-                avg = total_score / total_answered if total_answered > 0 else 0
-                interview_data.append({'Dato': info.get('date', ''), 'Intervjuobjekt': info.get('interviewee', ''), 'Gevinst': info.get('benefit_name', 'Generelt'), 'Fase': info.get('phase', ''), 'Besvarte': total_answered, 'Snitt': round(avg, 2) if avg > 0 else '-'})
+            for iid, interview in initiative['interviews'].items():
+                info = interview['info']
+                summary = interview['summary']
+                avg = summary_avg(summary)
+                interview_data.append({'Dato': info['date'], 'Intervjuobjekt': info['interviewee'], 'Gevinst': info['benefit_name'], 'Fase': info['phase'], 'Besvarte': summary['answered'], 'Snitt': round(avg, 2) if avg > 0 else '-',
+                                       'Notater': summary['notes'], 'Sist endret': (summary['modified'] or '')[:10]})
             if interview_data:
                 st.dataframe(pd.DataFrame(interview_data), use_container_width=True)
 
+    with tab6:
+        show_delta_tab(initiative, current_project_id)
+
+def show_admin_panel():
+    # Profilering og tidsmålinger i sidefeltet, bare for administratorer
+    admin_code = os.environ.get(ADMIN_CODE_ENV)
+    if not admin_code:
+        return
+    with st.sidebar.expander("Ytelse (admin)"):
+        if not st.session_state.get('is_admin'):
+            entered = st.text_input("Adminkode", type="password", key="admin_code_input")
+            if not entered or not hmac.compare_digest(entered, admin_code):
+                return
+            st.session_state.is_admin = True
+        show_profile_controls()
+        st.markdown("**Statisk resultatside**")
+        if st.button("Oppdater resultatsiden", key="build_static_site"):
+            result = build_static_site(get_storage())
+            st.success(f"{len(result['built'])} sider bygget, {result['unchanged']} uendret, {len(result['removed'])} fjernet (i '{SITE_DIR}')")
+        st.markdown("**Svarmatrise**")
+        columns = current_score_columns()
+        st.caption(f"Oppdatert {columns['created'][:16].replace('T', ' ')}, {len(columns['initiatives'])} initiativer, "
+                   f"{len(columns['score'])} svar" if columns else "Ikke bygget; resultatene beregnes fra intervjuene.")
+        if st.button("Oppdater svarmatrisen", key="refresh_score_columns"):
+            result = refresh_score_columns(get_storage())
+            st.success(f"{len(result['updated'])} initiativer lest på nytt, {result['unchanged']} uendret, {len(result['removed'])} fjernet")
+        st.markdown("**Rådata for alle initiativer**")
+        show_raw_export(None, f"modenhet_radata_{datetime.now().strftime('%Y%m%d')}", "raw_export_all")
+        if METRICS_ENABLED:
+            show_metrics(get_metrics())
+
+def show_profile_controls():
+    st.markdown("**Profilering**")
+    st.checkbox("Profiler denne sesjonen", key="profile_session")
+    current = st.session_state.get('current_project')
+    if current:
+        targets = get_profile_targets()
+        if st.checkbox("Profiler dette prosjektet for alle brukere", value=current in targets, key=f"profile_project_{current}"):
+            targets.add(current)
+        else:
+            targets.discard(current)
+    st.caption(f"Gjelder fra neste kjøring. Filene lagres i '{PROFILE_DIR}' (maks {PROFILE_KEEP}).")
+    if st.session_state.get('last_profile'):
+        with st.expander("Siste profil"):
+            st.code(st.session_state['last_profile'])
+
+def show_metrics(registry):
+    rows = []
+    for rerun in reversed(registry.recent_reruns()):
+        slowest = sorted(rerun['spans'], key=lambda span: span[1], reverse=True)[:3]
+        rows.append({'Tid': rerun['started'], 'Sesjon': rerun['session'], 'Totalt ms': round(rerun['total'] * 1000, 1),
+                     'Tregeste': ", ".join(f"{name} {seconds * 1000:.0f}" for name, seconds in slowest)})
+    st.markdown(f"**Siste {len(rows)} kjøringer**")
+    st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+    summary = [{'Måling': item['name'], 'Antall': item['count'], 'Snitt ms': round(item['mean'] * 1000, 1),
+                'p50 ms (<=)': item['p50'] * 1000, 'p95 ms (<=)': item['p95'] * 1000} for item in registry.summary()]
+    st.markdown("**Histogrammer**")
+    st.dataframe(pd.DataFrame(summary), use_container_width=True, hide_index=True)
+    st.download_button("Last ned Prometheus-tekst", data=registry.prometheus_text(), file_name=METRICS_FILE, mime="text/plain")
+
 def main():
     # Hovedfunksjon
-    data = get_data()
-    if 'current_project' not in st.session_state:
-        show_project_selector(data)
-    else:
-        current_project_id = st.session_state['current_project']
-        if current_project_id not in data['initiatives']:
-            del st.session_state['current_project']
-            st.rerun()
+    if METRICS_ENABLED:
+        get_metrics().start_rerun(get_session_id())
+    profiler = RerunProfiler() if should_profile() else None
+    if profiler:
+        profiler.start()
+    try:
+        try:
+            data = get_data()
+        except StorageUnavailable as e:
+            if isinstance(e.__cause__, CorruptDataError):
+                st.error(f"{e}. Det finnes ingen gyldig sikkerhetskopi å vise; datafilen er ikke overskrevet.")
+            else:
+                st.error(f"{e}. Dataene er ikke tapt - prøv igjen om litt.")
+            if st.button("Prøv igjen"):
+                st.rerun()
+            return
+        recovery_slot = st.container()  # fylles til slutt, når siden har lest fra lageret
+        show_save_messages()
+        show_save_status()
+        if st.session_state.get('data_stale'):
+            st.caption("Viser sist leste data mens lageret svarer.")
+        show_admin_panel()
+        if 'current_project' not in st.session_state:
+            show_project_selector()
         else:
-            show_main_app(data, current_project_id)
+            current_project_id = st.session_state['current_project']
+            if current_project_id not in data['initiatives']:
+                del st.session_state['current_project']
+                st.rerun()
+            else:
+                show_main_app(data, current_project_id)
+        with recovery_slot:
+            show_recovery_alert()
+    finally:
+        if profiler:
+            st.session_state.profile_counter = st.session_state.get('profile_counter', 0) + 1
+            label = f"{st.session_state.get('current_project', 'forside')}_{get_session_id()}_{st.session_state.profile_counter:05d}"
+            st.session_state.last_profile = profiler.stop(label)
+        if METRICS_ENABLED:
+            get_metrics().finish_rerun()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,145 @@
+"""
+STRESSTEST FOR SAMTIDIGE SKRIVERE
+Starter K prosesser som lagrer tilfeldige svar gjennom de samme lagringsfunksjonene
+som appen (storage.apply_edits), måler lagringer per sekund og ventetid, og
+sjekker til slutt at hvert bekreftet svar finnes i datafilen:
+  python stresstest_lagring.py --writers 8 --edits 50
+  python stresstest_lagring.py --writers 8 --storage sqlite:
+
+Avslutter med kode 1 hvis et bekreftet svar er tapt.
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import streamlit.logger
+streamlit.logger.set_log_level('error')
+
+import modenhetsvurdering as app
+from ytelse_data import generate_synthetic_data, populate_storage, git_revision
+
+def pick_target(rng, keys, hot_share):
+    # En andel av skrivingene går til et lite sett "varme" spørsmål for å fremprovosere konflikter
+    if rng.random() < hot_share:
+        return keys[rng.randrange(min(4, len(keys)))]
+    return rng.choice(keys)
+
+def writer(worker_id, storage_spec, work_dir, keys, edits, hot_share, seed, start_at):
+    """Én skriver: les initiativet, endre ett svar og lagre, som når en bruker trykker Lagre"""
+    os.chdir(work_dir)
+    storage = app.create_storage(storage_spec)
+    rng = random.Random(seed + worker_id)
+    log = []
+    time.sleep(max(0.0, start_at - time.time()))
+    for seq in range(edits):
+        init_id, iid, phase, q_id = pick_target(rng, keys, hot_share)
+        initiative = storage.load_initiative(init_id)
+        response = {'score': rng.randint(1, 5), 'notes': f"skriver {worker_id} nr {seq}"}
+        edit = app.response_edit(initiative, init_id, iid, phase, q_id, response)
+        start = time.perf_counter()
+        try:
+            results = storage.apply_edits([edit])
+        except Exception as e:
+            log.append({'worker': worker_id, 'seq': seq, 'outcome': 'error', 'error': str(e)})
+            continue
+        entry = {'worker': worker_id, 'seq': seq, 'key': [init_id, iid, phase, q_id], 'response': response,
+                 'ms': (time.perf_counter() - start) * 1000, 'wait_ms': results.get('wait', 0) * 1000,
+                 'attempts': results.get('attempts', 1), 'at': time.time()}
+        if results['applied']:
+            entry['outcome'] = 'applied'
+            entry['version'] = results['initiatives'][init_id]['interviews'][iid]['version']
+        else:
+            entry['outcome'] = 'conflict' if results['conflict'] else 'noop'
+        log.append(entry)
+    return log
+
+def find_lost_updates(storage, acknowledged):
+    """Siste bekreftede skriving per svar (høyest intervjuversjon) skal være det som ligger i lageret"""
+    latest = {}
+    for entry in acknowledged:
+        key = tuple(entry['key'])
+        if key not in latest or entry['version'] > latest[key]['version']:
+            latest[key] = entry
+    data = storage.load_all()
+    lost = []
+    for (init_id, iid, phase, q_id), entry in latest.items():
+        interview = data['initiatives'].get(init_id, {}).get('interviews', {}).get(iid, {})
+        stored = interview.get('responses', {}).get(phase, {}).get(q_id)
+        if not app.same_response(stored, entry['response']):
+            lost.append({'key': [init_id, iid, phase, q_id], 'expected': entry['response'], 'stored': stored,
+                         'worker': entry['worker'], 'seq': entry['seq']})
+    return lost, len(latest)
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)] if ordered else 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Stresstest for samtidige skrivere")
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--edits", type=int, default=50, help="lagringer per skriver")
+    parser.add_argument("--initiatives", type=int, default=2)
+    parser.add_argument("--interviews", type=int, default=20, help="intervjuer per initiativ")
+    parser.add_argument("--hot-share", type=float, default=0.2, help="andel skrivinger til samme fire spørsmål")
+    parser.add_argument("--storage", default="file", help="lager som i MODENHET_STORAGE (file, sqlite:, redis://)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="lagre resultat som JSON")
+    args = parser.parse_args()
+    if args.storage == 'memory':
+        parser.error("memory-lageret deles ikke mellom prosesser")
+
+    output = os.path.abspath(args.output) if args.output else None
+    work_dir = tempfile.mkdtemp(prefix="modenhet-stress-")
+    os.chdir(work_dir)
+    data = generate_synthetic_data(args.initiatives, args.interviews, args.seed)
+    storage = populate_storage(args.storage, data)
+    keys = [(init_id, iid, interview['info']['phase'], str(q['id']))
+            for init_id, initiative in data['initiatives'].items()
+            for iid, interview in initiative['interviews'].items()
+            for q in app.questions_data[interview['info']['phase']]]
+    random.Random(args.seed).shuffle(keys)
+
+    start_at = time.time() + 1.0
+    jobs = [(worker_id, args.storage, work_dir, keys, args.edits, args.hot_share, args.seed, start_at) for worker_id in range(args.writers)]
+    with multiprocessing.Pool(args.writers) as pool:
+        logs = pool.starmap(writer, jobs)
+    entries = [entry for log in logs for entry in log]
+    elapsed = max(entry.get('at', start_at) for entry in entries) - start_at
+
+    applied = [entry for entry in entries if entry['outcome'] == 'applied']
+    outcomes = {outcome: sum(1 for entry in entries if entry['outcome'] == outcome) for outcome in ('applied', 'conflict', 'noop', 'error')}
+    lost, checked = find_lost_updates(storage, applied)
+    waits = [entry['wait_ms'] for entry in entries if 'wait_ms' in entry]
+    attempts = [entry['attempts'] for entry in entries if 'attempts' in entry]
+    summary = {
+        'writers': args.writers, 'edits_per_writer': args.edits, 'storage': args.storage, 'seconds': elapsed,
+        'outcomes': outcomes, 'commits_per_second': outcomes['applied'] / elapsed if elapsed > 0 else 0,
+        'wait_p50_ms': percentile(waits, 50), 'wait_p95_ms': percentile(waits, 95), 'wait_max_ms': max(waits, default=0),
+        'attempts_mean': sum(attempts) / len(attempts) if attempts else 0, 'attempts_max': max(attempts, default=0),
+        'checked_answers': checked, 'lost_updates': lost
+    }
+
+    print(f"{args.writers} skrivere x {args.edits} lagringer mot '{args.storage}' på {elapsed:.2f} s")
+    print(f"  lagret {outcomes['applied']}, konflikter {outcomes['conflict']}, uendret {outcomes['noop']}, feil {outcomes['error']}")
+    print(f"  {summary['commits_per_second']:.1f} lagringer/s")
+    print(f"  ventetid p50 {summary['wait_p50_ms']:.1f} ms, p95 {summary['wait_p95_ms']:.1f} ms, maks {summary['wait_max_ms']:.1f} ms")
+    print(f"  forsøk per lagring snitt {summary['attempts_mean']:.2f}, maks {summary['attempts_max']}")
+    print(f"  kontrollerte {checked} svar, tapte oppdateringer: {len(lost)}")
+    for item in lost:
+        print(f"    TAPT {'/'.join(item['key'])}: forventet {item['expected']}, fant {item['stored']} (skriver {item['worker']} nr {item['seq']})")
+
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(dict(summary, created=datetime.now().isoformat(), revision=git_revision()), f, indent=2, ensure_ascii=False)
+    sys.exit(1 if lost or outcomes['error'] else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+YTELSESTEST FOR APPEN (KJØRING FOR KJØRING)
+Kjører modenhetsvurdering.py uten nettleser via Streamlits AppTest og måler tiden
+for hver kjøring av skriptet, samt antall fillesinger og -skrivinger:
+  python ytelse_app.py --scales 1x10,10x100 --output ytelse_app.json
+
+Scenario: åpne et prosjekt, starte et intervju, svare på alle 24 spørsmål,
+filtrere Resultater på gevinst og trykke Oppdater. Alle faner kjøres ved hver
+kjøring av skriptet, så Resultater og Rapport inngår i tiden til hver interaksjon.
+"""
+
+import argparse
+import builtins
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime
+
+import streamlit.logger
+streamlit.logger.set_log_level('error')
+from streamlit.testing.v1 import AppTest
+warnings.filterwarnings('ignore', category=DeprecationWarning)
+
+import modenhetsvurdering as app
+from ytelse_data import generate_synthetic_data, populate_storage, git_revision, parse_scales
+
+APP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "modenhetsvurdering.py")
+DEFAULT_SCALES = "1x10,10x100"
+
+class FileCounter:
+    """Teller open()-kall mot filer i arbeidsmappen, fordelt på lesing og skriving"""
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.reads = 0
+        self.writes = 0
+        self.original_open = None
+
+    def open(self, file, mode='r', *args, **kwargs):
+        if isinstance(file, (str, os.PathLike)) and os.path.abspath(file).startswith(self.root):
+            if any(flag in mode for flag in 'wax+'):
+                self.writes += 1
+            else:
+                self.reads += 1
+        return self.original_open(file, mode, *args, **kwargs)
+
+    def install(self):
+        self.original_open = builtins.open
+        builtins.open = self.open
+
+    def uninstall(self):
+        builtins.open = self.original_open
+
+class Session:
+    """Én simulert bruker; hver interaksjon kjører skriptet og registrerer tid og fil-I/O"""
+
+    def __init__(self, counter):
+        self.at = AppTest.from_file(APP_FILE, default_timeout=600)
+        self.counter = counter
+        self.samples = []
+
+    def run(self, interaction):
+        reads, writes = self.counter.reads, self.counter.writes
+        start = time.perf_counter()
+        self.at.run()
+        elapsed = (time.perf_counter() - start) * 1000
+        if self.at.exception:
+            raise RuntimeError(f"{interaction}: {self.at.exception[0].value}")
+        self.samples.append({'interaction': interaction, 'ms': elapsed,
+                             'reads': self.counter.reads - reads, 'writes': self.counter.writes - writes})
+
+def run_scenario(session, init_id):
+    at = session.at
+    session.run('start_page')
+    at.selectbox(key="project_select").set_value(init_id)
+    session.run('select_project')
+    next(b for b in at.button if b.label == "Apne prosjekt").click()
+    session.run('open_project')
+
+    next(t for t in at.text_input if t.label == "Intervjuobjekt").input("Ytelsestest")
+    next(b for b in at.button if b.label == "Start intervju").click()
+    session.run('start_interview')
+
+    active = at.session_state['active_interview']
+    interview = app.get_storage().load_initiative(active['init_id'])['interviews'][active['interview_id']]
+    phase = interview['info']['phase']
+    for q in app.questions_data[phase]:
+        at.radio(key=f"s_{phase}_{q['id']}").set_value(q['id'] % 5 + 1)
+        at.text_area(key=f"n_{phase}_{q['id']}").input(f"Notat til spørsmål {q['id']}: ytelsestest av lagring")
+        at.button(key=f"save_{phase}_{q['id']}").click()
+        session.run('answer_question')
+
+    benefit_filter = next(s for s in at.selectbox if s.label == "Filtrer på gevinst:")
+    for option in benefit_filter.options[1:2] + benefit_filter.options[:1]:
+        benefit_filter.set_value(option)
+        session.run('results_filter')
+        benefit_filter = next(s for s in at.selectbox if s.label == "Filtrer på gevinst:")
+    next(b for b in at.button if b.label == "Oppdater").click()
+    session.run('refresh')
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+def summarize(samples, n_initiatives, m_interviews):
+    by_interaction = {}
+    for sample in samples:
+        by_interaction.setdefault(sample['interaction'], []).append(sample)
+    rows = []
+    for interaction, items in by_interaction.items():
+        times = [item['ms'] for item in items]
+        rows.append({
+            'interaction': interaction, 'initiatives': n_initiatives, 'interviews_per_initiative': m_interviews,
+            'interviews': n_initiatives * m_interviews, 'reruns': len(items),
+            'p50_ms': percentile(times, 50), 'p95_ms': percentile(times, 95), 'max_ms': max(times),
+            'reads_per_rerun': sum(item['reads'] for item in items) / len(items),
+            'writes_per_rerun': sum(item['writes'] for item in items) / len(items)
+        })
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Ytelsestest for appen via AppTest")
+    parser.add_argument("--scales", default=DEFAULT_SCALES, help="kommaseparert liste NxM (initiativer x intervjuer)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--storage", default="file", help="lager som i MODENHET_STORAGE (file, sqlite:)")
+    parser.add_argument("--output", default="ytelse_app.json")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output)
+    os.environ[app.STORAGE_ENV] = args.storage
+    results = []
+    samples = []
+    for n_initiatives, m_interviews in parse_scales(args.scales):
+        work_dir = tempfile.mkdtemp(prefix="modenhet-app-")
+        os.chdir(work_dir)
+        app.get_storage.clear()
+        app.get_snapshots.clear()
+        data = generate_synthetic_data(n_initiatives, m_interviews, args.seed)
+        populate_storage(args.storage, data)
+        counter = FileCounter(work_dir)
+        counter.install()
+        try:
+            session = Session(counter)
+            run_scenario(session, next(iter(data['initiatives'])))
+        finally:
+            counter.uninstall()
+        rows = summarize(session.samples, n_initiatives, m_interviews)
+        results.extend(rows)
+        samples.extend(dict(sample, interviews=n_initiatives * m_interviews) for sample in session.samples)
+        print(f"\n{n_initiatives} x {m_interviews} intervjuer")
+        print(f"{'interaksjon':18} {'antall':>6} {'p50 ms':>9} {'p95 ms':>9} {'les/kj':>7} {'skriv/kj':>8}")
+        for row in rows:
+            print(f"{row['interaction']:18} {row['reruns']:>6} {row['p50_ms']:9.1f} {row['p95_ms']:9.1f} {row['reads_per_rerun']:7.1f} {row['writes_per_rerun']:8.1f}", flush=True)
+
+    report = {'created': datetime.now().isoformat(), 'revision': git_revision(), 'python': sys.version.split()[0],
+              'seed': args.seed, 'storage': args.storage, 'results': results, 'samples': samples}
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nResultater lagret i {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+YTELSESTEST FOR DATA- OG STATISTIKKLAGET
+Måler tid og maksimalt minnebruk for lasting, lagring, statistikk og rapporter
+på syntetiske data i flere størrelser, uten å starte Streamlit:
+  python ytelse_data.py --scales 1x10,5x20,10x100,20x500 --output ytelse_data.json
+  python ytelse_data.py --compare forrige.json
+
+Skala NxM betyr N initiativer med M intervjuer hver.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import streamlit.logger
+streamlit.logger.set_log_level('error')
+
+import modenhetsvurdering as app
+
+DEFAULT_SCALES = "1x10,5x20,10x100,20x500"
+
+NOTE_WORDS = ("gevinstkart nullpunkt estimat forankring ledelsen eierskap interessenter kommunikasjon "
+              "måltall oppfølging rapportering styringsgruppe linjen gevinstansvarlig tiltak effekt "
+              "risiko forutsetninger datagrunnlag prosjektet programmet organisasjonen").split()
+LOW_PHRASES = ["mangler tydelig eierskap", "nullpunktene er usikre", "ingen fast oppfølging", "uklart ansvar i linjen",
+               "estimatene er ikke kvalitetssikret", "lite forankring i ledelsen"]
+HIGH_PHRASES = ["god forankring i ledelsen", "gevinstkartet brukes aktivt", "fast rapportering til styringsgruppen",
+                "tydelig gevinstansvarlig", "måltallene følges opp kvartalsvis"]
+
+def make_note(rng, score):
+    # Notater med ord som går igjen ved lav og høy score, slik som i ekte intervjuer
+    words = rng.choices(NOTE_WORDS, k=rng.randint(4, 20))
+    if score <= 2:
+        words.insert(rng.randrange(len(words) + 1), rng.choice(LOW_PHRASES))
+    elif score >= 4:
+        words.insert(rng.randrange(len(words) + 1), rng.choice(HIGH_PHRASES))
+    return " ".join(words).capitalize() + "."
+
+def generate_synthetic_data(n_initiatives, m_interviews, seed=42):
+    """Deterministisk datasett med N initiativer x M intervjuer i samme format som datafilen"""
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    roles = list(app.ROLES.keys())
+    data = {'initiatives': {}, 'generation': 1, 'schema': app.SCHEMA_VERSION}
+    for i in range(n_initiatives):
+        init_id = f"{i:05d}"
+        created = start + timedelta(days=rng.randint(0, 60))
+        maturity = rng.uniform(1.8, 4.2)
+        current_phase = rng.randrange(len(app.PHASES))
+        bias = {(phase, q['id']): rng.gauss(0, 0.6) for phase in app.PHASES for q in app.questions_data[phase]}
+        benefits = {f"{init_id}b{b}": {'name': f"Gevinst {b + 1}", 'created': created.isoformat()} for b in range(rng.randint(1, 4))}
+
+        interviews = {}
+        for j in range(m_interviews):
+            iid = f"{init_id}i{j:05d}"
+            when = created + timedelta(days=rng.randint(0, 540), minutes=rng.randint(0, 1440))
+            phase = app.PHASES[min(len(app.PHASES) - 1, max(0, current_phase + rng.choice((-1, 0, 0, 0, 1))))]
+            role = rng.choice(roles)
+            recommended = app.get_recommended_questions("role", role, phase)
+            benefit_id = rng.choice(list(benefits.keys()))
+            responses = {}
+            for q in app.questions_data[phase]:
+                # De fleste anbefalte spørsmål besvares, noen få av de andre
+                if rng.random() > (0.9 if q['id'] in recommended else 0.2):
+                    continue
+                score = min(5, max(1, round(rng.gauss(maturity + bias[(phase, q['id'])], 0.8))))
+                notes = make_note(rng, score) if rng.random() < 0.4 else ""
+                responses[str(q['id'])] = {'score': score, 'notes': notes}
+            interviews[iid] = {
+                'info': {'interviewer': f"Intervjuer {rng.randint(1, 8)}", 'interviewee': f"Deltaker {i}-{j}", 'role': role,
+                         'date': when.strftime('%Y-%m-%d'), 'phase': phase, 'benefit_id': benefit_id,
+                         'benefit_name': benefits[benefit_id]['name'], 'focus_mode': "Rolle", 'selected_role': role, 'selected_params': []},
+                'recommended_questions': recommended,
+                'responses': {phase: responses},
+                'version': len(responses) + 1,
+                'modified': when.isoformat()
+            }
+            interviews[iid]['summary'] = app.summarize_interview(interviews[iid])
+        data['initiatives'][init_id] = {
+            'name': f"Initiativ {i + 1}", 'description': "Syntetisk testdata", 'access_code': '',
+            'created': created.isoformat(), 'benefits': benefits, 'interviews': interviews,
+            'version': len(interviews) + len(benefits) + 1, 'modified': max([created.isoformat()] + [iv['modified'] for iv in interviews.values()]),
+            'schema': app.SCHEMA_VERSION
+        }
+    return data
+
+def populate_storage(storage_spec, data):
+    # Skriv datasettet til lageret i gjeldende mappe og bygg de avledede indeksene
+    app.write_snapshot(app.get_data_file(), data)
+    app.refresh_indexes(data, app.get_data_token())
+    storage = app.create_storage(storage_spec)
+    if not isinstance(storage, app.FileStorage):
+        app.copy_storage(app.FileStorage(), storage)
+    return storage
+
+def measure(fn, repeats):
+    # Oppvarming, deretter tid uten tracemalloc og en egen kjøring for maksimalt minne
+    fn()
+    times = []
+    for _ in range(repeats):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'median_ms': statistics.median(times), 'min_ms': min(times), 'max_ms': max(times),
+            'repeats': repeats, 'peak_kb': peak / 1024}
+
+def benchmark_scale(storage_spec, n_initiatives, m_interviews, repeats, seed):
+    data = generate_synthetic_data(n_initiatives, m_interviews, seed)
+    storage = populate_storage(storage_spec, data)
+    init_id = next(iter(data['initiatives']))
+    iid = next(iter(data['initiatives'][init_id]['interviews']))
+    phase = data['initiatives'][init_id]['interviews'][iid]['info']['phase']
+    state = {'initiative': storage.load_initiative(init_id), 'counter': 0}
+
+    def persist(count):
+        # Samme kall som persist_data gjør; siste utgave av initiativet brukes som grunnlag for neste lagring
+        state['counter'] += 1
+        edits = [app.response_edit(state['initiative'], init_id, iid, phase, str(q['id']),
+                                   {'score': q['id'] % 5 + 1, 'notes': f"Måling {state['counter']}"})
+                 for q in app.questions_data[phase][:count]]
+        results = storage.apply_edits(edits)
+        state['initiative'] = results['initiatives'][init_id]
+
+    initiative = data['initiatives'][init_id]
+    stats = app.calculate_stats(initiative)
+    app.refresh_score_columns(storage)
+    columns = app.open_score_columns()
+    themes = app.get_initiative_themes(app.load_search_index(), init_id)
+    benchmarks = {
+        'load_data': lambda: storage.load_all(),
+        'load_catalog': lambda: storage.load_catalog(),
+        'load_initiative': lambda: storage.load_initiative(init_id),
+        'persist_data_1_svar': lambda: persist(1),
+        'persist_data_24_svar': lambda: persist(24),
+        'calculate_stats': lambda: app.calculate_stats(initiative),
+        'stats_from_columns': lambda: app.stats_from_columns(columns, init_id),
+        'generate_txt_report': lambda: app.generate_txt_report(initiative, stats, themes),
+        'generate_html_report': lambda: app.generate_html_report(initiative, stats, themes),
+    }
+    if app.FPDF_AVAILABLE:
+        benchmarks['generate_pdf_report'] = lambda: app.generate_pdf_report(initiative, stats)
+
+    results = []
+    for name, fn in benchmarks.items():
+        result = measure(fn, repeats)
+        result.update({'function': name, 'initiatives': n_initiatives, 'interviews_per_initiative': m_interviews,
+                       'interviews': n_initiatives * m_interviews, 'storage': storage_spec})
+        results.append(result)
+        print(f"{n_initiatives * m_interviews:>7} intervjuer  {name:24} {result['median_ms']:10.2f} ms  {result['peak_kb']:10.0f} kB", flush=True)
+    return results
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def compare(current, previous_path):
+    # Skriv forholdet mellom denne og en tidligere kjøring per funksjon og skala
+    with open(previous_path, encoding='utf-8') as f:
+        previous = {(r['function'], r['interviews']): r for r in json.load(f)['results']}
+    print(f"\nSammenlignet med {previous_path}:")
+    for result in current:
+        old = previous.get((result['function'], result['interviews']))
+        if old:
+            ratio = result['median_ms'] / old['median_ms'] if old['median_ms'] else float('inf')
+            flag = "  <-- tregere" if ratio > 1.2 else ""
+            print(f"{result['interviews']:>7} intervjuer  {result['function']:24} {old['median_ms']:10.2f} -> {result['median_ms']:10.2f} ms  x{ratio:.2f}{flag}")
+
+def parse_scales(text):
+    return [tuple(int(part) for part in scale.split("x")) for scale in text.split(",")]
+
+def main():
+    parser = argparse.ArgumentParser(description="Ytelsestest for data- og statistikklaget")
+    parser.add_argument("--scales", default=DEFAULT_SCALES, help="kommaseparert liste NxM (initiativer x intervjuer)")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--storage", default="file", help="lager som i MODENHET_STORAGE (file, sqlite:, memory)")
+    parser.add_argument("--output", default="ytelse_data.json")
+    parser.add_argument("--compare", help="tidligere JSON-resultat å sammenligne med")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output)
+    previous = os.path.abspath(args.compare) if args.compare else None
+    results = []
+    for n_initiatives, m_interviews in parse_scales(args.scales):
+        os.chdir(tempfile.mkdtemp(prefix="modenhet-ytelse-"))
+        results.extend(benchmark_scale(args.storage, n_initiatives, m_interviews, args.repeats, args.seed))
+
+    report = {
+        'created': datetime.now().isoformat(), 'revision': git_revision(), 'python': sys.version.split()[0],
+        'platform': platform.platform(), 'seed': args.seed, 'storage': args.storage, 'results': results
+    }
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nResultater lagret i {output}")
+    if previous:
+        compare(results, previous)
+
+if __name__ == "__main__":
+    main()